@@ -0,0 +1,195 @@
+# FREELANCE/pagination.py
+"""
+Keyset (cursor) pagination shared by the task, bid and invoice listings.
+
+Unlike OFFSET paging, every page is fetched with a WHERE clause on the sort
+key of the last row seen, so page 500 costs the same as page 1 provided the
+ordering is backed by an index.
+
+Usage:
+    page = paginate_keyset(queryset, ('-created_at', '-id'), request.GET.get('cursor'))
+    page.items, page.next_cursor, page.prev_cursor
+
+The ordering must be total (end with a unique column) and its columns must be
+non-nullable, otherwise rows can be skipped or repeated between pages.
+
+A key computed per request (e.g. a score that depends on the current time)
+must be computed the same way on every page. paginate_keyset(context=...)
+stores a JSON value in the cursors it issues, and cursor_context() reads it
+back before the queryset is built, so the caller can reuse it (e.g. the
+time the first page was ranked at).
+"""
+
+import base64
+import binascii
+import datetime
+import json
+import math
+from dataclasses import dataclass, field
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.exceptions import FieldDoesNotExist, FieldError, ValidationError
+from django.db.models import Q
+
+DEFAULT_PER_PAGE = 20
+
+NEXT = 'n'
+PREV = 'p'
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """ DjangoJSONEncoder trims datetimes to milliseconds; cursors need exact values. """
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+@dataclass
+class KeysetPage:
+    items: list = field(default_factory=list)
+    next_cursor: str = None
+    prev_cursor: str = None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _parse_ordering(ordering):
+    return [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+
+
+def _model_field(model, name):
+    if name == 'pk':
+        return model._meta.pk
+    return model._meta.get_field(name)
+
+
+def _key_field(queryset, name):
+    """ The field that converts a cursor value for `name`: a model field or an annotation's output_field. """
+    try:
+        return _model_field(queryset.model, name)
+    except FieldDoesNotExist:
+        if name not in queryset.query.annotations:
+            raise
+        return queryset.query.annotations[name].output_field
+
+
+def encode_cursor(direction, values, context=None):
+    payload = [direction, values] if context is None else [direction, values, context]
+    payload = json.dumps(payload, cls=CursorEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def _load(token):
+    padded = token + '=' * (-len(token) % 4)
+    payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    if not isinstance(payload, list) or len(payload) not in (2, 3):
+        raise ValueError("Not a cursor.")
+    return payload
+
+
+def cursor_context(token):
+    """ The context stored in a cursor token by paginate_keyset(), or None. """
+    if not token:
+        return None
+    try:
+        payload = _load(token)
+    except (binascii.Error, ValueError, TypeError):
+        return None
+    return payload[2] if len(payload) == 3 else None
+
+
+def decode_cursor(token, queryset, keys):
+    """
+    Returns (direction, values) for a cursor token, or None when the token is
+    missing, malformed or does not match `keys` (the caller then shows page one).
+    Every value is converted by its model field, or for an annotated key (e.g.
+    a computed score) by the annotation's output_field.
+    """
+    if not token:
+        return None
+    try:
+        direction, raw_values = _load(token)[:2]
+        if direction not in (NEXT, PREV) or not isinstance(raw_values, list) or len(raw_values) != len(keys):
+            return None
+        values = [_key_field(queryset, name).to_python(raw) for (name, _), raw in zip(keys, raw_values)]
+        # FloatField.to_python() lets NaN and infinity through; no row compares after them
+        if any(isinstance(value, float) and not math.isfinite(value) for value in values):
+            return None
+        return direction, values
+    except (binascii.Error, ValueError, TypeError, ValidationError, FieldDoesNotExist, FieldError):
+        return None
+
+
+def _after(keys, values, reverse=False):
+    """
+    Builds the row-value comparison "(k1, k2, ...) comes after (v1, v2, ...)"
+    in the given ordering as an OR of equality prefixes, which works on every
+    backend and with mixed ASC/DESC keys.
+    """
+    condition = Q()
+    for i, (name, descending) in enumerate(keys):
+        lookup = 'lt' if descending != reverse else 'gt'
+        prefix = {keys[j][0]: values[j] for j in range(i)}
+        condition |= Q(**prefix, **{f'{name}__{lookup}': values[i]})
+    return condition
+
+
+def _key_values(item, keys):
+    if isinstance(item, dict):
+        return [item[name] for name, _ in keys]
+    return [getattr(item, name) for name, _ in keys]
+
+
+def paginate_keyset(queryset, ordering, cursor=None, per_page=DEFAULT_PER_PAGE, context=None):
+    """
+    Returns a KeysetPage of `queryset` sorted by `ordering` (e.g. ('-created_at', '-id')),
+    positioned by an opaque cursor previously issued in next_cursor/prev_cursor.
+    `context` (JSON-serializable) is stored in the issued cursors, see cursor_context().
+    """
+    keys = _parse_ordering(ordering)
+    decoded = decode_cursor(cursor, queryset, keys)
+
+    if decoded is None:
+        rows = list(queryset.order_by(*ordering)[:per_page + 1])
+        has_more = len(rows) > per_page
+        items = rows[:per_page]
+        return KeysetPage(
+            items=items,
+            next_cursor=encode_cursor(NEXT, _key_values(items[-1], keys), context) if has_more else None,
+        )
+
+    direction, values = decoded
+    if direction == NEXT:
+        rows = list(queryset.filter(_after(keys, values)).order_by(*ordering)[:per_page + 1])
+        has_more = len(rows) > per_page
+        items = rows[:per_page]
+        has_next, has_prev = has_more, True
+    else:
+        reversed_ordering = [name[1:] if name.startswith('-') else f'-{name}' for name in ordering]
+        rows = list(queryset.filter(_after(keys, values, reverse=True)).order_by(*reversed_ordering)[:per_page + 1])
+        has_more = len(rows) > per_page
+        items = rows[:per_page][::-1]
+        has_next, has_prev = True, has_more
+
+    if not items:
+        return KeysetPage()
+
+    return KeysetPage(
+        items=items,
+        next_cursor=encode_cursor(NEXT, _key_values(items[-1], keys), context) if has_next else None,
+        prev_cursor=encode_cursor(PREV, _key_values(items[0], keys), context) if has_prev else None,
+    )
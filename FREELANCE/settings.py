@@ -91,6 +91,21 @@ DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
 
 MEDIA_URL = '/media/'
 
+# Task deliverables uploaded in chunks (tasks.uploads) are written here; partial
+# uploads live in the 'incomplete' subdirectory until their last chunk arrives.
+DELIVERABLES_ROOT = config('DELIVERABLES_ROOT', default=str(BASE_DIR / 'deliverables'))
+DELIVERABLE_MAX_SIZE = config('DELIVERABLE_MAX_SIZE', default=5 * 1024 ** 3, cast=int)
+
+# Invoice numbers (invoices.numbering): one sequence per freelancer, or a single
+# global one. Each process reserves numbers in blocks of this size.
+INVOICE_NUMBER_PER_FREELANCER = config('INVOICE_NUMBER_PER_FREELANCER', default=True, cast=bool)
+INVOICE_NUMBER_BLOCK_SIZE = config('INVOICE_NUMBER_BLOCK_SIZE', default=20, cast=int)
+
+# Invoice PDFs (invoices.rendering) are cached here under their content hash and
+# rendered by a pool of this many processes (0 renders inline).
+INVOICE_PDF_ROOT = config('INVOICE_PDF_ROOT', default=str(BASE_DIR / 'invoice_pdfs'))
+INVOICE_PDF_WORKERS = config('INVOICE_PDF_WORKERS', default=2, cast=int)
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -128,6 +143,10 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'TEST': {
+            # File-backed (not in-memory) so threaded tests see real SQLite locking
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
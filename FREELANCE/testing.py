@@ -0,0 +1,72 @@
+# FREELANCE/testing.py
+"""
+Test helpers shared by the app test suites.
+
+QueryBudgetMixin pins the maximum number of SQL queries a view may run.
+Budgets are checked at small and large fixture sizes (e.g. 1 and 500 bids),
+so a template lookup that starts costing one query per row fails the test
+instead of slowing production:
+
+    class TaskViewQueryTests(QueryBudgetMixin, TestCase):
+        def test_detail(self):
+            self.assertViewWithinBudget('/tasks/1/', 7)
+
+ConcurrencyMixin runs a worker in several threads released at once, for
+contention tests (use it with TransactionTestCase, so the threads' own
+connections see the test's rows):
+
+    results = self.run_in_threads(lambda slot: place_bid(...), 8)
+"""
+
+import threading
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+
+    @contextmanager
+    def assertMaxQueries(self, limit, using=DEFAULT_DB_ALIAS):
+        with CaptureQueriesContext(connections[using]) as captured:
+            yield captured
+        if len(captured) > limit:
+            queries = '\n'.join(f'{i}. {q["sql"]}' for i, q in enumerate(captured.captured_queries, start=1))
+            self.fail(f"{len(captured)} queries executed, budget is {limit}:\n{queries}")
+
+    def assertViewWithinBudget(self, url, limit, status_code=200):
+        """ GETs `url` with self.client and fails if it needs more than `limit` queries. Returns the response. """
+        with self.assertMaxQueries(limit):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status_code)
+        return response
+
+
+class ConcurrencyMixin:
+
+    def run_in_threads(self, worker, count):
+        """
+        Calls worker(slot) for slot in range(count), each in its own thread,
+        all released together by a barrier. Returns the results in slot
+        order and fails the test if any call raised.
+        """
+        results, errors = [None] * count, []
+        barrier = threading.Barrier(count)
+
+        def run(slot):
+            try:
+                barrier.wait()
+                results[slot] = worker(slot)
+            except Exception as e:  # surfaced below; a thread must not die silently
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(slot,)) for slot in range(count)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        return results
@@ -0,0 +1,113 @@
+import base64
+import json
+from datetime import timedelta
+
+from django.db.models import FloatField, Value
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import User
+from freelancers.models import FreelancerProfile
+from tasks.models import Bid, Task
+from .pagination import NEXT, cursor_context, encode_cursor, paginate_keyset
+
+TASK_ORDERING = ('-created_at', '-id')
+
+
+class KeysetPaginationTests(TestCase):
+
+    def setUp(self):
+        self.client_user = User.objects.create(username='client', email='client@example.com', user_type=1)
+        start = timezone.now().replace(microsecond=123456)
+        tasks = Task.objects.bulk_create([
+            Task(title=f'Task {i}', description='x', client=self.client_user) for i in range(45)
+        ])
+        # Groups of 7 share a created_at, so pages split ties that only the id breaks
+        for i, task in enumerate(tasks):
+            Task.objects.filter(pk=task.pk).update(created_at=start - timedelta(microseconds=i // 7))
+        self.expected = list(Task.objects.order_by(*TASK_ORDERING).values_list('pk', flat=True))
+
+    def page(self, cursor=None, per_page=20, **kwargs):
+        return paginate_keyset(Task.objects.all(), TASK_ORDERING, cursor, per_page=per_page, **kwargs)
+
+    def test_next_and_prev_cursors_walk_every_row_once(self):
+        pages = [self.page()]
+        while pages[-1].has_next:
+            pages.append(self.page(pages[-1].next_cursor))
+        self.assertEqual([len(page) for page in pages], [20, 20, 5])
+        self.assertEqual([task.pk for page in pages for task in page], self.expected)
+        self.assertFalse(pages[0].has_previous)
+        self.assertFalse(pages[-1].has_next)
+
+        # Walking back returns the same pages
+        back = self.page(pages[2].prev_cursor)
+        self.assertEqual(back.items, pages[1].items)
+        self.assertEqual(self.page(back.prev_cursor).items, pages[0].items)
+        self.assertFalse(self.page(back.prev_cursor).has_previous)
+
+    def test_ties_on_the_leading_key_split_by_the_unique_key(self):
+        seen = []
+        cursor = None
+        while True:
+            page = self.page(cursor, per_page=3)
+            seen += [task.pk for task in page]
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, self.expected)
+
+    def test_mixed_directions(self):
+        task = Task.objects.first()
+        users = User.objects.bulk_create([
+            User(username=f'f{i}', email=f'f{i}@example.com', user_type=2) for i in range(9)
+        ])
+        profiles = FreelancerProfile.objects.bulk_create([FreelancerProfile(user=user) for user in users])
+        Bid.objects.bulk_create([
+            Bid(task=task, freelancer=profile, amount=10 + i % 3, delivery_days=1) for i, profile in enumerate(profiles)
+        ])
+        ordering = ('amount', '-id')
+        first = paginate_keyset(task.bids.all(), ordering, per_page=4)
+        second = paginate_keyset(task.bids.all(), ordering, first.next_cursor, per_page=4)
+        third = paginate_keyset(task.bids.all(), ordering, second.next_cursor, per_page=4)
+        self.assertEqual(
+            [bid.pk for page in (first, second, third) for bid in page],
+            list(task.bids.order_by(*ordering).values_list('pk', flat=True)),
+        )
+
+    def test_malformed_and_tampered_cursors_show_page_one(self):
+        first = self.page()
+
+        def forge(payload):
+            return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+        for cursor in (
+            'garbage', '!!!!', forge({'n': 1}), forge(['x', ['2026-01-01T00:00:00+00:00', 1]]),
+            forge([NEXT, [1]]), forge([NEXT, ['not a date', 1]]), forge([NEXT, ['2026-01-01T00:00:00+00:00', 'x']]),
+            forge([NEXT, 'not a list']), forge([NEXT, [None, None], 'ctx', 'extra']),
+        ):
+            with self.subTest(cursor=cursor):
+                page = self.page(cursor)
+                self.assertEqual(page.items, first.items)
+                self.assertFalse(page.has_previous)
+
+    def test_tampered_annotated_keys_show_page_one(self):
+        ranked = Task.objects.annotate(score=Value(0.5, output_field=FloatField()))
+        ordering = ('-score',) + TASK_ORDERING
+        first = paginate_keyset(ranked, ordering)
+        second = paginate_keyset(ranked, ordering, first.next_cursor)
+        self.assertEqual([task.pk for task in second], self.expected[20:40])
+
+        start = '2026-01-01T00:00:00+00:00'
+        for score in ('abc', [1], {'x': 1}, 'NaN', 'Infinity'):
+            with self.subTest(score=score):
+                page = paginate_keyset(ranked, ordering, encode_cursor(NEXT, [score, start, 1]))
+                self.assertEqual(page.items, first.items)
+                self.assertFalse(page.has_previous)
+
+    def test_cursor_keeps_exact_datetimes_and_context(self):
+        first = self.page(per_page=7, context={'ranked_at': 'x'})
+        self.assertEqual(cursor_context(first.next_cursor), {'ranked_at': 'x'})
+        self.assertEqual([task.pk for task in self.page(first.next_cursor, per_page=7)], self.expected[7:14])
+        self.assertIsNone(cursor_context(encode_cursor(NEXT, [1, 2])))
+        self.assertIsNone(cursor_context('garbage'))
+        self.assertIsNone(cursor_context(None))
@@ -1,6 +1,10 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.conf import settings
+from django.http import Http404
+
+from freelancers.recommender import recommend_freelancers
+from tasks.models import Task
 
 # Create your views here.
 User = settings.AUTH_USER_MODEL
@@ -28,17 +32,29 @@ def dashboard_view(request):
 @login_required
 def freelancer_list_view(request):
     """
-    Lists all registered freelancers for the client to discover and select.
+    Recommended freelancers for one of the client's OPEN tasks (?task=<pk>,
+    newest task by default), ranked by freelancers.recommender.
     """
     if not request.user.is_client:
         return redirect('accounts:unauthorized')
 
-    # Logic to fetch and filter Freelancer profiles will go here
-    freelancers = [] # Placeholder list
+    open_tasks = Task.objects.filter(client=request.user, status='OPEN').only('pk', 'title').order_by('-created_at')
+    if request.GET.get('task'):
+        try:
+            task_id = int(request.GET['task'])
+        except ValueError:
+            raise Http404("No such task.")
+        task = get_object_or_404(open_tasks, pk=task_id)
+    else:
+        task = open_tasks.first()
+
+    freelancers = recommend_freelancers(task) if task else []
     
     context = {
         'title': 'Discover Freelancers',
         'freelancers': freelancers,
+        'task': task,
+        'open_tasks': open_tasks[:50],
     }
     return render(request, 'clients/freelancer_list.html', context)
 
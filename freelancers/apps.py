@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class FreelancersConfig(AppConfig):
     name = 'freelancers'
+
+    def ready(self):
+        # Keep the recommender's cached skill matrix current
+        from . import signals  # noqa: F401
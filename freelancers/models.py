@@ -55,6 +55,10 @@ class FreelancerProfile(models.Model):
     bank_name = models.CharField(max_length=100, blank=True, null=True)
     account_number = models.CharField(max_length=50, blank=True, null=True)
 
+    # Bumped on every save and skills change (see freelancers.signals); the
+    # recommender re-reads only profiles changed since its last refresh
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
     def __str__(self):
         return f"{self.user.username}'s Freelancer Profile"
     
@@ -79,8 +83,23 @@ class Transaction(models.Model):
     # Status for withdrawal requests (e.g., Pending, Completed, Failed)
     status = models.CharField(max_length=20, default='COMPLETED') 
 
+    # What the revenue rollup (invoices.revenue) counts a transaction under
+    ROLLUP_FIELDS = ('profile_id', 'timestamp', 'transaction_type', 'status', 'amount')
+
     def __str__(self):
         return f"{self.transaction_type} of {self.amount} for {self.profile.user.username}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what was loaded so the rollup signals can move the transaction between cells
+        instance._loaded_rollup = tuple(instance.__dict__.get(name) for name in cls.ROLLUP_FIELDS)
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Diffs the rollup against the row as stored; imported here as invoices.revenue imports this module
+        from invoices.revenue import save_against_stored
+        save_against_stored(self, super().save, *args, **kwargs)
+
     class Meta:
         ordering = ['-timestamp']
\ No newline at end of file
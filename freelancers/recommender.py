@@ -0,0 +1,235 @@
+# freelancers/recommender.py
+"""
+Reverse matching: the freelancers best suited to a task.
+
+Every FreelancerProfile is scored against the task in one vectorized pass
+over an in-memory skill-membership matrix (rows = profiles, columns =
+skills, stored column-major so each skill's column is contiguous):
+
+    score = OVERLAP_WEIGHT * share of the task's skills the freelancer has
+          + BUDGET_WEIGHT  * budget fit (as in tasks.ranking, seen from the task side)
+          + TIER_WEIGHT    * tier score
+
+Only freelancers with at least one of the required skills are ranked, and
+np.argpartition picks the top K without sorting all of them.
+
+The matrix is built once per process. Each later call first re-reads only
+the profiles whose updated_at moved past the last refresh (an indexed range
+scan) and patches their rows. Saves and skill changes bump updated_at (see
+freelancers.signals), so every process sees changes made by the others.
+Deleted profiles are dropped from the in-process matrix by a signal and are
+filtered out of the results in other processes. A full rebuild happens every
+REBUILD_INTERVAL.
+"""
+
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.utils import timezone
+
+from tasks.ranking import BUDGET_FIT_HOURS, NEUTRAL_SCORE
+from .models import FreelancerProfile
+
+OVERLAP_WEIGHT = 0.6
+BUDGET_WEIGHT = 0.25
+TIER_WEIGHT = 0.15
+
+TIER_SCORES = {'STANDARD': 0.4, 'PRO': 0.7, 'EXPERT': 1.0}
+
+DEFAULT_TOP_K = 20
+REBUILD_INTERVAL = 600  # seconds
+# A row committed just after a refresh may carry an updated_at from before it;
+# each refresh re-reads this much before the previous one to catch such rows
+REFRESH_OVERLAP = timedelta(seconds=5)
+
+ProfileSkill = FreelancerProfile.skills.through
+
+
+class SkillMatrix:
+    """ Cached profile x skill membership plus the per-profile columns used for scoring. """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.built_at = None
+
+    # --- building ---
+
+    def build(self):
+        synced_at = timezone.now()
+        rows = list(FreelancerProfile.objects.values_list('pk', 'hourly_rate', 'tier', 'updated_at'))
+        pairs = np.array(ProfileSkill.objects.values_list('freelancerprofile_id', 'skill_id'), dtype=np.int64)
+        pairs = pairs.reshape(-1, 2)
+
+        self.profile_ids = np.array([r[0] for r in rows], dtype=np.int64)
+        self.row_of = {pk: i for i, pk in enumerate(self.profile_ids.tolist())}
+        self.size = len(rows)
+        self.hourly_rate = np.array([float(r[1]) if r[1] is not None else np.nan for r in rows], dtype=np.float64)
+        self.tier = np.array([TIER_SCORES.get(r[2], 0.0) for r in rows], dtype=np.float32)
+        self.active = np.ones(self.size, dtype=bool)
+
+        skill_ids = np.unique(pairs[:, 1]) if len(pairs) else np.array([], dtype=np.int64)
+        self.col_of = {sid: j for j, sid in enumerate(skill_ids.tolist())}
+        self.membership = np.zeros((max(self.size, 1), max(len(skill_ids), 1)), dtype=bool, order='F')
+        if len(pairs):
+            rows_idx = np.fromiter((self.row_of[p] for p in pairs[:, 0].tolist()), dtype=np.int64, count=len(pairs))
+            cols_idx = np.searchsorted(skill_ids, pairs[:, 1])
+            self.membership[rows_idx, cols_idx] = True
+
+        self.synced_at = synced_at
+        # updated_at already applied for rows inside the overlap window, so re-reads skip them
+        self.applied = {r[0]: r[3] for r in rows if r[3] > synced_at - REFRESH_OVERLAP}
+        self.built_at = time.monotonic()
+
+    # --- incremental refresh ---
+
+    def _ensure_capacity(self, rows, cols):
+        cur_rows, cur_cols = self.membership.shape
+        if rows <= cur_rows and cols <= cur_cols:
+            return
+        grown = np.zeros((max(rows, cur_rows * 2 if rows > cur_rows else cur_rows),
+                          max(cols, cur_cols * 2 if cols > cur_cols else cur_cols)), dtype=bool, order='F')
+        grown[:cur_rows, :cur_cols] = self.membership
+        self.membership = grown
+        extra = grown.shape[0] - len(self.hourly_rate)
+        if extra > 0:
+            self.profile_ids = np.concatenate([self.profile_ids, np.zeros(extra, dtype=np.int64)])
+            self.hourly_rate = np.concatenate([self.hourly_rate, np.full(extra, np.nan)])
+            self.tier = np.concatenate([self.tier, np.zeros(extra, dtype=np.float32)])
+            self.active = np.concatenate([self.active, np.zeros(extra, dtype=bool)])
+
+    def _col(self, skill_id):
+        col = self.col_of.get(skill_id)
+        if col is None:
+            col = self.col_of[skill_id] = len(self.col_of)
+            self._ensure_capacity(self.size, col + 1)
+        return col
+
+    def refresh(self):
+        """ Re-reads profiles changed since the last refresh. Returns how many rows were patched. """
+        synced_at = timezone.now()
+        changed = FreelancerProfile.objects.filter(updated_at__gt=self.synced_at - REFRESH_OVERLAP)
+        rows = [
+            row for row in changed.values_list('pk', 'hourly_rate', 'tier', 'updated_at')
+            if self.applied.get(row[0]) != row[3]
+        ]
+        self.synced_at = synced_at
+        horizon = synced_at - REFRESH_OVERLAP
+        self.applied = {pk: ts for pk, ts in self.applied.items() if ts > horizon}
+        if not rows:
+            return 0
+
+        skills_of = {}
+        for profile_id, skill_id in ProfileSkill.objects.filter(
+            freelancerprofile_id__in=[r[0] for r in rows]
+        ).values_list('freelancerprofile_id', 'skill_id'):
+            skills_of.setdefault(profile_id, []).append(skill_id)
+
+        for pk, hourly_rate, tier, updated_at in rows:
+            row = self.row_of.get(pk)
+            if row is None:
+                row = self.row_of[pk] = self.size
+                self.size += 1
+                self._ensure_capacity(self.size, len(self.col_of))
+                self.profile_ids[row] = pk
+            self.hourly_rate[row] = float(hourly_rate) if hourly_rate is not None else np.nan
+            self.tier[row] = TIER_SCORES.get(tier, 0.0)
+            self.active[row] = True
+            self.membership[row, :] = False
+            # Resolve columns first: _col() may grow (replace) the membership array
+            cols = [self._col(skill_id) for skill_id in skills_of.get(pk, ())]
+            self.membership[row, cols] = True
+            if updated_at > horizon:
+                self.applied[pk] = updated_at
+        return len(rows)
+
+    def remove(self, profile_id):
+        with self._lock:
+            row = self.row_of.get(profile_id) if self.built_at is not None else None
+            if row is not None:
+                self.active[row] = False
+
+    def clear(self):
+        """ Forces a full rebuild on next use. """
+        with self._lock:
+            self.built_at = None
+
+    def ensure_current(self):
+        if self.built_at is None or time.monotonic() - self.built_at > REBUILD_INTERVAL:
+            self.build()
+        else:
+            self.refresh()
+
+    def rank(self, skill_ids, budget=None, k=DEFAULT_TOP_K):
+        """ Brings the matrix up to date and returns top_k(); serialized so readers never see a half-grown matrix. """
+        with self._lock:
+            self.ensure_current()
+            return self.top_k(skill_ids, budget, k)
+
+    # --- scoring ---
+
+    def top_k(self, skill_ids, budget=None, k=DEFAULT_TOP_K):
+        """
+        Returns [(profile_id, score, skill_overlap)] for the best k profiles,
+        best first. Only profiles sharing at least one skill are ranked.
+        """
+        n = self.size
+        cols = [self.col_of[s] for s in set(skill_ids) if s in self.col_of]
+        if not n or not cols:
+            return []
+
+        required = len(set(skill_ids))
+        matched = self.membership[:n, cols].sum(axis=1, dtype=np.int32)
+        candidates = np.flatnonzero((matched > 0) & self.active[:n])
+        if not len(candidates):
+            return []
+
+        overlap = matched[candidates] / required
+        rate = self.hourly_rate[candidates]
+        if budget:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                fit = np.minimum(float(budget) / (rate * BUDGET_FIT_HOURS), 1.0)
+            fit = np.where(np.isnan(rate) | (rate <= 0), NEUTRAL_SCORE, fit)
+        else:
+            fit = np.full(len(candidates), NEUTRAL_SCORE)
+        scores = OVERLAP_WEIGHT * overlap + BUDGET_WEIGHT * fit + TIER_WEIGHT * self.tier[candidates]
+
+        if len(candidates) > k:
+            best = np.argpartition(-scores, k - 1)[:k]
+        else:
+            best = np.arange(len(candidates))
+        best = best[np.lexsort((self.profile_ids[candidates][best], -scores[best]))]
+        return [
+            (int(self.profile_ids[candidates[i]]), float(scores[i]), float(overlap[i]))
+            for i in best
+        ]
+
+
+# One per process; freelancers.signals drops deleted profiles from it
+matrix = SkillMatrix()
+
+
+def recommend_freelancers(task, k=DEFAULT_TOP_K):
+    """
+    Returns up to k FreelancerProfiles (with .match_score and .skill_overlap
+    set) ranked for `task`, best first. Costs the matrix refresh query, the
+    task's skills and one query for the chosen profiles.
+    """
+    skill_ids = list(task.skills_required.values_list('pk', flat=True))
+    ranked = matrix.rank(skill_ids, budget=task.budget, k=k)
+    if not ranked:
+        return []
+
+    profiles = FreelancerProfile.objects.select_related('user').prefetch_related('skills').in_bulk(
+        [pk for pk, _, _ in ranked]
+    )
+    results = []
+    for pk, score, overlap in ranked:
+        profile = profiles.get(pk)
+        if profile is None:  # deleted by another process since the last rebuild
+            continue
+        profile.match_score = score
+        profile.skill_overlap = overlap
+        results.append(profile)
+    return results
@@ -0,0 +1,31 @@
+# freelancers/signals.py
+"""
+Signal receivers that keep the freelancer recommender (freelancers.recommender) current.
+Connected in FreelancersConfig.ready().
+"""
+
+from django.db.models.signals import post_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import FreelancerProfile
+from . import recommender
+
+
+@receiver(m2m_changed, sender=FreelancerProfile.skills.through)
+def touch_profile_on_skills_change(sender, instance, action, reverse, pk_set, **kwargs):
+    # A skills change does not save the profile, so bump updated_at for the recommender's refresh
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        profile_ids = [instance.pk]
+    elif pk_set:
+        profile_ids = list(pk_set)
+    else:
+        return
+    FreelancerProfile.objects.filter(pk__in=profile_ids).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=FreelancerProfile)
+def drop_deleted_profile(sender, instance, **kwargs):
+    recommender.matrix.remove(instance.pk)
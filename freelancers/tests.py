@@ -1,3 +1,61 @@
 from django.test import TestCase
 
-# Create your tests here.
+from accounts.models import User
+from tasks.models import Task
+from .models import Skill, FreelancerProfile
+from . import recommender
+
+
+def make_profile(username, skills, tier='STANDARD', hourly_rate=None):
+    user = User.objects.create(username=username, email=f'{username}@example.com', user_type=2)
+    profile = FreelancerProfile.objects.create(user=user, tier=tier, hourly_rate=hourly_rate)
+    profile.skills.set(skills)
+    return profile
+
+
+class RecommenderTests(TestCase):
+
+    def setUp(self):
+        recommender.matrix.clear()
+        self.python, self.sql, self.design = (Skill.objects.create(name=n) for n in ('Python', 'SQL', 'Design'))
+        self.client_user = User.objects.create(username='client', email='client@example.com', user_type=1)
+        self.task = Task.objects.create(title='API', description='x', client=self.client_user, budget=2000)
+        self.task.skills_required.set([self.python, self.sql])
+
+    def ranked(self):
+        return [p.user.username for p in recommender.recommend_freelancers(self.task)]
+
+    def test_ranks_by_overlap_budget_and_tier(self):
+        make_profile('full', [self.python, self.sql], hourly_rate=50)
+        make_profile('half_expert', [self.python], tier='EXPERT', hourly_rate=50)
+        make_profile('half', [self.sql], hourly_rate=50)
+        make_profile('pricey', [self.python, self.sql], hourly_rate=500)
+        make_profile('designer', [self.design])
+
+        self.assertEqual(self.ranked(), ['full', 'half_expert', 'pricey', 'half'])
+
+    def test_profile_changes_are_picked_up_incrementally(self):
+        make_profile('first', [self.python])
+        later = make_profile('later', [self.design])
+        self.assertEqual(self.ranked(), ['first'])
+        built_at = recommender.matrix.built_at
+
+        later.skills.add(self.python, self.sql)
+        newcomer = make_profile('newcomer', [self.sql])
+        self.assertEqual(self.ranked(), ['later', 'first', 'newcomer'])
+
+        newcomer.delete()
+        self.assertEqual(self.ranked(), ['later', 'first'])
+        self.assertEqual(recommender.matrix.built_at, built_at)
+
+    def test_client_page_lists_recommendations(self):
+        make_profile('full', [self.python, self.sql])
+        self.client.force_login(self.client_user)
+        response = self.client.get(f'/clients/freelancers/?task={self.task.pk}')
+        self.assertContains(response, 'full')
+
+    def test_client_page_rejects_bad_task_ids(self):
+        self.client.force_login(self.client_user)
+        for task in ('abc', '1.5', '99999999999999999999999'):
+            with self.subTest(task=task):
+                self.assertEqual(self.client.get('/clients/freelancers/', {'task': task}).status_code, 404)
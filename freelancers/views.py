@@ -3,6 +3,7 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from .models import FreelancerProfile
 from .forms import FreelancerProfileForm # Import the new form
+from invoices import revenue
 
 
 # --- Custom Decorator ---
@@ -43,7 +44,9 @@ def dashboard_view(request):
         'title': 'Freelancer Dashboard',
         'profile': profile,
         'completed_tasks': 12, # Placeholder metric
-        'current_balance': 4500.00, # Placeholder metric
+        # Read from the monthly revenue rollup (a few rows) instead of summing the ledger and invoices
+        'current_balance': revenue.ledger_balance(request.user),
+        'monthly_invoicing': revenue.monthly_invoicing(request.user),
     }
     return render(request, 'freelancers/dashboard.html', context)
 
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Invoice, InvoiceItem
+from .models import Invoice, InvoiceItem, RecurringInvoice, RecurringInvoiceItem, RevenueRollup
 from .models import Transactions
 # Register your models here.
 
@@ -33,9 +33,17 @@ class InvoiceAdmin(admin.ModelAdmin):
     list_filter = ('status', 'issue_date', 'due_date')
     search_fields = ('invoice_number', 'client__username', 'freelancer__username')
     date_hierarchy = 'issue_date'
+    list_select_related = ('freelancer', 'client')
     
     # Add the InvoiceItemInline to the main Invoice form
     inlines = [InvoiceItemInline]
+
+    def save_formset(self, request, form, formset, change):
+        # Line items are written in batches and the totals recalculated once (see Invoice.save_items)
+        if formset.model is InvoiceItem:
+            form.instance.save_items(formset.save(commit=False), formset.deleted_objects)
+        else:
+            super().save_formset(request, form, formset, change)
     
     # Group fields for better display in the form
     fieldsets = (
@@ -51,4 +59,45 @@ class InvoiceAdmin(admin.ModelAdmin):
             'readonly_fields': ('subtotal', 'total_amount'),
         }),
     )
-    
\ No newline at end of file
+    
+
+
+# -----------------------------------------------
+# Recurring Invoice Templates (issued by manage.py issue_recurring_invoices)
+# -----------------------------------------------
+class RecurringInvoiceItemInline(admin.TabularInline):
+    model = RecurringInvoiceItem
+    fields = ('description', 'quantity', 'unit_price')
+    extra = 1
+
+
+@admin.register(RecurringInvoice)
+class RecurringInvoiceAdmin(admin.ModelAdmin):
+    list_display = ('freelancer', 'client', 'frequency', 'next_issue_date', 'issued_count', 'end_date', 'is_active')
+    list_filter = ('frequency', 'is_active', 'next_issue_date')
+    search_fields = ('client__username', 'freelancer__username')
+    list_select_related = ('freelancer', 'client')
+    readonly_fields = ('issued_count',)
+    inlines = [RecurringInvoiceItemInline]
+
+
+# -----------------------------------------------
+# Monthly Revenue Rollups (read-only; see invoices.revenue)
+# -----------------------------------------------
+@admin.register(RevenueRollup)
+class RevenueRollupAdmin(admin.ModelAdmin):
+    list_display = ('user', 'month', 'kind', 'status', 'count', 'amount')
+    list_filter = ('kind', 'status', 'month')
+    search_fields = ('user__username',)
+    date_hierarchy = 'month'
+    list_select_related = ('user',)
+
+    # Maintained from invoices and transactions; rebuild with manage.py rebuild_revenue_rollups
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
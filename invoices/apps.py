@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class InvoicesConfig(AppConfig):
     name = 'invoices'
+
+    def ready(self):
+        # Keep the monthly revenue rollup current
+        from . import signals  # noqa: F401
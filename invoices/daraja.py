@@ -0,0 +1,84 @@
+# invoices/daraja.py
+"""
+Cached OAuth access tokens for the M-Pesa Daraja API.
+
+A token from /oauth/v1/generate is valid for expires_in seconds (about
+an hour). access_token() keeps it in the cache until EXPIRY_MARGIN seconds
+before then, so an STK push normally makes no token request at all.
+
+Refreshes are single-flight. Within a process, a lock lets one thread
+fetch while the others wait and then read the cached result. Across
+processes, a lock entry taken with cache.add() does the same. That only
+spans processes when the cache is shared (e.g. Redis or memcached). With
+the default LocMemCache each process keeps and refreshes its own token.
+A waiter does not wait longer than LOCK_TIMEOUT for a holder that died;
+it fetches the token itself.
+
+Failed fetches are not cached. invalidate() drops a token that Daraja
+rejected before its expiry.
+"""
+
+import hashlib
+import threading
+import time
+
+import requests
+from django.core.cache import cache
+
+EXPIRY_MARGIN = 60  # seconds before expiry at which a token is no longer handed out
+DEFAULT_LIFETIME = 3599  # when the response has no usable expires_in
+REQUEST_TIMEOUT = 10
+LOCK_TIMEOUT = 15
+POLL_INTERVAL = 0.05
+
+_lock = threading.Lock()
+
+
+def _cache_key(base_url, consumer_key):
+    # Hashed: one token per environment and app, without the key itself in cache keys
+    digest = hashlib.sha256(f'{base_url}|{consumer_key}'.encode()).hexdigest()[:32]
+    return f'invoices:daraja-token:{digest}'
+
+
+def fetch_access_token(base_url, consumer_key, consumer_secret):
+    """ Requests a new token from Daraja and caches it. Returns None if none was issued. """
+    response = requests.get(f'{base_url}/oauth/v1/generate?grant_type=client_credentials',
+                            auth=(consumer_key, consumer_secret), timeout=REQUEST_TIMEOUT)
+    data = response.json()
+    token = data.get('access_token')
+    if token:
+        try:
+            lifetime = int(data.get('expires_in'))
+        except (TypeError, ValueError):
+            lifetime = DEFAULT_LIFETIME
+        if lifetime > EXPIRY_MARGIN:
+            cache.set(_cache_key(base_url, consumer_key), token, lifetime - EXPIRY_MARGIN)
+    return token
+
+
+def access_token(base_url, consumer_key, consumer_secret):
+    """ A valid access token: the cached one, or a new one fetched by a single caller. """
+    key = _cache_key(base_url, consumer_key)
+    token = cache.get(key)
+    if token:
+        return token
+    with _lock:
+        lock_key = f'{key}:lock'
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while True:
+            # Fetched by whoever held the lock before us?
+            token = cache.get(key)
+            if token:
+                return token
+            if cache.add(lock_key, 1, LOCK_TIMEOUT):
+                try:
+                    return fetch_access_token(base_url, consumer_key, consumer_secret)
+                finally:
+                    cache.delete(lock_key)
+            if time.monotonic() >= deadline:
+                return fetch_access_token(base_url, consumer_key, consumer_secret)
+            time.sleep(POLL_INTERVAL)
+
+
+def invalidate(base_url, consumer_key):
+    cache.delete(_cache_key(base_url, consumer_key))
@@ -0,0 +1,103 @@
+# invoices/export.py
+"""
+Streaming CSV export of invoices and their line items.
+
+One CSV row per line item, with the invoice's columns repeated. An invoice
+without items gets one row with empty item columns. Invoices are read as
+tuples with .iterator(chunk_size), so only one chunk is in memory at a
+time, and each chunk's items are prefetched with one query. Rows are
+encoded into text blocks of BLOCK_ROWS rows. Those blocks are what
+StreamingHttpResponse sends and what the export_invoices command writes,
+so memory stays flat however long the export is.
+
+Text cells (descriptions, task titles, usernames) are user input. One
+that starts like a formula (=, +, -, @, tab or CR) is written with a
+leading ' so spreadsheet applications show it instead of evaluating it.
+"""
+
+import csv
+import io
+from collections import defaultdict
+from itertools import islice
+
+from .models import Invoice, InvoiceItem
+
+CHUNK_SIZE = 2000  # invoices per read (and per item prefetch)
+BLOCK_ROWS = 500  # CSV rows per streamed block
+
+HEADER = (
+    'invoice_number', 'status', 'issue_date', 'due_date', 'freelancer', 'client', 'task',
+    'item_description', 'quantity', 'unit_price', 'item_total',
+    'subtotal', 'tax_rate', 'total_amount',
+)
+NO_ITEM = ('', '', '', '')
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+INVOICE_COLUMNS = (
+    'pk', 'invoice_number', 'status', 'issue_date', 'due_date', 'freelancer__username', 'client__username',
+    'task__title', 'subtotal', 'tax_rate', 'total_amount',
+)
+ITEM_COLUMNS = ('invoice_id', 'description', 'quantity', 'unit_price', 'total_price')
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def rows(invoices, chunk_size=CHUNK_SIZE):
+    """ The export's data rows (tuples, without the header) for `invoices`, in issue order. """
+    status_names = dict(Invoice.STATUS_CHOICES)
+    invoice_rows = invoices.order_by('issue_date', 'pk').values_list(*INVOICE_COLUMNS).iterator(chunk_size=chunk_size)
+    for chunk in _chunks(invoice_rows, chunk_size):
+        # The chunk's items in one query, as tuples: model instances would cost more than the CSV encoding
+        items = defaultdict(list)
+        for invoice_id, *item in (InvoiceItem.objects.filter(invoice_id__in=[row[0] for row in chunk])
+                                  .order_by('invoice_id', 'pk').values_list(*ITEM_COLUMNS)):
+            items[invoice_id].append(tuple(item))
+        for pk, number, status, issued, due, freelancer, client, task, subtotal, tax_rate, total in chunk:
+            head = (number, status_names[status], issued, due, freelancer, client, task or '')
+            tail = (subtotal, tax_rate, total)
+            for item in items.get(pk) or (NO_ITEM,):
+                yield head + item + tail
+
+
+def _escape(cell):
+    # Numbers and dates are not str, so a negative amount is not escaped
+    if isinstance(cell, str) and cell.startswith(FORMULA_PREFIXES):
+        return "'" + cell
+    return cell
+
+
+def csv_blocks(data_rows, block_rows=BLOCK_ROWS):
+    """ Encodes the header and `data_rows` as CSV text (formulas escaped), BLOCK_ROWS rows per yielded string. """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(HEADER)
+    pending = 1
+    for row in data_rows:
+        writer.writerow([_escape(cell) for cell in row])
+        pending += 1
+        if pending >= block_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if pending:
+        yield buffer.getvalue()
+
+
+def write_csv(invoices, out, chunk_size=CHUNK_SIZE):
+    """ Writes the export of `invoices` to the text stream `out`. Returns the number of data rows. """
+    count = 0
+
+    def counted(data_rows):
+        nonlocal count
+        for row in data_rows:
+            count += 1
+            yield row
+
+    for block in csv_blocks(counted(rows(invoices, chunk_size))):
+        out.write(block)
+    return count
@@ -1,6 +1,6 @@
 from django import forms
 from django.forms.models import inlineformset_factory
-from .models import Invoice, InvoiceItem
+from .models import Invoice, InvoiceItem, RecurringInvoice
 
 # -----------------------------------------------
 # 1. Main Invoice Form
@@ -8,8 +8,9 @@ from .models import Invoice, InvoiceItem
 class InvoiceForm(forms.ModelForm):
     class Meta:
         model = Invoice
-        # Fields the freelancer needs to set manually
-        fields = ['client', 'invoice_number', 'issue_date', 'due_date', 'tax_rate', 'task']
+        # Fields the freelancer needs to set manually; invoice_number is allocated
+        # by the server (see invoices.numbering)
+        fields = ['client', 'issue_date', 'due_date', 'tax_rate', 'task']
         widgets = {
             # Use date picker for a better UX
             'issue_date': forms.DateInput(attrs={'type': 'date'}),
@@ -35,4 +36,39 @@ InvoiceItemFormSet = inlineformset_factory(
     fields=('description', 'quantity', 'unit_price'),
     extra=1,             # Start with 1 empty item
     can_delete=True
-)
\ No newline at end of file
+)
+
+
+# -----------------------------------------------
+# 2b. Recurrence (optional part of the create form)
+# -----------------------------------------------
+class RecurrenceForm(forms.Form):
+    """
+    Turns a new invoice into the first of a series (see invoices.recurring).
+    """
+    repeat = forms.ChoiceField(
+        choices=(('', 'Does not repeat'),) + RecurringInvoice.FREQUENCY_CHOICES,
+        required=False,
+    )
+    repeat_until = forms.DateField(required=False, label="Repeat until", widget=forms.DateInput(attrs={'type': 'date'}))
+
+
+# -----------------------------------------------
+# 3. Invoice List Filters
+# -----------------------------------------------
+class InvoiceFilterForm(forms.Form):
+    """
+    GET form for the invoice list (see invoices.listing).
+    """
+    role = forms.ChoiceField(
+        choices=(('', 'Issued and received'), ('issued', 'Issued by me'), ('received', 'Received')),
+        required=False,
+    )
+    status = forms.TypedChoiceField(
+        choices=(('', 'Any status'),) + Invoice.STATUS_CHOICES,
+        coerce=int,
+        empty_value=None,
+        required=False,
+    )
+    issued_from = forms.DateField(required=False, label="Issued from", widget=forms.DateInput(attrs={'type': 'date'}))
+    issued_to = forms.DateField(required=False, label="Issued to", widget=forms.DateInput(attrs={'type': 'date'}))
@@ -0,0 +1,89 @@
+# invoices/listing.py
+"""
+The invoice list: one user's issued and received invoices, filtered, with
+outstanding/paid sums.
+
+The rows are one query: freelancer = user OR client = user. Each side of
+the OR is an index search on its party column, and only that user's rows
+are sorted; filtering to one role walks the (party, -issue_date,
+invoice_number) index in page order and stops at the page. The sums ride
+along in the same statement as uncorrelated scalar subqueries over the
+filtered set (not the page), which the database evaluates once. A page's
+rows therefore carry the totals of the whole filtered list.
+"""
+
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Invoice
+
+OUTSTANDING_STATUSES = (Invoice.STATUS_SENT, Invoice.STATUS_OVERDUE)
+AMOUNT = DecimalField(max_digits=14, decimal_places=2)
+
+ROLE_ISSUED = 'issued'
+ROLE_RECEIVED = 'received'
+
+
+def invoices_for(user, role='', status=None, issued_from=None, issued_to=None):
+    """ The invoices `user` issued and/or received (every invoice for user=None), with the given filters applied. """
+    if user is None:
+        parties = Q()
+    elif role == ROLE_ISSUED:
+        parties = Q(freelancer=user)
+    elif role == ROLE_RECEIVED:
+        parties = Q(client=user)
+    else:
+        parties = Q(freelancer=user) | Q(client=user)
+
+    invoices = Invoice.objects.filter(parties)
+    if status:
+        invoices = invoices.filter(status=status)
+    if issued_from:
+        invoices = invoices.filter(issue_date__gte=issued_from)
+    if issued_to:
+        invoices = invoices.filter(issue_date__lte=issued_to)
+    return invoices
+
+
+def _total(invoices, **aggregate):
+    # Grouping by a constant yields exactly one row: the aggregate over the whole set
+    return Subquery(
+        invoices.order_by().annotate(one=Value(1)).values('one').annotate(**aggregate).values(*aggregate)
+    )
+
+
+def with_summary(invoices):
+    """ Annotates every row with the filtered set's invoice_total, outstanding_total and paid_total. """
+    return invoices.annotate(
+        invoice_total=Coalesce(_total(invoices, n=Count('pk')), 0),
+        outstanding_total=Coalesce(
+            _total(invoices.filter(status__in=OUTSTANDING_STATUSES), s=Sum('total_amount')),
+            Value(Decimal('0.00')), output_field=AMOUNT,
+        ),
+        paid_total=Coalesce(
+            _total(invoices.filter(status=Invoice.STATUS_PAID), s=Sum('total_amount')),
+            Value(Decimal('0.00')), output_field=AMOUNT,
+        ),
+    )
+
+
+def summary(invoices, page, first_page=True):
+    """
+    The totals of the filtered list, read from the page's first row. An
+    empty first page means an empty list; only a cursor past the end of the
+    list needs its own query.
+    """
+    if page.items:
+        first = page.items[0]
+        return {'count': first.invoice_total, 'outstanding': first.outstanding_total, 'paid': first.paid_total}
+    if first_page:
+        return {'count': 0, 'outstanding': Decimal('0.00'), 'paid': Decimal('0.00')}
+    return invoices.aggregate(
+        count=Count('pk'),
+        outstanding=Coalesce(Sum('total_amount', filter=Q(status__in=OUTSTANDING_STATUSES)),
+                             Value(Decimal('0.00')), output_field=AMOUNT),
+        paid=Coalesce(Sum('total_amount', filter=Q(status=Invoice.STATUS_PAID)),
+                      Value(Decimal('0.00')), output_field=AMOUNT),
+    )
@@ -0,0 +1,36 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from invoices import recurring
+
+
+class Command(BaseCommand):
+    help = (
+        "Issues one invoice for every recurring invoice template that is due, in bulk batches. "
+        "Meant to run daily (e.g. from cron); templates that fell behind catch up one period per batch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=recurring.DEFAULT_BATCH_SIZE,
+                            help="Templates issued per transaction.")
+        parser.add_argument('--max-batches', type=int, default=None,
+                            help="Stop after this many batches (the next run picks up the rest).")
+        parser.add_argument('--date', dest='today', type=date.fromisoformat, default=None,
+                            help="Issue what is due on this day (YYYY-MM-DD) instead of today.")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Only report how many templates are due.")
+
+    def handle(self, *args, **options):
+        today = options['today']
+        if options['dry_run']:
+            count = recurring.due_templates(today).count()
+            self.stdout.write(f"{count} recurring invoice templates are due.")
+            return
+
+        run = recurring.issue_due_invoices(
+            batch_size=options['batch_size'], max_batches=options['max_batches'], today=today,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Issued {run.invoices} recurring invoices in {run.batches} batches in {run.elapsed:.2f}s."
+        ))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from invoices import overdue
+
+
+class Command(BaseCommand):
+    help = (
+        "Marks SENT invoices whose due date has passed as OVERDUE, in bounded batches, and emails "
+        "each affected client one reminder digest. Meant to run periodically (e.g. daily from cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=overdue.DEFAULT_BATCH_SIZE,
+                            help="Invoices marked per UPDATE.")
+        parser.add_argument('--max-batches', type=int, default=None,
+                            help="Stop after this many batches (the next run picks up the rest).")
+        parser.add_argument('--backend', default=None,
+                            help="Email backend to use instead of EMAIL_BACKEND.")
+        parser.add_argument('--base-url', default='',
+                            help="Scheme and host prefixed to invoice links, e.g. https://example.com")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Only report how many invoices are past due.")
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = overdue.overdue_sent_invoices().count()
+            self.stdout.write(f"{count} SENT invoices are past their due date.")
+            return
+
+        run = overdue.send_overdue_reminders(
+            batch_size=options['batch_size'], max_batches=options['max_batches'],
+            backend=options['backend'], base_url=options['base_url'].rstrip('/'),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Marked {run.invoices} invoices overdue and sent {run.digests} reminder digests "
+            f"in {run.elapsed:.2f}s."
+        ))
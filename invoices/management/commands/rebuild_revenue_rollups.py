@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from invoices import revenue
+
+
+class Command(BaseCommand):
+    help = (
+        "Regenerates the monthly revenue rollup from invoices and freelancer transactions, "
+        "a batch of users per transaction. Run after loading fixtures or raw data imports."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=revenue.DEFAULT_BATCH_SIZE,
+                            help="Users aggregated per transaction.")
+
+    def handle(self, *args, **options):
+        visited = revenue.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt revenue rollups for {visited} users."))
@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from invoices import rendering
+from invoices.models import Invoice
+
+
+class Command(BaseCommand):
+    help = "Renders missing invoice PDFs ahead of download and removes cached PDFs that are no longer served."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since-days', type=int, default=None,
+                            help="Only render invoices updated in the last N days (default: all).")
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--purge-days', type=int, default=None,
+                            help="Also delete cached PDFs not served for this many days.")
+
+    def handle(self, *args, **options):
+        invoices = Invoice.objects.order_by('pk')
+        if options['since_days'] is not None:
+            invoices = invoices.filter(updated_at__gte=timezone.now() - timedelta(days=options['since_days']))
+        try:
+            checked = rendering.prerender(invoices.values_list('pk', flat=True), batch_size=options['batch_size'])
+        finally:
+            rendering.shutdown_pool()
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} invoices."))
+
+        if options['purge_days'] is not None:
+            removed = rendering.purge_stale_pdfs(timedelta(days=options['purge_days']))
+            self.stdout.write(self.style.SUCCESS(f"Removed {removed} stale PDFs."))
+
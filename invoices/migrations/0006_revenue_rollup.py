@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, DateField, Sum
+from django.db.models.functions import TruncMonth
+
+
+def backfill_rollups(apps, schema_editor):
+    # Same cells as invoices.revenue.source_cells, over every user at once
+    Invoice = apps.get_model('invoices', 'Invoice')
+    Transaction = apps.get_model('freelancers', 'Transaction')
+    RevenueRollup = apps.get_model('invoices', 'RevenueRollup')
+    status_names = {1: 'DRAFT', 2: 'SENT', 3: 'PAID', 4: 'OVERDUE', 5: 'VOID'}
+    cells = []
+    for party, kind in (('freelancer_id', 'ISSUED'), ('client_id', 'RECEIVED')):
+        rows = (Invoice.objects.order_by().annotate(month=TruncMonth('issue_date'))
+                .values_list(party, 'month', 'status').annotate(n=Count('pk'), total=Sum('total_amount')))
+        cells += [RevenueRollup(user_id=user_id, month=month, kind=kind, status=status_names[status], count=n, amount=total)
+                  for user_id, month, status, n, total in rows.iterator()]
+    rows = (Transaction.objects.order_by().annotate(month=TruncMonth('timestamp', output_field=DateField()))
+            .values_list('profile_id', 'month', 'transaction_type', 'status').annotate(n=Count('pk'), total=Sum('amount')))
+    cells += [RevenueRollup(user_id=user_id, month=month, kind=kind, status=status, count=n, amount=total)
+              for user_id, month, kind, status, n, total in rows.iterator()]
+    RevenueRollup.objects.bulk_create(cells, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0005_overdue_index'),
+        ('freelancers', '0002_freelancerprofile_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevenueRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('kind', models.CharField(max_length=20)),
+                ('status', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revenue_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['user', 'month', 'kind', 'status'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'month', 'kind', 'status'), name='revenue_rollup_cell')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
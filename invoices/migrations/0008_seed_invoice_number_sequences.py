@@ -0,0 +1,43 @@
+import re
+
+from django.db import migrations
+
+# The formats of invoices.numbering (FREELANCER_FORMAT, GLOBAL_FORMAT), as patterns
+FREELANCER_NUMBER = re.compile(r'INV-(\d+)-(\d+)')
+GLOBAL_NUMBER = re.compile(r'INV-(\d+)')
+
+
+def seed_sequences(apps, schema_editor):
+    # Numbers typed in by hand before numbering was server-side must never be issued again:
+    # start every scope after the highest existing number in its format
+    Invoice = apps.get_model('invoices', 'Invoice')
+    InvoiceNumberSequence = apps.get_model('invoices', 'InvoiceNumberSequence')
+    highest = {}
+    for number in Invoice.objects.values_list('invoice_number', flat=True).iterator():
+        if match := FREELANCER_NUMBER.fullmatch(number):
+            scope, value = f'freelancer-{int(match[1])}', int(match[2])
+        elif match := GLOBAL_NUMBER.fullmatch(number):
+            scope, value = 'global', int(match[1])
+        else:
+            continue
+        highest[scope] = max(highest.get(scope, 0), value)
+
+    existing = {sequence.scope: sequence for sequence in InvoiceNumberSequence.objects.filter(scope__in=highest)}
+    for scope, value in highest.items():
+        sequence = existing.get(scope)
+        if sequence is None:
+            InvoiceNumberSequence.objects.create(scope=scope, next_value=value + 1)
+        elif sequence.next_value <= value:
+            sequence.next_value = value + 1
+            sequence.save(update_fields=['next_value'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0007_recurring_invoice'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
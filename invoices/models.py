@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Sum
 from django.conf import settings
 from decimal import Decimal
 from tasks.models import Task # CRITICAL: Imports the Task model from the tasks app
@@ -49,6 +50,9 @@ class Invoice(models.Model):
     
     # Optional link to the Task this invoice is for
     task = models.ForeignKey(Task, on_delete=models.SET_NULL, null=True, blank=True)
+    # The template this invoice was issued from (see invoices.recurring)
+    recurring = models.ForeignKey('RecurringInvoice', on_delete=models.SET_NULL, null=True, blank=True,
+                                  related_name='invoices')
 
     ## Invoice Details
     invoice_number = models.CharField(max_length=50, unique=True)
@@ -67,23 +71,66 @@ class Invoice(models.Model):
     
     class Meta:
         ordering = ['-issue_date', 'invoice_number']
+        # Back the keyset-paginated invoice list for both sides of the invoice
+        indexes = [
+            models.Index(fields=['freelancer', '-issue_date', 'invoice_number'], name='invoice_freelancer_date_idx'),
+            models.Index(fields=['client', '-issue_date', 'invoice_number'], name='invoice_client_date_idx'),
+            # Overdue sweep: WHERE status = SENT AND due_date < today
+            models.Index(fields=['status', 'due_date'], name='invoice_status_due_idx'),
+        ]
         verbose_name = 'Invoice'
         verbose_name_plural = 'Invoices'
 
+    # What the revenue rollup (invoices.revenue) counts an invoice under
+    ROLLUP_FIELDS = ('freelancer_id', 'client_id', 'issue_date', 'status', 'total_amount')
+
     def __str__(self):
         return f"Invoice #{self.invoice_number} ({self.get_status_display()})"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what was loaded so invoices.signals can move the invoice between rollup cells
+        instance._loaded_rollup = tuple(instance.__dict__.get(name) for name in cls.ROLLUP_FIELDS)
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Diffs the rollup against the row as stored; imported here as invoices.revenue imports this module
+        from invoices.revenue import save_against_stored
+        save_against_stored(self, super().save, *args, **kwargs)
     
     # Method to calculate total based on items (called by InvoiceItem's save method)
     def calculate_totals(self):
-        # Calculates subtotal from all related items
-        self.subtotal = sum(item.total_price for item in self.items.all())
+        # One aggregate query instead of loading every item
+        self.subtotal = self.items.aggregate(subtotal=Sum('total_price'))['subtotal'] or Decimal('0.00')
         
         # Calculate tax amount
         tax_amount = self.subtotal * self.tax_rate
         
         # Calculate final total
         self.total_amount = self.subtotal + tax_amount
-        self.save()
+        self.save(update_fields=['subtotal', 'total_amount', 'updated_at'])
+
+    def save_items(self, items, deleted=()):
+        """
+        Bulk path for saving many items at once (e.g. an InvoiceItemFormSet
+        saved with commit=False): new items are inserted in one batch,
+        changed ones updated in one batch, `deleted` removed in one DELETE,
+        and the totals recalculated once. InvoiceItem.save() remains the
+        path for single edits.
+        """
+        new, changed = [], []
+        for item in items:
+            item.invoice = self
+            item.total_price = item.compute_total_price()
+            (changed if item.pk else new).append(item)
+
+        deleted_ids = [item.pk for item in deleted if item.pk]
+        if deleted_ids:
+            InvoiceItem.objects.filter(invoice=self, pk__in=deleted_ids).delete()
+        InvoiceItem.objects.bulk_create(new)
+        InvoiceItem.objects.bulk_update(changed, ['description', 'quantity', 'unit_price', 'total_price'])
+        self.calculate_totals()
 
 
 class InvoiceItem(models.Model):
@@ -106,12 +153,118 @@ class InvoiceItem(models.Model):
     def __str__(self):
         return f"{self.description} on Invoice #{self.invoice.invoice_number}"
 
-    def save(self, *args, **kwargs):
+    def compute_total_price(self):
+        return self.quantity * self.unit_price
+
+    def save(self, *args, update_parent=True, **kwargs):
         # 1. Calculate total price before saving the item
-        self.total_price = self.quantity * self.unit_price
+        self.total_price = self.compute_total_price()
         super().save(*args, **kwargs)
         
         # 2. Recalculate the parent invoice totals
-        # Avoids infinite recursion during updates by checking 'update_parent'
-        if not kwargs.get('update_parent', False): 
-            self.invoice.calculate_totals()
\ No newline at end of file
+        # Callers saving several items pass update_parent=False and call calculate_totals() once
+        if update_parent: 
+            self.invoice.calculate_totals()
+
+
+class InvoiceNumberSequence(models.Model):
+    """
+    Next free invoice number of one numbering scope ('global' or
+    'freelancer-<id>'). Processes take numbers from it in blocks; see
+    invoices.numbering.
+    """
+    scope = models.CharField(max_length=50, unique=True)
+    next_value = models.PositiveBigIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.scope}: next {self.next_value}"
+
+
+class RevenueRollup(models.Model):
+    """
+    Count and total of one user's invoices or ledger transactions in one
+    month and status, maintained by invoices.revenue. kind is ISSUED or
+    RECEIVED for invoices (the user as freelancer or as client) and the
+    transaction type (PAYMENT, WITHDRAWAL) for freelancers.Transaction.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='revenue_rollups')
+    month = models.DateField()  # first day of the month
+    kind = models.CharField(max_length=20)
+    status = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['user', 'month', 'kind', 'status']
+        constraints = [
+            # The upsert target of invoices.revenue.apply; also serves WHERE user = ? AND month >= ?
+            models.UniqueConstraint(fields=['user', 'month', 'kind', 'status'], name='revenue_rollup_cell'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.month:%Y-%m} {self.kind} {self.status}: {self.count} / {self.amount}"
+
+
+class RecurringInvoice(models.Model):
+    """
+    A freelancer's invoice template that is issued again every period: the
+    parties, tax rate and line items (RecurringInvoiceItem) of the invoices
+    to create, and when the next one is due. invoices.recurring issues every
+    template whose next_issue_date has come.
+    """
+    FREQUENCY_WEEKLY = 'WEEKLY'
+    FREQUENCY_MONTHLY = 'MONTHLY'
+    FREQUENCY_QUARTERLY = 'QUARTERLY'
+    FREQUENCY_YEARLY = 'YEARLY'
+
+    FREQUENCY_CHOICES = (
+        (FREQUENCY_WEEKLY, 'Weekly'),
+        (FREQUENCY_MONTHLY, 'Monthly'),
+        (FREQUENCY_QUARTERLY, 'Quarterly'),
+        (FREQUENCY_YEARLY, 'Yearly'),
+    )
+
+    client = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recurring_invoices_to')
+    freelancer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recurring_invoices_by')
+    task = models.ForeignKey(Task, on_delete=models.SET_NULL, null=True, blank=True)
+    tax_rate = models.DecimalField(max_digits=5, decimal_places=2, default=0.00)
+
+    ## Schedule
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES, default=FREQUENCY_MONTHLY)
+    # Periods are counted from start_date, so a template started on the 31st stays on month ends
+    start_date = models.DateField()
+    end_date = models.DateField(null=True, blank=True)
+    next_issue_date = models.DateField()
+    issued_count = models.PositiveIntegerField(default=0)
+    # Days between an issued invoice's issue_date and its due_date
+    due_days = models.PositiveSmallIntegerField(default=14)
+    is_active = models.BooleanField(default=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['next_issue_date', 'pk']
+        indexes = [
+            # The issuing run: WHERE is_active AND next_issue_date <= today
+            models.Index(fields=['is_active', 'next_issue_date'], name='recurring_due_idx'),
+        ]
+        verbose_name = 'Recurring Invoice'
+        verbose_name_plural = 'Recurring Invoices'
+
+    def __str__(self):
+        return f"{self.get_frequency_display()} invoice to {self.client} (next {self.next_issue_date})"
+
+
+class RecurringInvoiceItem(models.Model):
+    recurring = models.ForeignKey(RecurringInvoice, on_delete=models.CASCADE, related_name='items')
+    description = models.CharField(max_length=255)
+    quantity = models.DecimalField(max_digits=10, decimal_places=2)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        verbose_name = 'Recurring Invoice Item'
+        verbose_name_plural = 'Recurring Invoice Items'
+
+    def __str__(self):
+        return self.description
@@ -0,0 +1,174 @@
+# invoices/numbering.py
+"""
+Server-side invoice numbers.
+
+Numbers come from InvoiceNumberSequence rows: one per freelancer
+('freelancer-<id>', formatted INV-<freelancer id>-00001) or, with
+INVOICE_NUMBER_PER_FREELANCER off, a single 'global' row (INV-000001).
+
+A process does not touch the counter row for every invoice. It reserves a
+block of INVOICE_NUMBER_BLOCK_SIZE numbers with one UPDATE and hands them out
+from memory. Each reservation is committed on its own, so two processes can
+never hold the same block, and the row is written once per block, not once
+per invoice.
+
+Gaps are bounded. A process that stops holds at most one unused block per
+scope, and release() gives that block back when nobody has reserved past
+it. Inside a transaction (e.g. in tests) exactly one number is taken, and
+it rolls back with the caller, because a block reserved there would be
+undone on rollback while this process kept issuing it.
+
+Sequences start after the highest number of their format that existed
+when numbering became server-side (migration 0008). Numbers can still be
+typed in by hand (e.g. in the admin), so both paths skip a number that an
+invoice already has instead of failing on the unique column.
+
+Bulk issuing (invoices.recurring) bypasses the allocator: next_numbers()
+reserves exactly the numbers a batch needs inside the batch's transaction,
+so a failed batch gives them back. reserve_many() reserves for many
+scopes with one UPDATE per distinct block size, so a batch spread over
+many freelancers still costs a couple of queries.
+"""
+
+import atexit
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import F
+
+from .models import Invoice, InvoiceNumberSequence
+
+GLOBAL_SCOPE = 'global'
+GLOBAL_FORMAT = 'INV-{number:06d}'
+FREELANCER_FORMAT = 'INV-{freelancer_id}-{number:05d}'
+# Scopes (or invoice numbers) per query, keeping its parameters under SQLite's limit
+SCOPES_PER_QUERY = 500
+
+
+def scope_for(freelancer_id):
+    return f'freelancer-{freelancer_id}' if settings.INVOICE_NUMBER_PER_FREELANCER else GLOBAL_SCOPE
+
+
+def format_number(number, freelancer_id):
+    if settings.INVOICE_NUMBER_PER_FREELANCER:
+        return FREELANCER_FORMAT.format(freelancer_id=freelancer_id, number=number)
+    return GLOBAL_FORMAT.format(number=number)
+
+
+def reserve(scope, size):
+    """ Takes the next `size` numbers of `scope`. Returns the range as (first, end). """
+    return reserve_many({scope: size})[scope]
+
+
+def reserve_many(sizes):
+    """ reserve() for several scopes at once: {scope: size} -> {scope: (first, end)}. """
+    ranges = {}
+    pending = dict(sizes)
+    while pending:
+        by_size = defaultdict(list)
+        for scope, size in pending.items():
+            by_size[size].append(scope)
+        with transaction.atomic():
+            # One UPDATE per distinct size (a batch mostly needs the same count from every scope),
+            # then one read; the UPDATEs lock the rows, so the read sees exactly our increments
+            for size, scopes in by_size.items():
+                for chunk in _chunks(scopes):
+                    InvoiceNumberSequence.objects.filter(scope__in=chunk).update(next_value=F('next_value') + size)
+            for chunk in _chunks(list(pending)):
+                for scope, end in InvoiceNumberSequence.objects.filter(scope__in=chunk).values_list('scope', 'next_value'):
+                    size = pending.pop(scope)
+                    ranges[scope] = (end - size, end)
+        if not pending:
+            break
+        try:
+            with transaction.atomic():
+                InvoiceNumberSequence.objects.bulk_create([
+                    InvoiceNumberSequence(scope=scope, next_value=1 + size) for scope, size in pending.items()
+                ])
+            ranges.update((scope, (1, 1 + size)) for scope, size in pending.items())
+            break
+        except IntegrityError:
+            continue  # another process created one of the rows first; reserve from it
+    return ranges
+
+
+def _chunks(values):
+    return (values[start:start + SCOPES_PER_QUERY] for start in range(0, len(values), SCOPES_PER_QUERY))
+
+
+def _taken(numbers):
+    """ The subset of `numbers` that invoices already have. """
+    return {number for chunk in _chunks(list(numbers))
+            for number in Invoice.objects.filter(invoice_number__in=chunk).values_list('invoice_number', flat=True)}
+
+
+class InvoiceNumberAllocator:
+    """ Hands out invoice numbers from blocks reserved per scope. Thread-safe. """
+
+    def __init__(self, block_size=None):
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._blocks = {}  # scope -> [next number, end of block)
+
+    def allocate(self, scope):
+        if transaction.get_connection().in_atomic_block:
+            # Not under the lock: the caller's transaction keeps the counter row locked until it ends
+            return reserve(scope, 1)[0]
+        with self._lock:
+            block = self._blocks.get(scope)
+            if block is None or block[0] >= block[1]:
+                block = self._blocks[scope] = list(reserve(scope, self.block_size or settings.INVOICE_NUMBER_BLOCK_SIZE))
+            number = block[0]
+            block[0] += 1
+            return number
+
+    def next_number(self, freelancer_id):
+        while True:
+            number = format_number(self.allocate(scope_for(freelancer_id)), freelancer_id)
+            if not _taken([number]):
+                return number
+
+    def release(self):
+        """ Returns unused numbers to their sequences where no later block was reserved. """
+        with self._lock:
+            for scope, (next_value, end) in self._blocks.items():
+                if next_value < end:
+                    InvoiceNumberSequence.objects.filter(scope=scope, next_value=end).update(next_value=next_value)
+            self._blocks.clear()
+
+
+# One per process
+allocator = InvoiceNumberAllocator()
+
+
+@atexit.register
+def _release_on_exit():
+    try:
+        allocator.release()
+    except DatabaseError:
+        pass  # the database is already gone; the unused block stays a gap
+
+
+def next_invoice_number(freelancer_id):
+    return allocator.next_number(freelancer_id)
+
+
+def next_numbers(freelancer_ids):
+    """ One free invoice number per entry of `freelancer_ids`, in order, with one reservation per scope. """
+    scopes = {scope_for(freelancer_id): freelancer_id for freelancer_id in freelancer_ids}
+    needed = Counter(scope_for(freelancer_id) for freelancer_id in freelancer_ids)
+    free = defaultdict(list)
+    while needed:
+        drawn = {scope: [format_number(n, scopes[scope]) for n in range(*block)]
+                 for scope, block in reserve_many(needed).items()}
+        # Numbers already in use are replaced from a fresh reservation, which comes after them
+        taken = _taken(number for block in drawn.values() for number in block)
+        for scope, block in drawn.items():
+            numbers = [number for number in block if number not in taken]
+            free[scope].extend(numbers)
+            needed[scope] -= len(numbers)
+        needed = +needed
+    numbers = {scope: iter(block) for scope, block in free.items()}
+    return [next(numbers[scope_for(freelancer_id)]) for freelancer_id in freelancer_ids]
@@ -0,0 +1,143 @@
+# invoices/overdue.py
+"""
+Marks SENT invoices past their due_date as OVERDUE, in bounded batches, and
+sends each affected client one reminder digest.
+
+Each batch finds up to batch_size overdue ids with a range scan on the
+(status, due_date) index, then flips them with one conditional UPDATE (and
+moves them between revenue rollup cells, see invoices.revenue), so
+runtime follows the number of newly overdue invoices, not the size of the
+invoice table. Every invoice marked in a run carries the run's stamp in
+updated_at. After the sweep, one query streams the overdue invoices of the
+clients touched by this run in client order, and one digest per client
+(all of their overdue invoices, oldest first) goes out over a single mail
+connection.
+
+Digests are not retried: if sending fails, the invoices stay OVERDUE and
+the next run only reminds clients with newly overdue invoices.
+"""
+
+import time
+from dataclasses import dataclass
+from itertools import groupby
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Invoice
+from . import revenue
+
+DEFAULT_BATCH_SIZE = 500
+MESSAGE_CHUNK_SIZE = 100
+# Invoices listed in one digest; the rest are summarised as "and N more"
+DIGEST_INVOICE_LIMIT = 20
+
+
+@dataclass
+class OverdueRun:
+    invoices: int = 0
+    digests: int = 0
+    elapsed: float = 0.0
+
+
+def overdue_sent_invoices(today=None):
+    return Invoice.objects.filter(status=Invoice.STATUS_SENT, due_date__lt=today or timezone.localdate())
+
+
+def mark_batch(today, stamp, batch_size=DEFAULT_BATCH_SIZE):
+    """ Marks up to batch_size overdue SENT invoices OVERDUE. Returns how many were marked. """
+    # Read first so the UPDATE is a short write of known rows
+    candidate_ids = list(overdue_sent_invoices(today).order_by().values_list('pk', flat=True)[:batch_size])
+    if not candidate_ids:
+        return 0
+    with transaction.atomic():
+        # Re-check status: an invoice may have been paid or voided meanwhile
+        marked = Invoice.objects.filter(pk__in=candidate_ids, status=Invoice.STATUS_SENT).update(
+            status=Invoice.STATUS_OVERDUE, updated_at=stamp,
+        )
+        if marked:
+            # update() sends no signals, so move the invoices between revenue rollup cells here
+            revenue.invoice_status_moved(
+                Invoice.objects.filter(pk__in=candidate_ids, status=Invoice.STATUS_OVERDUE, updated_at=stamp).order_by()
+                .values_list('freelancer_id', 'client_id', 'issue_date', 'total_amount'),
+                Invoice.STATUS_SENT, Invoice.STATUS_OVERDUE,
+            )
+    return marked
+
+
+def mark_overdue_invoices(batch_size=DEFAULT_BATCH_SIZE, max_batches=None, today=None, stamp=None):
+    """ Runs mark_batch until nothing is left (or max_batches). Returns the total marked. """
+    today = today or timezone.localdate()
+    stamp = stamp or timezone.now()
+    total = batches = 0
+    while max_batches is None or batches < max_batches:
+        marked = mark_batch(today, stamp, batch_size)
+        if not marked:
+            break
+        total += marked
+        batches += 1
+    return total
+
+
+def reminder_rows(stamp):
+    """ Every OVERDUE invoice of the clients with an invoice marked at `stamp`, in client order. """
+    marked_clients = Invoice.objects.filter(status=Invoice.STATUS_OVERDUE, updated_at=stamp).values('client_id')
+    return (
+        Invoice.objects
+        # client_id + 0 keeps the planner off the client_id index, which would read each client's whole
+        # invoice history; the (status, due_date) index reads only OVERDUE rows
+        .alias(client_key=F('client_id') + 0)
+        .filter(status=Invoice.STATUS_OVERDUE, client_key__in=marked_clients, client__is_active=True)
+        .exclude(client__email='')
+        .select_related('client', 'freelancer')
+        .only('pk', 'invoice_number', 'due_date', 'total_amount', 'client__email', 'client__username',
+              'freelancer__username', 'freelancer__first_name', 'freelancer__last_name')
+        .order_by('client_id', 'due_date', 'pk')
+    )
+
+
+def build_digest(client, invoices, today, base_url):
+    for invoice in invoices:
+        invoice.days_overdue = (today - invoice.due_date).days
+        invoice.digest_url = base_url + reverse('invoices:invoice_detail', args=[invoice.pk])
+    count = len(invoices)
+    shown = invoices[:DIGEST_INVOICE_LIMIT]
+    body = render_to_string('invoices/email/overdue_digest.txt', {
+        'username': client.username,
+        'invoices': shown,
+        'more': count - len(shown),
+        'total': sum(invoice.total_amount for invoice in invoices),
+        'list_url': base_url + reverse('invoices:invoice_list') + f'?role=received&status={Invoice.STATUS_OVERDUE}',
+    })
+    subject = f"{count} overdue invoice{'s' if count != 1 else ''}"
+    return EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL or None, [client.email])
+
+
+def send_overdue_reminders(batch_size=DEFAULT_BATCH_SIZE, max_batches=None, backend=None, base_url='', today=None):
+    """
+    Marks overdue invoices and emails one digest per affected client.
+    Returns an OverdueRun with the invoices marked, digests sent and the
+    elapsed time. `backend` overrides EMAIL_BACKEND.
+    """
+    start = time.perf_counter()
+    today = today or timezone.localdate()
+    stamp = timezone.now()
+    run = OverdueRun(invoices=mark_overdue_invoices(batch_size, max_batches, today, stamp))
+    if run.invoices:
+        with get_connection(backend=backend) as connection:
+            chunk = []
+            for _, rows in groupby(reminder_rows(stamp).iterator(), key=lambda invoice: invoice.client_id):
+                invoices = list(rows)
+                chunk.append(build_digest(invoices[0].client, invoices, today, base_url))
+                if len(chunk) >= MESSAGE_CHUNK_SIZE:
+                    run.digests += connection.send_messages(chunk) or 0
+                    chunk = []
+            if chunk:
+                run.digests += connection.send_messages(chunk) or 0
+    run.elapsed = time.perf_counter() - start
+    return run
@@ -0,0 +1,152 @@
+# invoices/pdf.py
+"""
+Minimal PDF 1.4 writer for invoices.
+
+Text only, in the standard Helvetica and Courier fonts, which every PDF
+viewer provides, so nothing has to be embedded and no third-party library
+is needed. Amounts are set in Courier so they can be right-aligned without
+font metrics.
+
+This module does not import Django: render_invoice() runs in the worker
+processes of invoices.rendering and takes a plain dict (see
+rendering.snapshot()).
+"""
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 50
+LINE_HEIGHT = 16
+ROWS_FIRST_PAGE = 30
+ROWS_PER_PAGE = 44
+DESCRIPTION_CHARS = 58
+
+FONTS = {'F1': 'Helvetica', 'F2': 'Helvetica-Bold', 'F3': 'Courier'}
+COURIER_ADVANCE = 0.6  # Courier glyphs are 600/1000 em wide
+
+
+def _escape(text):
+    text = str(text).replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    return text.encode('latin-1', errors='replace').decode('latin-1')
+
+
+class Page:
+
+    def __init__(self):
+        self.ops = []
+
+    def text(self, x, y, text, font='F1', size=10):
+        self.ops.append(f'BT /{font} {size} Tf {x:.2f} {y:.2f} Td ({_escape(text)}) Tj ET')
+
+    def text_right(self, x, y, text, size=10):
+        """ Courier text ending at x. """
+        self.text(x - len(str(text)) * size * COURIER_ADVANCE, y, text, font='F3', size=size)
+
+    def line(self, x1, y1, x2, y2, width=0.5):
+        self.ops.append(f'{width} w {x1:.2f} {y1:.2f} m {x2:.2f} {y2:.2f} l S')
+
+    def content(self):
+        return '\n'.join(self.ops).encode('latin-1')
+
+
+def build(pages):
+    """ Serializes pages into a complete PDF file (bytes). """
+    objects = []  # index i holds object number i + 1
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(None)
+    page_tree = add(None)
+    font_refs = ' '.join(
+        f'/{name} {add(f"<< /Type /Font /Subtype /Type1 /BaseFont /{base} /Encoding /WinAnsiEncoding >>".encode())} 0 R'
+        for name, base in FONTS.items()
+    )
+    kids = []
+    for page in pages:
+        stream = page.content()
+        content = add(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+        kids.append(add(
+            f'<< /Type /Page /Parent {page_tree} 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] '
+            f'/Resources << /Font << {font_refs} >> >> /Contents {content} 0 R >>'.encode()
+        ))
+    objects[catalog - 1] = f'<< /Type /Catalog /Pages {page_tree} 0 R >>'.encode()
+    objects[page_tree - 1] = (
+        f'<< /Type /Pages /Kids [{" ".join(f"{k} 0 R" for k in kids)}] /Count {len(kids)} >>'.encode()
+    )
+
+    out = bytearray(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    out += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    out += b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, catalog, xref)
+    return bytes(out)
+
+
+def _paginate(items):
+    pages = [items[:ROWS_FIRST_PAGE]]
+    rest = items[ROWS_FIRST_PAGE:]
+    while rest:
+        pages.append(rest[:ROWS_PER_PAGE])
+        rest = rest[ROWS_PER_PAGE:]
+    return pages
+
+
+def render_invoice(data):
+    """ Renders an invoice snapshot (see invoices.rendering.snapshot) to PDF bytes. """
+    right = PAGE_WIDTH - MARGIN
+    columns = (MARGIN, right - 190, right - 95, right)  # description, qty (right edge), unit price, amount
+    chunks = _paginate(data['items'])
+    pages = []
+
+    for index, rows in enumerate(chunks, start=1):
+        page = Page()
+        y = PAGE_HEIGHT - MARGIN
+        if index == 1:
+            page.text(MARGIN, y - 10, 'INVOICE', font='F2', size=22)
+            page.text_right(right, y - 4, data['number'], size=12)
+            page.text_right(right, y - 20, data['status'].upper(), size=10)
+            y -= 50
+            page.text(MARGIN, y, 'From', font='F2')
+            page.text(MARGIN + 260, y, 'Bill to', font='F2')
+            for offset, (ours, theirs) in enumerate(zip(data['freelancer'], data['client']), start=1):
+                page.text(MARGIN, y - offset * 14, ours)
+                page.text(MARGIN + 260, y - offset * 14, theirs)
+            y -= 14 * (len(data['freelancer']) + 2)
+            page.text(MARGIN, y, f"Issued {data['issue_date']}    Due {data['due_date']}")
+            if data['task']:
+                page.text(MARGIN, y - 14, f"Task: {data['task']}"[:90])
+            y -= 40
+        else:
+            page.text(MARGIN, y - 10, f"Invoice {data['number']} (continued)", font='F2', size=12)
+            y -= 40
+
+        page.text(columns[0], y, 'Description', font='F2')
+        for x, label in zip(columns[1:], ('Qty', 'Unit price', 'Amount')):
+            page.text(x - len(label) * 5.5, y, label, font='F2')
+        page.line(MARGIN, y - 5, right, y - 5)
+        y -= LINE_HEIGHT + 4
+        for description, quantity, unit_price, total in rows:
+            if len(description) > DESCRIPTION_CHARS:
+                description = description[:DESCRIPTION_CHARS - 3] + '...'
+            page.text(columns[0], y, description)
+            page.text_right(columns[1], y, quantity)
+            page.text_right(columns[2], y, unit_price)
+            page.text_right(columns[3], y, total)
+            y -= LINE_HEIGHT
+
+        if index == len(chunks):
+            page.line(right - 200, y + 6, right, y + 6)
+            y -= 8
+            totals = (('Subtotal', data['subtotal']), (f"Tax ({data['tax_rate']})", data['tax']),
+                      ('Total (KSh)', data['total_amount']))
+            for label, amount in totals:
+                page.text(right - 200, y, label, font='F2' if label.startswith('Total') else 'F1')
+                page.text_right(right, y, amount)
+                y -= LINE_HEIGHT
+        page.text(MARGIN, MARGIN - 20, f'Page {index} of {len(chunks)}', size=8)
+        pages.append(page)
+    return build(pages)
@@ -0,0 +1,184 @@
+# invoices/recurring.py
+"""
+Issues invoices from recurring templates (RecurringInvoice) in bulk.
+
+A template is due when it is active and its next_issue_date has come
+(and is not past its end_date). Each batch reads up to batch_size due
+templates and their line items, two queries in all. It then moves the
+templates on to their next period with a conditional UPDATE per
+(old date, new date) group and reads back which ones it moved, as
+invoices.overdue does with its stamp. A template another run moved first
+is skipped. The claimed templates get one invoice each, in the same
+transaction:
+
+- numbers are reserved per scope for the whole batch (numbering.next_numbers);
+- subtotal and total are computed once per invoice from the template's items;
+- invoices go in with bulk_create, their items as tuples with one executemany;
+- bulk_create sends no signals, so the revenue rollup gets the batch's
+  deltas with one invoices.revenue.apply() call.
+
+An issued invoice is dated on its period (not on the day the job ran) and
+is SENT. A template that fell several periods behind (e.g. the job did
+not run for a while) gets one invoice per missed period, one per batch.
+"""
+
+import calendar
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Invoice, InvoiceItem, RecurringInvoice, RecurringInvoiceItem
+from . import numbering, revenue
+
+DEFAULT_BATCH_SIZE = 500
+CENT = Decimal('0.01')
+MONTHS = {
+    RecurringInvoice.FREQUENCY_MONTHLY: 1,
+    RecurringInvoice.FREQUENCY_QUARTERLY: 3,
+    RecurringInvoice.FREQUENCY_YEARLY: 12,
+}
+TEMPLATE_COLUMNS = (
+    'pk', 'freelancer_id', 'client_id', 'task_id', 'tax_rate',
+    'frequency', 'start_date', 'next_issue_date', 'issued_count', 'due_days',
+)
+
+
+@dataclass
+class RecurringRun:
+    invoices: int = 0
+    batches: int = 0
+    elapsed: float = 0.0
+
+
+def period_date(start, frequency, n):
+    """ Issue date of period n of a schedule starting on `start` (period 0); month ends are clamped. """
+    if frequency == RecurringInvoice.FREQUENCY_WEEKLY:
+        return start + timedelta(weeks=n)
+    month = start.month - 1 + n * MONTHS[frequency]
+    year, month = start.year + month // 12, month % 12 + 1
+    return start.replace(year=year, month=month, day=min(start.day, calendar.monthrange(year, month)[1]))
+
+
+def due_templates(today=None):
+    today = today or timezone.localdate()
+    return RecurringInvoice.objects.filter(is_active=True, next_issue_date__lte=today).filter(
+        Q(end_date__isnull=True) | Q(end_date__gte=F('next_issue_date'))
+    )
+
+
+def totals(items, tax_rate):
+    """ (item totals, subtotal, total_amount) of (description, quantity, unit_price) items, rounded as stored. """
+    item_totals = [(quantity * unit_price).quantize(CENT) for _, quantity, unit_price in items]
+    subtotal = sum(item_totals, Decimal('0.00'))
+    return item_totals, subtotal, (subtotal + subtotal * tax_rate).quantize(CENT)
+
+
+def _insert_item_sql():
+    qn = connection.ops.quote_name
+    columns = ', '.join(qn(InvoiceItem._meta.get_field(name).column)
+                        for name in ('invoice', 'description', 'quantity', 'unit_price', 'total_price'))
+    return f'INSERT INTO {qn(InvoiceItem._meta.db_table)} ({columns}) VALUES (%s, %s, %s, %s, %s)'
+
+
+def _claim(templates, stamp):
+    """ Moves the templates on one period; returns the ones this call moved (not another run). """
+    groups = defaultdict(list)
+    for template in templates:
+        pk, _, _, _, _, frequency, start, issue_date, issued_count, _ = template
+        groups[issue_date, period_date(start, frequency, issued_count + 1)].append(pk)
+    for (issue_date, next_date), pks in groups.items():
+        RecurringInvoice.objects.filter(pk__in=pks, is_active=True, next_issue_date=issue_date).update(
+            next_issue_date=next_date, issued_count=F('issued_count') + 1, updated_at=stamp,
+        )
+    claimed = set(RecurringInvoice.objects.filter(pk__in=[t[0] for t in templates], updated_at=stamp)
+                  .order_by().values_list('pk', flat=True))
+    return [template for template in templates if template[0] in claimed]
+
+
+def issue_batch(today, stamp, batch_size=DEFAULT_BATCH_SIZE):
+    """ Issues one invoice for each of up to batch_size due templates. Returns how many were issued. """
+    # Read first so the transaction is a short write of known rows
+    templates = list(due_templates(today).order_by('next_issue_date', 'pk').values_list(*TEMPLATE_COLUMNS)[:batch_size])
+    if not templates:
+        return 0
+    items = defaultdict(list)
+    for recurring_id, *item in (RecurringInvoiceItem.objects.filter(recurring_id__in=[t[0] for t in templates])
+                                .order_by('recurring_id', 'pk')
+                                .values_list('recurring_id', 'description', 'quantity', 'unit_price')):
+        items[recurring_id].append(item)
+
+    with transaction.atomic():
+        templates = _claim(templates, stamp)
+        if not templates:
+            return 0
+        numbers = numbering.next_numbers([t[1] for t in templates])
+        invoices, item_totals = [], []
+        for (pk, freelancer_id, client_id, task_id, tax_rate, _, _, issue_date, _, due_days), number in zip(
+            templates, numbers
+        ):
+            line_totals, subtotal, total = totals(items[pk], tax_rate)
+            item_totals.append(line_totals)
+            invoices.append(Invoice(
+                recurring_id=pk, freelancer_id=freelancer_id, client_id=client_id, task_id=task_id,
+                invoice_number=number, issue_date=issue_date, due_date=issue_date + timedelta(days=due_days),
+                status=Invoice.STATUS_SENT, subtotal=subtotal, tax_rate=tax_rate, total_amount=total,
+            ))
+        Invoice.objects.bulk_create(invoices)
+        decimal = connection.ops.adapt_decimalfield_value
+        # Plain tuples through executemany: building an InvoiceItem per row would cost more than the INSERT
+        with connection.cursor() as cursor:
+            cursor.executemany(_insert_item_sql(), [
+                (invoice.pk, description, decimal(quantity, 10, 2), decimal(unit_price, 10, 2), decimal(line_total, 10, 2))
+                for invoice, line_totals in zip(invoices, item_totals)
+                for (description, quantity, unit_price), line_total in zip(items[invoice.recurring_id], line_totals)
+            ])
+        # bulk_create sends no post_save, so count the new invoices in the revenue rollup here
+        revenue.apply([
+            delta for invoice in invoices
+            for delta in revenue.invoice_deltas(tuple(getattr(invoice, name) for name in Invoice.ROLLUP_FIELDS), 1)
+        ])
+    return len(invoices)
+
+
+def issue_due_invoices(batch_size=DEFAULT_BATCH_SIZE, max_batches=None, today=None):
+    """ Runs issue_batch until no template is due (or max_batches). Returns a RecurringRun. """
+    start = time.perf_counter()
+    today = today or timezone.localdate()
+    run = RecurringRun()
+    stamp = None
+    while max_batches is None or run.batches < max_batches:
+        # A stamp per batch: a template that is still due is claimed again by a later batch
+        now = timezone.now()
+        stamp = now if stamp is None or now > stamp else stamp + timedelta(microseconds=1)
+        issued = issue_batch(today, stamp, batch_size)
+        if not issued:
+            break
+        run.invoices += issued
+        run.batches += 1
+    run.elapsed = time.perf_counter() - start
+    return run
+
+
+def schedule(invoice, frequency, end_date=None):
+    """ Makes `invoice` (saved, with its items) period 0 of a new template. Returns the template. """
+    template = RecurringInvoice.objects.create(
+        client_id=invoice.client_id, freelancer_id=invoice.freelancer_id, task_id=invoice.task_id,
+        tax_rate=invoice.tax_rate, frequency=frequency, start_date=invoice.issue_date, end_date=end_date,
+        next_issue_date=period_date(invoice.issue_date, frequency, 1), issued_count=1,
+        due_days=max((invoice.due_date - invoice.issue_date).days, 0),
+    )
+    RecurringInvoiceItem.objects.bulk_create([
+        RecurringInvoiceItem(recurring=template, description=description, quantity=quantity, unit_price=unit_price)
+        for description, quantity, unit_price in
+        invoice.items.order_by('pk').values_list('description', 'quantity', 'unit_price')
+    ])
+    # Not a rollup field, so no signal needs to see this
+    Invoice.objects.filter(pk=invoice.pk).update(recurring=template)
+    invoice.recurring = template
+    return template
@@ -0,0 +1,194 @@
+# invoices/rendering.py
+"""
+Invoice PDFs: rendered in a process pool, cached on disk by content hash.
+
+snapshot() reads an invoice and its items (two queries) into a plain dict
+holding everything that appears on the document. The SHA-256 of that dict
+(plus RENDERER_VERSION) names the cached file:
+
+    INVOICE_PDF_ROOT/ab/abcdef....pdf
+
+A download whose hash the client already has (If-None-Match) is answered
+from the snapshot alone, without touching the cache. One whose hash is
+already on disk is a file serve. Any edit
+(items, totals, status, the parties' names) changes the hash, so a stale
+PDF is never served and nothing has to be invalidated. Files that have
+not been served for a while are removed by purge_stale_pdfs().
+
+Missing PDFs are rendered by invoices.pdf.render_invoice in a
+ProcessPoolExecutor of INVOICE_PDF_WORKERS processes, off the web worker's
+interpreter. Concurrent requests for the same document share one render.
+With INVOICE_PDF_WORKERS = 0 rendering happens inline.
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+
+from .models import Invoice
+from .pdf import render_invoice
+
+# Bump when the layout changes so cached documents are re-rendered
+RENDERER_VERSION = 1
+RENDER_TIMEOUT = 60  # seconds
+
+_pool = None
+_pool_lock = threading.Lock()
+_in_flight = {}  # content hash -> Future, so concurrent downloads share a render
+
+
+def _party(user):
+    name = user.get_full_name() or user.username
+    return [name, user.email]
+
+
+def snapshot(invoice):
+    """ The printable content of `invoice` as a plain, picklable dict. """
+    items = [
+        [description, str(quantity), str(unit_price), str(total_price)]
+        for description, quantity, unit_price, total_price in invoice.items.order_by('pk').values_list(
+            'description', 'quantity', 'unit_price', 'total_price',
+        )
+    ]
+    return {
+        'number': invoice.invoice_number,
+        'status': invoice.get_status_display(),
+        'issue_date': invoice.issue_date.isoformat(),
+        'due_date': invoice.due_date.isoformat(),
+        'freelancer': _party(invoice.freelancer),
+        'client': _party(invoice.client),
+        'task': invoice.task.title if invoice.task_id else '',
+        'items': items,
+        'tax_rate': str(invoice.tax_rate),
+        'subtotal': str(invoice.subtotal),
+        'tax': str(invoice.total_amount - invoice.subtotal),
+        'total_amount': str(invoice.total_amount),
+    }
+
+
+def content_hash(data):
+    payload = json.dumps([RENDERER_VERSION, data], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def cache_path(digest):
+    return os.path.join(settings.INVOICE_PDF_ROOT, digest[:2], f'{digest}.pdf')
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a process that holds DB connections and threads is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.INVOICE_PDF_WORKERS, mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+    with os.fdopen(fd, 'wb') as fh:
+        fh.write(content)
+    # Atomic: readers see either no file or the whole document
+    os.replace(tmp, path)
+
+
+def render_many(snapshots):
+    """ Renders the uncached snapshots through the pool. Returns {hash: path} for all of them. """
+    paths, pending = {}, {}
+    for data in snapshots:
+        digest = content_hash(data)
+        paths[digest] = cache_path(digest)
+        if not os.path.exists(paths[digest]):
+            pending[digest] = data
+    if not pending:
+        return paths
+
+    if settings.INVOICE_PDF_WORKERS:
+        pool = _get_pool()
+        owned, futures = set(), {}
+        with _pool_lock:
+            for digest, data in pending.items():
+                if digest not in _in_flight:
+                    _in_flight[digest] = pool.submit(render_invoice, data)
+                    owned.add(digest)
+                futures[digest] = _in_flight[digest]
+        try:
+            for digest, future in futures.items():
+                # Requests sharing a render all write the same bytes; each replace is atomic
+                _write(paths[digest], future.result(timeout=RENDER_TIMEOUT))
+        finally:
+            with _pool_lock:
+                for digest in owned:
+                    _in_flight.pop(digest, None)
+    else:
+        for digest, data in pending.items():
+            _write(paths[digest], render_invoice(data))
+    return paths
+
+
+def open_pdf(data, digest=None):
+    """ Opens the PDF of snapshot `data` (content hash `digest`) for reading, rendering it if needed. """
+    digest = digest or content_hash(data)
+    while True:
+        path = render_many([data])[digest]
+        try:
+            fh = open(path, 'rb')
+        except FileNotFoundError:
+            # purge_stale_pdfs() removed it after render_many() found it: render it again
+            continue
+        # Served files stay fresh for purge_stale_pdfs(); the open file outlives a purge anyway
+        os.utime(fh.fileno())
+        return fh
+
+
+def invoice_pdf(invoice):
+    """
+    Returns (path, content hash) of the PDF for `invoice`, rendering it if
+    this content has not been rendered before. `invoice` should come with
+    client, freelancer and task selected.
+    """
+    data = snapshot(invoice)
+    digest = content_hash(data)
+    with open_pdf(data, digest) as fh:
+        return fh.name, digest
+
+
+def prerender(invoice_ids, batch_size=200):
+    """ Renders the PDFs of the given invoices in batches through the pool. Returns how many were checked. """
+    invoice_ids = list(invoice_ids)
+    for start in range(0, len(invoice_ids), batch_size):
+        invoices = (Invoice.objects.filter(pk__in=invoice_ids[start:start + batch_size])
+                    .select_related('client', 'freelancer', 'task'))
+        render_many([snapshot(invoice) for invoice in invoices])
+    return len(invoice_ids)
+
+
+def purge_stale_pdfs(older_than):
+    """ Deletes cached PDFs not served for `older_than` (a timedelta). Returns how many were removed. """
+    cutoff = time.time() - older_than.total_seconds()
+    removed = 0
+    for directory, _, files in os.walk(settings.INVOICE_PDF_ROOT):
+        for name in files:
+            path = os.path.join(directory, name)
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+    return removed
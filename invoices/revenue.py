@@ -0,0 +1,289 @@
+# invoices/revenue.py
+"""
+Monthly revenue rollups (RevenueRollup): per (user, month, kind, status),
+the number of invoices or ledger transactions and their total amount.
+
+An invoice is counted twice, in the month of its issue_date: as ISSUED for
+its freelancer and as RECEIVED for its client. A freelancers.Transaction is
+counted once, for its owner, in the month of its timestamp, with its
+transaction_type (PAYMENT, WITHDRAWAL) as the kind.
+
+Writes keep the table current with signed deltas (see invoices.signals).
+An invoice that moves from SENT to PAID leaves one cell and enters
+another. Cells that gain rows are upserted. Every other change is an
+UPDATE of a cell that must already exist, so nothing is re-inserted for a
+user whose cells are being cascade-deleted. As in tasks.bid_stats, every
+write is relative, so concurrent deltas add up. A save is diffed against
+the row as stored, not against what the instance loaded: Invoice.save()
+and Transaction.save() go through save_against_stored(), which reads the
+rollup fields with select_for_update() in the save's transaction. An instance loaded before another writer changed
+the row (e.g. a form loaded while SENT, saved after the overdue sweep) is
+moved out of the cell the row is actually in. On SQLite, which has no row
+locks, a writer that commits between that read and the UPDATE makes the
+save fail with "database is locked" rather than miscount.
+Bulk paths that bypass signals (e.g. invoices.overdue) call apply() themselves.
+
+rebuild() regenerates the table from the source tables in batches of
+users. Each batch is one transaction: delete the users' cells, aggregate
+their invoices and transactions, insert the result.
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, DateField, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from accounts.models import User
+from freelancers.models import Transaction
+from .models import Invoice, RevenueRollup
+
+KIND_ISSUED = 'ISSUED'
+KIND_RECEIVED = 'RECEIVED'
+KIND_PAYMENT = 'PAYMENT'
+KIND_WITHDRAWAL = 'WITHDRAWAL'
+
+# Invoice statuses are stored by name so the table reads the same for both sources
+INVOICE_STATUS_NAMES = {value: label.upper() for value, label in Invoice.STATUS_CHOICES}
+DEFAULT_BATCH_SIZE = 500
+ZERO = Decimal('0.00')
+
+
+def _table_sql():
+    qn = connection.ops.quote_name
+    table = qn(RevenueRollup._meta.db_table)
+    user, month, kind, status, count, amount = (
+        qn(RevenueRollup._meta.get_field(name).column) for name in ('user', 'month', 'kind', 'status', 'count', 'amount')
+    )
+    upsert = (
+        f'INSERT INTO {table} ({user}, {month}, {kind}, {status}, {count}, {amount}) VALUES (%s, %s, %s, %s, %s, %s) '
+        f'ON CONFLICT ({user}, {month}, {kind}, {status}) DO UPDATE SET '
+        f'{count} = {table}.{count} + excluded.{count}, {amount} = {table}.{amount} + excluded.{amount}'
+    )
+    adjust = (
+        f'UPDATE {table} SET {count} = {count} + %s, {amount} = {amount} + %s '
+        f'WHERE {user} = %s AND {month} = %s AND {kind} = %s AND {status} = %s'
+    )
+    return upsert, adjust
+
+
+def month_of(value):
+    """ First day of the (local) month of a date or datetime. """
+    if isinstance(value, datetime):
+        value = timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    return value.replace(day=1)
+
+
+def apply(deltas):
+    """
+    Adds (user id, month, kind, status, count, amount) deltas to the rollup:
+    one upsert for the cells that gain rows, one UPDATE for the rest.
+    """
+    merged = defaultdict(lambda: [0, ZERO])
+    for user_id, month, kind, status, count, amount in deltas:
+        cell = merged[user_id, month, kind, status]
+        cell[0] += count
+        cell[1] += amount
+
+    ops = connection.ops
+    grow, adjust = [], []
+    for (user_id, month, kind, status), (count, amount) in merged.items():
+        if not count and not amount:
+            continue
+        month, amount = ops.adapt_datefield_value(month), ops.adapt_decimalfield_value(amount, 14, 2)
+        if count > 0:
+            grow.append((user_id, month, kind, status, count, amount))
+        else:
+            adjust.append((count, amount, user_id, month, kind, status))
+    if not grow and not adjust:
+        return
+    upsert_sql, adjust_sql = _table_sql()
+    with connection.cursor() as cursor:
+        if grow:
+            cursor.executemany(upsert_sql, grow)
+        if adjust:
+            cursor.executemany(adjust_sql, adjust)
+
+
+# --- Invoices ---
+
+def invoice_deltas(state, sign):
+    """ The two cells an invoice state (Invoice.ROLLUP_FIELDS values) counts in, as signed deltas. """
+    freelancer_id, client_id, issue_date, status, total_amount = state
+    month, status, amount = month_of(issue_date), INVOICE_STATUS_NAMES[status], sign * Decimal(str(total_amount))
+    return [
+        (freelancer_id, month, KIND_ISSUED, status, sign, amount),
+        (client_id, month, KIND_RECEIVED, status, sign, amount),
+    ]
+
+
+def _state(instance):
+    return tuple(getattr(instance, name) for name in instance.ROLLUP_FIELDS)
+
+
+def _loaded(instance):
+    # None when the instance was not loaded with every rollup field (e.g. .only())
+    loaded = getattr(instance, '_loaded_rollup', None)
+    return None if loaded is None or None in loaded else loaded
+
+
+def save_against_stored(instance, save, *args, **kwargs):
+    """
+    Calls `save` (the model's super().save) for an Invoice or Transaction,
+    first replacing the instance's loaded rollup state with the row's
+    ROLLUP_FIELDS as stored, locked until the save's transaction commits.
+    """
+    if instance._state.adding:
+        return save(*args, **kwargs)
+    with transaction.atomic(savepoint=False):
+        stored = (type(instance).objects.select_for_update().filter(pk=instance.pk)
+                  .values_list(*instance.ROLLUP_FIELDS).first())
+        if stored is not None:
+            instance._loaded_rollup = stored
+        return save(*args, **kwargs)
+
+
+def invoice_saved(invoice, created):
+    new = _state(invoice)
+    old = None if created else _loaded(invoice)
+    if created:
+        apply(invoice_deltas(new, 1))
+    elif old is None:
+        # Nothing to diff against: recount the parties from their invoices
+        rebuild_users({invoice.freelancer_id, invoice.client_id})
+    elif old != new:
+        apply(invoice_deltas(old, -1) + invoice_deltas(new, 1))
+    invoice._loaded_rollup = new
+
+
+def invoice_deleted(invoice):
+    apply(invoice_deltas(_loaded(invoice) or _state(invoice), -1))
+
+
+def invoice_status_moved(rows, from_status, to_status):
+    """ Deltas for bulk status changes; rows are (freelancer_id, client_id, issue_date, total_amount). """
+    deltas = []
+    for freelancer_id, client_id, issue_date, total_amount in rows:
+        deltas += invoice_deltas((freelancer_id, client_id, issue_date, from_status, total_amount), -1)
+        deltas += invoice_deltas((freelancer_id, client_id, issue_date, to_status, total_amount), 1)
+    apply(deltas)
+
+
+# --- Ledger transactions ---
+
+def transaction_deltas(state, sign):
+    """ The cell a transaction state (Transaction.ROLLUP_FIELDS values) counts in; a profile's pk is its user's. """
+    user_id, timestamp, transaction_type, status, amount = state
+    return [(user_id, month_of(timestamp), transaction_type, status, sign, sign * Decimal(str(amount)))]
+
+
+def transaction_saved(ledger_entry, created):
+    new = _state(ledger_entry)
+    old = None if created else _loaded(ledger_entry)
+    if created:
+        apply(transaction_deltas(new, 1))
+    elif old is None:
+        rebuild_users({ledger_entry.profile_id})
+    elif old != new:
+        apply(transaction_deltas(old, -1) + transaction_deltas(new, 1))
+    ledger_entry._loaded_rollup = new
+
+
+def transaction_deleted(ledger_entry):
+    apply(transaction_deltas(_loaded(ledger_entry) or _state(ledger_entry), -1))
+
+
+# --- Rebuild ---
+
+def source_cells(user_ids):
+    """ Every rollup cell of the given users, aggregated from their invoices and transactions. """
+    cells = []
+    for party, kind in (('freelancer_id', KIND_ISSUED), ('client_id', KIND_RECEIVED)):
+        rows = (
+            Invoice.objects.filter(**{f'{party}__in': user_ids}).order_by()
+            .annotate(month=TruncMonth('issue_date'))
+            .values_list(party, 'month', 'status')
+            .annotate(n=Count('pk'), total=Sum('total_amount'))
+        )
+        cells += [(user_id, month, kind, INVOICE_STATUS_NAMES[status], n, total)
+                  for user_id, month, status, n, total in rows]
+    rows = (
+        Transaction.objects.filter(profile_id__in=user_ids).order_by()
+        .annotate(month=TruncMonth('timestamp', output_field=DateField()))
+        .values_list('profile_id', 'month', 'transaction_type', 'status')
+        .annotate(n=Count('pk'), total=Sum('amount'))
+    )
+    cells += list(rows)
+    return cells
+
+
+def rebuild_users(user_ids):
+    """ Replaces the cells of the given users with ones aggregated from the source tables. """
+    user_ids = list(user_ids)
+    with transaction.atomic():
+        RevenueRollup.objects.filter(user_id__in=user_ids).delete()
+        # Through apply()'s executemany: a model-instance bulk_create spends its time in the ORM
+        apply(source_cells(user_ids))
+
+
+def rebuild(batch_size=DEFAULT_BATCH_SIZE):
+    """ Regenerates the whole table, batch_size users per transaction. Returns the number of users visited. """
+    visited = last_pk = 0
+    while True:
+        batch = list(User.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            break
+        rebuild_users(batch)
+        visited += len(batch)
+        last_pk = batch[-1]
+    # Cells of users deleted without cascading (e.g. raw SQL) would otherwise linger
+    RevenueRollup.objects.filter(user_id__gt=last_pk).delete()
+    return visited
+
+
+# --- Reads ---
+
+def monthly_invoicing(user, months=6, today=None):
+    """
+    The user's issued invoices over the last `months` months (oldest
+    first): [{'month', 'count', 'invoiced', 'paid', 'outstanding'}],
+    read from at most months x statuses rollup rows. Drafts and voided
+    invoices are not counted.
+    """
+    first = month_of(today or timezone.localdate())
+    for _ in range(months - 1):
+        first = month_of(first - timedelta(days=1))
+    paid, outstanding = INVOICE_STATUS_NAMES[Invoice.STATUS_PAID], (
+        INVOICE_STATUS_NAMES[Invoice.STATUS_SENT], INVOICE_STATUS_NAMES[Invoice.STATUS_OVERDUE],
+    )
+    rows = (
+        RevenueRollup.objects.filter(user=user, kind=KIND_ISSUED, month__gte=first, status__in=(paid,) + outstanding)
+        .values('month')
+        .annotate(
+            count=Sum('count'), invoiced=Sum('amount'),
+            paid=Sum('amount', filter=Q(status=paid)), outstanding=Sum('amount', filter=Q(status__in=outstanding)),
+        )
+        .order_by('month')
+    )
+    by_month = {row['month']: row for row in rows}
+    summary, month = [], first
+    for _ in range(months):
+        row = by_month.get(month, {})
+        summary.append({
+            'month': month, 'count': row.get('count') or 0, 'invoiced': row.get('invoiced') or ZERO,
+            'paid': row.get('paid') or ZERO, 'outstanding': row.get('outstanding') or ZERO,
+        })
+        month = month_of(month + timedelta(days=32))
+    return summary
+
+
+def ledger_balance(user):
+    """ Payments minus withdrawals, over every month and status (as freelancers.views.balance_view computes it). """
+    totals = dict(
+        RevenueRollup.objects.filter(user=user, kind__in=(KIND_PAYMENT, KIND_WITHDRAWAL))
+        .values_list('kind').annotate(total=Sum('amount')).order_by()
+    )
+    return totals.get(KIND_PAYMENT, ZERO) - totals.get(KIND_WITHDRAWAL, ZERO)
@@ -0,0 +1,38 @@
+# invoices/signals.py
+"""
+Signal receivers that keep the monthly revenue rollup (invoices.revenue) in
+sync with invoices and freelancer ledger transactions.
+Connected in InvoicesConfig.ready().
+"""
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from freelancers.models import Transaction
+from .models import Invoice
+from . import revenue
+
+
+@receiver(post_save, sender=Invoice)
+def update_rollup_on_invoice_save(sender, instance, created, raw=False, **kwargs):
+    # Fixtures are loaded raw; rebuild_revenue_rollups afterwards
+    if raw:
+        return
+    revenue.invoice_saved(instance, created)
+
+
+@receiver(post_delete, sender=Invoice)
+def update_rollup_on_invoice_delete(sender, instance, **kwargs):
+    revenue.invoice_deleted(instance)
+
+
+@receiver(post_save, sender=Transaction)
+def update_rollup_on_transaction_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    revenue.transaction_saved(instance, created)
+
+
+@receiver(post_delete, sender=Transaction)
+def update_rollup_on_transaction_delete(sender, instance, **kwargs):
+    revenue.transaction_deleted(instance)
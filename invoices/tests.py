@@ -1,3 +1,847 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+import csv
+import importlib
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.apps import apps as django_apps
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import User
+from freelancers.models import FreelancerProfile, Transaction
+from FREELANCE.testing import ConcurrencyMixin, QueryBudgetMixin
+from .models import (Invoice, InvoiceItem, InvoiceNumberSequence, RecurringInvoice, RecurringInvoiceItem, RevenueRollup,
+                     Transactions)
+from .numbering import InvoiceNumberAllocator, next_numbers, reserve
+from .overdue import mark_overdue_invoices, send_overdue_reminders
+from . import daraja, export, recurring, rendering, revenue, views
+
+
+class InvoiceViewQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """ The invoice list and detail pages must fit the same query budget with 1 row and with 500. """
+    SIZES = (1, 500)
+
+    def setUp(self):
+        self.freelancer = User.objects.create(username='free', email='free@example.com', user_type=2)
+        self.clients = [
+            User.objects.create(username=f'client{i}', email=f'client{i}@example.com', user_type=1) for i in range(3)
+        ]
+        self.client.force_login(self.freelancer)
+
+    def make_invoices(self, count, prefix):
+        return Invoice.objects.bulk_create([
+            Invoice(client=self.clients[i % 3], freelancer=self.freelancer, invoice_number=f'{prefix}-{i}',
+                    issue_date=date(2026, 1, 1), due_date=date(2026, 2, 1), status=Invoice.STATUS_SENT)
+            for i in range(count)
+        ])
+
+    def test_invoice_list(self):
+        for size in self.SIZES:
+            with self.subTest(invoices=size):
+                self.make_invoices(size, prefix=f'L{size}')
+                # session, user, invoice page (+client, freelancer, summary sums)
+                self.assertViewWithinBudget('/invoices/', 3)
+                self.assertViewWithinBudget(f'/invoices/?role=issued&status={Invoice.STATUS_SENT}', 3)
+
+    def test_invoice_detail(self):
+        for size in self.SIZES:
+            with self.subTest(items=size):
+                invoice = self.make_invoices(1, prefix=f'D{size}')[0]
+                InvoiceItem.objects.bulk_create([
+                    InvoiceItem(invoice=invoice, description=f'Item {i}', quantity=1, unit_price=10, total_price=10)
+                    for i in range(size)
+                ])
+                # session, user, invoice (+client, freelancer, task), items
+                self.assertViewWithinBudget(f'/invoices/{invoice.pk}/', 4)
+
+
+class InvoiceListTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='free', email='free@example.com', user_type=2)
+        self.other = User.objects.create(username='other', email='other@example.com', user_type=1)
+        self.stranger = User.objects.create(username='stranger', email='stranger@example.com', user_type=1)
+        rows = [
+            # (freelancer, client, issued, status, amount)
+            (self.user, self.other, date(2026, 1, 5), Invoice.STATUS_SENT, '100.00'),
+            (self.user, self.other, date(2026, 2, 5), Invoice.STATUS_PAID, '250.00'),
+            (self.user, self.other, date(2026, 3, 5), Invoice.STATUS_OVERDUE, '40.00'),
+            (self.other, self.user, date(2026, 2, 20), Invoice.STATUS_PAID, '75.50'),
+            (self.other, self.stranger, date(2026, 2, 1), Invoice.STATUS_PAID, '999.00'),
+        ]
+        Invoice.objects.bulk_create([
+            Invoice(freelancer=freelancer, client=client, invoice_number=f'L-{i}', issue_date=issued,
+                    due_date=issued, status=status, subtotal=Decimal(amount), total_amount=Decimal(amount))
+            for i, (freelancer, client, issued, status, amount) in enumerate(rows)
+        ])
+        self.client.force_login(self.user)
+
+    def get(self, **params):
+        response = self.client.get('/invoices/', params)
+        self.assertEqual(response.status_code, 200)
+        return [invoice.invoice_number for invoice in response.context['invoices']], response.context['summary']
+
+    def test_lists_issued_and_received_with_sums(self):
+        numbers, summary = self.get()
+        self.assertEqual(numbers, ['L-2', 'L-3', 'L-1', 'L-0'])
+        self.assertEqual(summary, {'count': 4, 'outstanding': Decimal('140.00'), 'paid': Decimal('325.50')})
+
+    def test_filters(self):
+        self.assertEqual(self.get(role='received')[0], ['L-3'])
+        self.assertEqual(self.get(role='issued', status=Invoice.STATUS_PAID)[0], ['L-1'])
+        numbers, summary = self.get(issued_from='2026-02-01', issued_to='2026-02-28')
+        self.assertEqual(numbers, ['L-3', 'L-1'])
+        self.assertEqual(summary['paid'], Decimal('325.50'))
+        self.assertEqual(summary['outstanding'], Decimal('0.00'))
+
+    def test_invalid_filters_are_ignored(self):
+        self.assertEqual(len(self.get(status='bogus', issued_from='yesterday')[0]), 4)
+
+    def test_sums_cover_every_page(self):
+        Invoice.objects.bulk_create([
+            Invoice(freelancer=self.user, client=self.other, invoice_number=f'P-{i:02d}', issue_date=date(2025, 1, 1),
+                    due_date=date(2025, 1, 1), status=Invoice.STATUS_SENT, total_amount=Decimal('10.00'))
+            for i in range(30)
+        ])
+        first = self.client.get('/invoices/')
+        second = self.client.get('/invoices/', {'cursor': first.context['page'].next_cursor})
+        self.assertEqual(len(first.context['invoices']), 25)
+        for response in (first, second):
+            self.assertEqual(response.context['summary']['count'], 34)
+            self.assertEqual(response.context['summary']['outstanding'], Decimal('440.00'))
+
+    def test_empty_list_has_zero_sums(self):
+        numbers, summary = self.get(status=Invoice.STATUS_DRAFT)
+        self.assertEqual(numbers, [])
+        self.assertEqual(summary, {'count': 0, 'outstanding': Decimal('0.00'), 'paid': Decimal('0.00')})
+
+
+class InvoiceTotalsTests(QueryBudgetMixin, TestCase):
+
+    def setUp(self):
+        self.freelancer = User.objects.create(username='free', email='free@example.com', user_type=2)
+        self.client_user = User.objects.create(username='client', email='client@example.com', user_type=1)
+        self.invoice = Invoice.objects.create(
+            client=self.client_user, freelancer=self.freelancer, invoice_number='INV-1',
+            issue_date=date(2026, 1, 1), due_date=date(2026, 2, 1), tax_rate=Decimal('0.10'),
+        )
+
+    def assertTotals(self, subtotal, total):
+        self.invoice.refresh_from_db()
+        self.assertEqual((self.invoice.subtotal, self.invoice.total_amount), (Decimal(subtotal), Decimal(total)))
+
+    def test_save_items_inserts_updates_and_deletes_in_batches(self):
+        items = [InvoiceItem(description=f'Item {i}', quantity=2, unit_price=Decimal('12.50')) for i in range(3)]
+        # bulk INSERT, aggregate, locked invoice read, invoice UPDATE, revenue rollup UPDATE
+        with self.assertMaxQueries(5):
+            self.invoice.save_items(items)
+        self.assertTotals('75.00', '82.50')
+
+        first, second, third = self.invoice.items.order_by('pk')
+        first.quantity = 4
+        self.invoice.save_items([first], deleted=[third])
+        self.assertEqual(self.invoice.items.get(pk=first.pk).total_price, Decimal('50.00'))
+        self.assertFalse(self.invoice.items.filter(pk=third.pk).exists())
+        self.assertTotals('75.00', '82.50')
+
+    def test_single_item_save_still_updates_totals(self):
+        item = InvoiceItem.objects.create(invoice=self.invoice, description='Design', quantity=1, unit_price=100)
+        self.assertTotals('100.00', '110.00')
+        item.unit_price = 40
+        item.save()
+        self.assertTotals('40.00', '44.00')
+
+    def test_create_view_saves_many_items_with_constant_queries(self):
+        count = 200
+        data = {
+            'client': self.client_user.pk, 'issue_date': '2026-03-01',
+            'due_date': '2026-04-01', 'tax_rate': '0.00', 'task': '',
+            'items-TOTAL_FORMS': count, 'items-INITIAL_FORMS': 0,
+        }
+        for i in range(count):
+            data.update({f'items-{i}-description': f'Hour {i}', f'items-{i}-quantity': '1', f'items-{i}-unit_price': '15.00'})
+        self.client.force_login(self.freelancer)
+        InvoiceNumberSequence.objects.create(scope=f'freelancer-{self.freelancer.pk}')
+        # client choice checks, session, user, invoice number (savepoint, UPDATE, SELECT: 4, in-use check),
+        # invoice INSERT, rollup upsert, item INSERTs (SQLite batches the 200 rows into 2), aggregate,
+        # locked invoice read, invoice UPDATE, rollup UPDATE, savepoint pair
+        with self.assertMaxQueries(19):
+            response = self.client.post('/invoices/create/', data)
+        invoice = Invoice.objects.get(invoice_number=f'INV-{self.freelancer.pk}-00001')
+        self.assertRedirects(response, f'/invoices/{invoice.pk}/', fetch_redirect_response=False)
+        self.assertEqual(invoice.items.count(), count)
+        self.assertEqual(invoice.total_amount, Decimal('3000.00'))
+
+
+class InvoiceNumberingTests(TestCase):
+
+    def test_numbers_are_sequential_per_freelancer(self):
+        allocator = InvoiceNumberAllocator(block_size=5)
+        self.assertEqual([allocator.next_number(7) for _ in range(2)], ['INV-7-00001', 'INV-7-00002'])
+        self.assertEqual(allocator.next_number(8), 'INV-8-00001')
+
+    @override_settings(INVOICE_NUMBER_PER_FREELANCER=False)
+    def test_global_scope(self):
+        allocator = InvoiceNumberAllocator()
+        self.assertEqual([allocator.next_number(7), allocator.next_number(8)], ['INV-000001', 'INV-000002'])
+
+    def test_number_taken_in_a_transaction_rolls_back_with_it(self):
+        allocator = InvoiceNumberAllocator(block_size=50)
+        allocator.allocate('global')
+        try:
+            with transaction.atomic():
+                self.assertEqual(allocator.allocate('global'), 2)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(allocator.allocate('global'), 2)
+
+
+class InvoiceNumberCollisionTests(TestCase):
+    """ Hand-typed numbers in the server's format must not make allocation fail. """
+
+    def setUp(self):
+        self.freelancer = User.objects.create(username='free', email='free@example.com', user_type=2)
+        self.client_user = User.objects.create(username='client', email='client@example.com', user_type=1)
+
+    def typed(self, number):
+        return Invoice.objects.create(client=self.client_user, freelancer=self.freelancer, invoice_number=number,
+                                      issue_date=date(2026, 1, 1), due_date=date(2026, 2, 1))
+
+    def test_numbers_in_use_are_skipped(self):
+        pk = self.freelancer.pk
+        self.typed(f'INV-{pk}-00001')
+        self.typed(f'INV-{pk}-00003')
+        self.assertEqual(InvoiceNumberAllocator(block_size=5).next_number(pk), f'INV-{pk}-00002')
+        self.assertEqual(next_numbers([pk, pk]), [f'INV-{pk}-00004', f'INV-{pk}-00005'])
+        self.typed(f'INV-{pk}-00006')
+        self.assertEqual(next_numbers([pk, pk]), [f'INV-{pk}-00007', f'INV-{pk}-00008'])
+
+    def test_recurring_batch_completes_past_a_colliding_number(self):
+        self.typed(f'INV-{self.freelancer.pk}-00001')
+        template = RecurringInvoice.objects.create(client=self.client_user, freelancer=self.freelancer,
+                                                   start_date=date(2026, 3, 1), next_issue_date=date(2026, 3, 1))
+        self.assertEqual(recurring.issue_due_invoices(today=date(2026, 3, 1)).invoices, 1)
+        self.assertEqual(template.invoices.get().invoice_number, f'INV-{self.freelancer.pk}-00002')
+
+    def test_migration_seeds_sequences_past_existing_numbers(self):
+        seed = importlib.import_module('invoices.migrations.0008_seed_invoice_number_sequences').seed_sequences
+        pk = self.freelancer.pk
+        for number in (f'INV-{pk}-00007', f'INV-{pk}-00012', 'INV-000040', 'DRAFT-9', f'INV-{pk}-x'):
+            self.typed(number)
+        InvoiceNumberSequence.objects.create(scope='global', next_value=100)
+        seed(django_apps, None)
+        self.assertEqual(dict(InvoiceNumberSequence.objects.values_list('scope', 'next_value')),
+                         {f'freelancer-{pk}': 13, 'global': 100})
+
+
+class InvoiceNumberContentionTests(ConcurrencyMixin, TransactionTestCase):
+    """
+    Threads with their own allocators (standing in for separate processes)
+    draw numbers from one scope at once, with and without block reservation.
+    No number may be issued twice.
+    """
+    THREADS = 8
+    PER_THREAD = 100
+
+    def draw(self, block_size):
+        def worker(slot):
+            allocator = InvoiceNumberAllocator(block_size=block_size)
+            drawn = [allocator.allocate('global') for _ in range(self.PER_THREAD)]
+            allocator.release()
+            return drawn
+
+        return [number for drawn in self.run_in_threads(worker, self.THREADS) for number in drawn]
+
+    def test_no_duplicates_under_contention(self):
+        total = self.THREADS * self.PER_THREAD
+        for block_size in (1, 20):
+            InvoiceNumberSequence.objects.all().delete()
+            numbers = self.draw(block_size)
+            self.assertEqual(len(numbers), total)
+            self.assertEqual(len(set(numbers)), total)
+            # Every block was used up, so nothing was skipped
+            self.assertEqual(sorted(numbers), list(range(1, total + 1)))
+
+    def test_release_returns_the_unused_tail(self):
+        allocator = InvoiceNumberAllocator(block_size=10)
+        allocator.allocate('global')
+        allocator.release()
+        self.assertEqual(reserve('global', 1), (2, 3))
+
+        allocator.allocate('global')  # reserves 3..12
+        reserve('global', 1)  # someone reserved after it: the tail cannot be returned
+        allocator.release()
+        self.assertEqual(InvoiceNumberSequence.objects.get().next_value, 14)
+
+
+class OverdueInvoiceTests(QueryBudgetMixin, TestCase):
+
+    def setUp(self):
+        self.freelancer = User.objects.create(username='free', email='free@example.com', user_type=2)
+        self.acme = User.objects.create(username='acme', email='acme@example.com', user_type=1)
+        self.bob = User.objects.create(username='bob', email='bob@example.com', user_type=1)
+        self.today = date(2026, 5, 10)
+
+    def make(self, number, client, due, status=Invoice.STATUS_SENT, amount='100.00'):
+        return Invoice.objects.create(client=client, freelancer=self.freelancer, invoice_number=number,
+                                      issue_date=date(2026, 1, 1), due_date=due, status=status,
+                                      total_amount=Decimal(amount))
+
+    def statuses(self):
+        return dict(Invoice.objects.values_list('invoice_number', 'status'))
+
+    def test_only_sent_invoices_past_due_are_marked(self):
+        for i in range(5):
+            self.make(f'OLD-{i}', self.acme, date(2026, 4, 1))
+        self.make('DUE-TODAY', self.acme, self.today)
+        self.make('PAID', self.acme, date(2026, 4, 1), status=Invoice.STATUS_PAID)
+        self.make('DRAFT', self.acme, date(2026, 4, 1), status=Invoice.STATUS_DRAFT)
+
+        self.assertEqual(mark_overdue_invoices(batch_size=2, today=self.today), 5)
+        statuses = self.statuses()
+        self.assertEqual([n for n, s in statuses.items() if s == Invoice.STATUS_OVERDUE], [f'OLD-{i}' for i in range(5)])
+        self.assertEqual(statuses['DUE-TODAY'], Invoice.STATUS_SENT)
+        self.assertEqual(statuses['PAID'], Invoice.STATUS_PAID)
+        self.assertEqual(mark_overdue_invoices(today=self.today), 0)
+
+    def test_batches_are_bounded(self):
+        for i in range(5):
+            self.make(f'OLD-{i}', self.acme, date(2026, 4, 1))
+        # candidate ids, savepoint, UPDATE, marked rows, rollup upsert and UPDATE, release:
+        # per batch, whatever the table size
+        with self.assertMaxQueries(7):
+            self.assertEqual(mark_overdue_invoices(batch_size=3, max_batches=1, today=self.today), 3)
+        self.assertEqual(mark_overdue_invoices(batch_size=3, today=self.today), 2)
+
+    def test_one_digest_per_client(self):
+        self.make('A-1', self.acme, date(2026, 5, 1), amount='40.00')
+        self.make('A-2', self.acme, date(2026, 4, 1), amount='60.00')
+        self.make('A-OLD', self.acme, date(2026, 3, 1), status=Invoice.STATUS_OVERDUE, amount='25.00')
+        self.make('B-1', self.bob, date(2026, 5, 9))
+        self.make('B-LATER', self.bob, date(2026, 6, 1))
+        carol = User.objects.create(username='carol', email='carol@example.com', user_type=1)
+        self.make('C-OLD', carol, date(2026, 3, 1), status=Invoice.STATUS_OVERDUE)
+
+        run = send_overdue_reminders(today=self.today, base_url='https://example.com')
+
+        self.assertEqual((run.invoices, run.digests), (3, 2))
+        by_recipient = {m.to[0]: m for m in mail.outbox}
+        self.assertEqual(set(by_recipient), {'acme@example.com', 'bob@example.com'})
+        acme = by_recipient['acme@example.com']
+        self.assertEqual(acme.subject, '3 overdue invoices')
+        # Oldest first, including invoices that were already overdue
+        self.assertLess(acme.body.index('A-OLD'), acme.body.index('A-2'))
+        self.assertLess(acme.body.index('A-2'), acme.body.index('A-1'))
+        self.assertIn('Total overdue: KSh 125.00', acme.body)
+        self.assertIn('(1 day overdue)', by_recipient['bob@example.com'].body)
+        self.assertNotIn('B-LATER', by_recipient['bob@example.com'].body)
+
+        mail.outbox.clear()
+        self.assertEqual(send_overdue_reminders(today=self.today).digests, 0)
+        self.assertEqual(mail.outbox, [])
+
+
+class RevenueRollupTests(QueryBudgetMixin, TestCase):
+
+    def setUp(self):
+        self.freelancer = User.objects.create(username='free', email='free@example.com', user_type=2)
+        self.client_user = User.objects.create(username='client', email='client@example.com', user_type=1)
+        self.profile = FreelancerProfile.objects.create(user=self.freelancer)
+
+    def make(self, number, issued=date(2026, 3, 15), status=Invoice.STATUS_SENT, amount='100.00'):
+        return Invoice.objects.create(client=self.client_user, freelancer=self.freelancer, invoice_number=number,
+                                      issue_date=issued, due_date=date(2026, 6, 1), status=status,
+                                      total_amount=Decimal(amount))
+
+    def cells(self):
+        return {
+            (row.user_id, row.month, row.kind, row.status): (row.count, row.amount)
+            for row in RevenueRollup.objects.all() if row.count or row.amount
+        }
+
+    def assertMatchesRebuild(self):
+        incremental = self.cells()
+        revenue.rebuild(batch_size=1)
+        self.assertEqual(incremental, self.cells())
+
+    def test_invoice_changes_move_between_cells(self):
+        march = date(2026, 3, 1)
+        invoice = self.make('R-1')
+        self.assertEqual(self.cells(), {
+            (self.freelancer.pk, march, 'ISSUED', 'SENT'): (1, Decimal('100.00')),
+            (self.client_user.pk, march, 'RECEIVED', 'SENT'): (1, Decimal('100.00')),
+        })
+
+        invoice = Invoice.objects.get(pk=invoice.pk)
+        invoice.status = Invoice.STATUS_PAID
+        invoice.save()
+        invoice.save_items([InvoiceItem(description='Design', quantity=3, unit_price=Decimal('50.00'))])
+        self.assertEqual(self.cells(), {
+            (self.freelancer.pk, march, 'ISSUED', 'PAID'): (1, Decimal('150.00')),
+            (self.client_user.pk, march, 'RECEIVED', 'PAID'): (1, Decimal('150.00')),
+        })
+
+        invoice.issue_date = date(2026, 4, 2)
+        invoice.save()
+        self.assertEqual({key[1] for key in self.cells()}, {date(2026, 4, 1)})
+        self.assertMatchesRebuild()
+        invoice.delete()
+        self.assertEqual(self.cells(), {})
+
+    def test_ledger_transactions(self):
+        payment = Transaction.objects.create(profile=self.profile, transaction_type='PAYMENT', amount=Decimal('120.00'))
+        Transaction.objects.create(profile=self.profile, transaction_type='WITHDRAWAL', amount=Decimal('45.50'),
+                                   status='PENDING')
+        self.assertEqual(revenue.ledger_balance(self.freelancer), Decimal('74.50'))
+        self.assertMatchesRebuild()
+
+        payment.status = 'FAILED'
+        payment.save()
+        self.assertEqual(RevenueRollup.objects.get(kind='PAYMENT', count=1).status, 'FAILED')
+        payment.delete()
+        self.assertEqual(revenue.ledger_balance(self.freelancer), Decimal('-45.50'))
+
+    def test_overdue_sweep_keeps_the_rollup_current(self):
+        for i in range(4):
+            self.make(f'S-{i}', issued=date(2026, 1 + i, 1))
+        mark_overdue_invoices(batch_size=3, today=date(2026, 7, 1))
+        statuses = {key[3] for key in self.cells()}
+        self.assertEqual(statuses, {'OVERDUE'})
+        self.assertMatchesRebuild()
+
+    def test_stale_instance_saved_after_the_overdue_sweep(self):
+        invoice = self.make('O-1', issued=date(2026, 1, 1))
+        form_copy = Invoice.objects.get(pk=invoice.pk)  # loaded while SENT
+        mark_overdue_invoices(today=date(2026, 7, 1))
+        form_copy.status = Invoice.STATUS_PAID
+        form_copy.save()
+        self.assertEqual({key[3] for key in self.cells()}, {'PAID'})
+        self.assertFalse(RevenueRollup.objects.filter(count__lt=0).exists())
+        self.assertMatchesRebuild()
+
+        ledger_copy = Transaction.objects.create(profile=self.profile, transaction_type='PAYMENT', amount=Decimal('5.00'))
+        Transaction.objects.filter(pk=ledger_copy.pk).update(status='PENDING')
+        revenue.rebuild()
+        ledger_copy.amount = Decimal('7.00')
+        ledger_copy.save()
+        self.assertMatchesRebuild()
+
+    def test_monthly_invoicing_reads_the_rollup(self):
+        self.make('M-1', issued=date(2026, 2, 10), amount='80.00')
+        self.make('M-2', issued=date(2026, 2, 20), status=Invoice.STATUS_PAID, amount='20.00')
+        self.make('M-3', issued=date(2026, 4, 1), status=Invoice.STATUS_DRAFT)
+        self.make('M-OLD', issued=date(2025, 6, 1), status=Invoice.STATUS_PAID)
+
+        with self.assertMaxQueries(1):
+            months = revenue.monthly_invoicing(self.freelancer, months=3, today=date(2026, 4, 30))
+        self.assertEqual([row['month'] for row in months], [date(2026, 2, 1), date(2026, 3, 1), date(2026, 4, 1)])
+        self.assertEqual(months[0], {'month': date(2026, 2, 1), 'count': 2, 'invoiced': Decimal('100.00'),
+                                     'paid': Decimal('20.00'), 'outstanding': Decimal('80.00')})
+        self.assertEqual(months[2]['count'], 0)
+
+    def test_deleting_a_user_cascades(self):
+        self.make('D-1')
+        Transaction.objects.create(profile=self.profile, transaction_type='PAYMENT', amount=Decimal('10.00'))
+        self.freelancer.delete()
+        self.assertEqual(set(RevenueRollup.objects.values_list('user_id', flat=True)), {self.client_user.pk})
+        self.assertMatchesRebuild()
+
+
+class InvoiceExportTests(QueryBudgetMixin, TestCase):
+
+    def setUp(self):
+        self.freelancer = User.objects.create(username='free', email='free@example.com', user_type=2)
+        self.client_user = User.objects.create(username='client', email='client@example.com', user_type=1)
+        self.other = User.objects.create(username='other', email='other@example.com', user_type=2)
+        for i in range(5):
+            invoice = Invoice.objects.create(client=self.client_user, freelancer=self.freelancer,
+                                             invoice_number=f'X-{i}', issue_date=date(2026, 1 + i, 1),
+                                             due_date=date(2026, 6, 30), tax_rate=Decimal('0.10'))
+            invoice.save_items([InvoiceItem(description=f'Line {n}', quantity=1, unit_price=10) for n in range(i)])
+        Invoice.objects.create(client=self.client_user, freelancer=self.other, invoice_number='OTHER',
+                               issue_date=date(2026, 2, 1), due_date=date(2026, 6, 30))
+
+    def read(self, response):
+        self.assertTrue(response.streaming)
+        return list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+    def test_streams_one_row_per_item(self):
+        self.client.force_login(self.freelancer)
+        response = self.client.get('/invoices/export/')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = self.read(response)
+        # X-0 has no items and still gets a row; the other freelancer's invoice is not included
+        self.assertEqual([row['invoice_number'] for row in rows], ['X-0'] + ['X-1'] + ['X-2'] * 2 + ['X-3'] * 3 + ['X-4'] * 4)
+        self.assertEqual(rows[0]['item_description'], '')
+        self.assertEqual(rows[-1], {
+            'invoice_number': 'X-4', 'status': 'Draft', 'issue_date': '2026-05-01', 'due_date': '2026-06-30',
+            'freelancer': 'free', 'client': 'client', 'task': '', 'item_description': 'Line 3',
+            'quantity': '1.00', 'unit_price': '10.00', 'item_total': '10.00',
+            'subtotal': '40.00', 'tax_rate': '0.10', 'total_amount': '44.00',
+        })
+
+    def test_date_range_and_staff_scope(self):
+        self.client_user.is_staff = True
+        self.client_user.save()
+        self.client.force_login(self.client_user)
+        response = self.client.get('/invoices/export/', {'issued_from': '2026-02-01', 'issued_to': '2026-03-31'})
+        self.assertIn('invoices_2026-02-01_2026-03-31.csv', response['Content-Disposition'])
+        self.assertEqual({row['invoice_number'] for row in self.read(response)}, {'X-1', 'X-2', 'OTHER'})
+        self.assertEqual(self.client.get('/invoices/export/', {'issued_from': 'last week'}).status_code, 400)
+
+    def test_formula_cells_are_escaped(self):
+        invoice = Invoice.objects.get(invoice_number='X-0')
+        invoice.save_items([
+            InvoiceItem(description=description, quantity=1, unit_price=-5)
+            for description in ('=HYPERLINK("http://x")', '+1', '-2+3', '@SUM(A1)', '\tcmd', 'Plain - text')
+        ])
+        self.client.force_login(self.freelancer)
+        rows = [row for row in self.read(self.client.get('/invoices/export/')) if row['invoice_number'] == 'X-0']
+        self.assertEqual([row['item_description'] for row in rows], [
+            '\'=HYPERLINK("http://x")', "'+1", "'-2+3", "'@SUM(A1)", "'\tcmd", 'Plain - text',
+        ])
+        # Amounts are numbers, not text: negative values stay as they are
+        self.assertEqual({row['unit_price'] for row in rows}, {'-5.00'})
+
+    def test_queries_per_chunk(self):
+        invoices = Invoice.objects.all()
+        # one invoice cursor read in chunks of 2, plus one item query per chunk
+        with self.assertMaxQueries(4):
+            self.assertEqual(len(list(export.rows(invoices, chunk_size=2))), 12)
+
+    def test_command(self):
+        out, err = io.StringIO(), io.StringIO()
+        call_command('export_invoices', '--from', '2026-04-01', stdout=out, stderr=err)
+        self.assertEqual([row['invoice_number'] for row in csv.DictReader(io.StringIO(out.getvalue()))],
+                         ['X-3'] * 3 + ['X-4'] * 4)
+        self.assertIn('Exported 7 rows', err.getvalue())
+
+
+class RecurringInvoiceTests(QueryBudgetMixin, TestCase):
+
+    def setUp(self):
+        self.freelancer = User.objects.create(username='free', email='free@example.com', user_type=2)
+        self.client_user = User.objects.create(username='client', email='client@example.com', user_type=1)
+
+    def template(self, start=date(2026, 1, 31), frequency=RecurringInvoice.FREQUENCY_MONTHLY, items=2, **fields):
+        fields.setdefault('next_issue_date', start)
+        template = RecurringInvoice.objects.create(client=self.client_user, freelancer=self.freelancer,
+                                                   frequency=frequency, start_date=start, **fields)
+        RecurringInvoiceItem.objects.bulk_create([
+            RecurringInvoiceItem(recurring=template, description=f'Retainer {n}', quantity=Decimal('1.50'),
+                                 unit_price=Decimal('33.33'))
+            for n in range(items)
+        ])
+        return template
+
+    def test_period_dates(self):
+        start = date(2026, 1, 31)
+        self.assertEqual([recurring.period_date(start, 'MONTHLY', n) for n in range(4)],
+                         [start, date(2026, 2, 28), date(2026, 3, 31), date(2026, 4, 30)])
+        self.assertEqual(recurring.period_date(start, 'QUARTERLY', 4), date(2027, 1, 31))
+        self.assertEqual(recurring.period_date(date(2028, 2, 29), 'YEARLY', 1), date(2029, 2, 28))
+        self.assertEqual(recurring.period_date(start, 'WEEKLY', 2), date(2026, 2, 14))
+
+    def test_next_numbers_reserve_once_per_scope(self):
+        other = User.objects.create(username='other', email='other@example.com', user_type=2)
+        numbers = next_numbers([self.freelancer.pk, other.pk, self.freelancer.pk])
+        self.assertEqual(numbers, [f'INV-{self.freelancer.pk}-00001', f'INV-{other.pk}-00001',
+                                   f'INV-{self.freelancer.pk}-00002'])
+        self.assertEqual(InvoiceNumberSequence.objects.get(scope=f'freelancer-{self.freelancer.pk}').next_value, 3)
+
+    def test_issues_due_templates_in_batches(self):
+        templates = [self.template(tax_rate=Decimal('0.16')) for _ in range(3)]
+        self.template(is_active=False)
+        self.template(start=date(2026, 2, 15))
+        self.template(start=date(2025, 12, 31), next_issue_date=date(2026, 1, 31), end_date=date(2026, 1, 15))
+        InvoiceNumberSequence.objects.create(scope=f'freelancer-{self.freelancer.pk}')
+
+        # templates, items, savepoint pair, claim UPDATE, read-back,
+        # numbers (savepoint, UPDATE, SELECT: 4, in-use check), invoice INSERT, item INSERT, rollup upsert
+        with self.assertMaxQueries(14):
+            self.assertEqual(recurring.issue_batch(date(2026, 2, 1), timezone.now(), batch_size=2), 2)
+        run = recurring.issue_due_invoices(batch_size=2, today=date(2026, 2, 1))
+        self.assertEqual((run.invoices, run.batches), (1, 1))
+
+        invoices = list(Invoice.objects.order_by('invoice_number'))
+        self.assertEqual([invoice.invoice_number for invoice in invoices],
+                         [f'INV-{self.freelancer.pk}-0000{n}' for n in (1, 2, 3)])
+        self.assertEqual({invoice.recurring_id for invoice in invoices}, {t.pk for t in templates})
+        invoice = invoices[0]
+        # 1.50 x 33.33 = 49.995, stored as 50.00; 16% tax on 100.00
+        self.assertEqual((invoice.status, invoice.issue_date, invoice.due_date, invoice.subtotal, invoice.total_amount),
+                         (Invoice.STATUS_SENT, date(2026, 1, 31), date(2026, 2, 14), Decimal('100.00'), Decimal('116.00')))
+        self.assertEqual([item.total_price for item in invoice.items.all()], [Decimal('50.00')] * 2)
+        self.assertEqual(set(RecurringInvoice.objects.filter(pk__in=[t.pk for t in templates])
+                             .values_list('next_issue_date', 'issued_count')), {(date(2026, 2, 28), 1)})
+        self.assertEqual(RevenueRollup.objects.get(user=self.freelancer, kind='ISSUED').amount, Decimal('348.00'))
+
+        incremental = set(RevenueRollup.objects.values_list('user', 'month', 'kind', 'status', 'count', 'amount'))
+        revenue.rebuild()
+        self.assertEqual(incremental, set(RevenueRollup.objects.values_list('user', 'month', 'kind', 'status', 'count', 'amount')))
+
+    def test_template_behind_schedule_catches_up(self):
+        template = self.template(start=date(2026, 1, 31), items=1)
+        run = recurring.issue_due_invoices(today=date(2026, 4, 30))
+        self.assertEqual((run.invoices, run.batches), (4, 4))
+        self.assertEqual(list(template.invoices.order_by('issue_date').values_list('issue_date', flat=True)),
+                         [date(2026, 1, 31), date(2026, 2, 28), date(2026, 3, 31), date(2026, 4, 30)])
+        self.assertEqual(recurring.issue_due_invoices(today=date(2026, 4, 30)).invoices, 0)
+
+    def test_create_view_can_start_a_series(self):
+        self.client.force_login(self.freelancer)
+        response = self.client.post('/invoices/create/', {
+            'client': self.client_user.pk, 'issue_date': '2026-03-31', 'due_date': '2026-04-30',
+            'tax_rate': '0.00', 'task': '', 'recurrence-repeat': 'MONTHLY',
+            'items-TOTAL_FORMS': 1, 'items-INITIAL_FORMS': 0,
+            'items-0-description': 'Support', 'items-0-quantity': '1', 'items-0-unit_price': '250.00',
+        })
+        self.assertEqual(response.status_code, 302)
+        template = RecurringInvoice.objects.get()
+        self.assertEqual((template.next_issue_date, template.issued_count, template.due_days), (date(2026, 4, 30), 1, 30))
+        self.assertEqual(list(template.items.values_list('description', 'unit_price')), [('Support', Decimal('250.00'))])
+        self.assertEqual(Invoice.objects.get().recurring, template)
+
+        call_command('issue_recurring_invoices', '--date', '2026-04-30', stdout=io.StringIO())
+        self.assertEqual(list(template.invoices.order_by('issue_date').values_list('issue_date', 'total_amount')),
+                         [(date(2026, 3, 31), Decimal('250.00')), (date(2026, 4, 30), Decimal('250.00'))])
+
+
+class DarajaStub(ThreadingHTTPServer):
+    """ A local stand-in for the Daraja API: numbered tokens, STK pushes that check them. """
+    daemon_threads = True
+
+    def __init__(self, token_delay=0.2, expires_in='3599'):
+        super().__init__(('127.0.0.1', 0), DarajaStubHandler)
+        self.token_delay = token_delay
+        self.expires_in = expires_in
+        self.rejected = set()
+        self.token_requests = 0
+        self.stk_tokens = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+
+class DarajaStubHandler(BaseHTTPRequestHandler):
+
+    def reply(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.token_requests += 1
+            token = f'token-{self.server.token_requests}'
+        # Slow enough that unsynchronised callers would all miss the cache
+        time.sleep(self.server.token_delay)
+        self.reply(200, {'access_token': token, 'expires_in': self.server.expires_in})
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        token = self.headers['Authorization'].removeprefix('Bearer ')
+        with self.server.lock:
+            self.server.stk_tokens.append(token)
+            n = len(self.server.stk_tokens)
+        if token in self.server.rejected:
+            self.reply(401, {'errorCode': '404.001.03', 'errorMessage': 'Invalid Access Token'})
+        else:
+            self.reply(200, {'CheckoutRequestID': f'ws_CO_{n}', 'ResponseDescription': 'Success'})
+
+    def log_message(self, format, *args):
+        pass
+
+
+class DarajaTokenTests(ConcurrencyMixin, TransactionTestCase):
+    """ STK pushes against a local Daraja stub; the stub counts the token fetches. """
+    THREADS = 8
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def stub(self, **options):
+        stub = DarajaStub(**options)
+        threading.Thread(target=stub.serve_forever, daemon=True).start()
+        self.addCleanup(stub.server_close)
+        self.addCleanup(stub.shutdown)
+        for name, value in (('BASE_URL', stub.url), ('CONSUMER_KEY', 'key'), ('CONSUMER_SECRET', 'secret'),
+                            ('SHORTCODE', '174379'), ('PASSKEY', 'passkey'), ('CALLBACK_URL', 'https://example.com/')):
+            patcher = mock.patch.object(views, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        return stub
+
+    def push(self, client=None):
+        return (client or self.client).post('/invoices/stk-push/',
+                                            {'phone': '254700000000', 'amount': '10', 'name': 'A', 'email': ''})
+
+    def test_concurrent_pushes_share_one_token_fetch(self):
+        stub = self.stub()
+        statuses = self.run_in_threads(lambda slot: self.push(self.client_class()).status_code, self.THREADS)
+        self.assertEqual(statuses, [302] * self.THREADS)
+        self.assertEqual(stub.token_requests, 1)
+        self.assertEqual(stub.stk_tokens, ['token-1'] * self.THREADS)
+
+        # Later pushes reuse the cached token
+        self.push()
+        self.assertEqual(stub.token_requests, 1)
+
+    def test_token_about_to_expire_is_not_reused(self):
+        stub = self.stub(token_delay=0, expires_in=str(daraja.EXPIRY_MARGIN))
+        self.assertEqual([views.generate_access_token() for _ in range(2)], ['token-1', 'token-2'])
+        stub.expires_in = 'soon'  # unparseable: the documented lifetime is assumed
+        self.assertEqual([views.generate_access_token() for _ in range(2)], ['token-3', 'token-3'])
+
+    def test_waits_for_a_fetch_by_another_process(self):
+        stub = self.stub(token_delay=0)
+        key = daraja._cache_key(stub.url, 'key')
+        # Another process holds the refresh lock and caches its token shortly after
+        cache.add(f'{key}:lock', 1)
+        timer = threading.Timer(0.2, cache.set, args=(key, 'their-token'))
+        timer.start()
+        self.addCleanup(timer.cancel)
+        self.assertEqual(views.generate_access_token(), 'their-token')
+        self.assertEqual(stub.token_requests, 0)
+
+    def test_rejected_token_is_replaced_once(self):
+        stub = self.stub(token_delay=0)
+        stub.rejected.add('token-1')
+        self.assertEqual(self.push().status_code, 302)
+        self.assertEqual(stub.stk_tokens, ['token-1', 'token-2'])
+        self.assertEqual(Transactions.objects.get().transaction_id, 'ws_CO_2')
+        self.push()
+        self.assertEqual((stub.token_requests, stub.stk_tokens[-1]), (2, 'token-2'))
+
+
+class InvoicePdfTests(TestCase):
+
+    def setUp(self):
+        self.pdf_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.pdf_root, ignore_errors=True)
+        overrides = override_settings(INVOICE_PDF_ROOT=self.pdf_root, INVOICE_PDF_WORKERS=0)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.freelancer = User.objects.create(username='free', email='free@example.com', user_type=2)
+        self.client_user = User.objects.create(username='client', email='client@example.com', user_type=1)
+        self.invoice = Invoice.objects.create(
+            client=self.client_user, freelancer=self.freelancer, invoice_number='INV-1-00001',
+            issue_date=date(2026, 1, 1), due_date=date(2026, 2, 1), tax_rate=Decimal('0.16'),
+        )
+        self.invoice.save_items([InvoiceItem(description='Logo (final)', quantity=1, unit_price=500)])
+        self.client.force_login(self.client_user)
+
+    def cached_files(self):
+        return [name for _, _, files in os.walk(self.pdf_root) for name in files]
+
+    def assertValidPdf(self, content):
+        self.assertTrue(content.startswith(b'%PDF-1.4'))
+        # Every xref entry must point at its object
+        xref = int(re.search(rb'startxref\n(\d+)', content)[1])
+        self.assertEqual(content[xref:xref + 4], b'xref')
+        offsets = re.findall(rb'(\d{10}) 00000 n', content)
+        for number, offset in enumerate(offsets, start=1):
+            self.assertTrue(content[int(offset):].startswith(b'%d 0 obj' % number))
+
+    def test_download_is_rendered_once_and_served_from_cache(self):
+        response = self.client.get(f'/invoices/{self.invoice.pk}/pdf/')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        content = b''.join(response.streaming_content)
+        self.assertValidPdf(content)
+        self.assertIn(b'(INV-1-00001)', content)
+        self.assertIn(b'(Logo \\(final\\))', content)
+        self.assertIn(b'580.00', content)
+
+        again = self.client.get(f'/invoices/{self.invoice.pk}/pdf/')
+        self.assertEqual(again['ETag'], response['ETag'])
+        self.assertEqual(b''.join(again.streaming_content), content)
+        self.assertEqual(len(self.cached_files()), 1)
+
+        not_modified = self.client.get(f'/invoices/{self.invoice.pk}/pdf/', headers={'If-None-Match': response['ETag']})
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_known_version_is_not_modified_without_rendering(self):
+        etag = self.client.get(f'/invoices/{self.invoice.pk}/pdf/')['ETag']
+        rendering.purge_stale_pdfs(timedelta(seconds=-60))
+        with mock.patch('invoices.rendering.render_invoice') as render:
+            response = self.client.get(f'/invoices/{self.invoice.pk}/pdf/', headers={'If-None-Match': etag})
+        self.assertEqual((response.status_code, response['ETag']), (304, etag))
+        render.assert_not_called()
+        self.assertEqual(self.cached_files(), [])
+
+    def test_pdf_purged_before_it_is_opened_is_rendered_again(self):
+        render_many, calls = rendering.render_many, []
+
+        def purged_after_lookup(snapshots):
+            paths = render_many(snapshots)
+            if not calls:
+                rendering.purge_stale_pdfs(timedelta(seconds=-60))
+            calls.append(paths)
+            return paths
+
+        with mock.patch('invoices.rendering.render_many', purged_after_lookup):
+            response = self.client.get(f'/invoices/{self.invoice.pk}/pdf/')
+        self.assertEqual(response.status_code, 200)
+        self.assertValidPdf(b''.join(response.streaming_content))
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(len(self.cached_files()), 1)
+
+    def test_edits_change_the_document(self):
+        _, before = rendering.invoice_pdf(self.invoice)
+        self.invoice.save_items([InvoiceItem(description='Icons', quantity=3, unit_price=50)])
+        _, after = rendering.invoice_pdf(self.invoice)
+        self.assertNotEqual(before, after)
+        self.assertEqual(len(self.cached_files()), 2)
+
+    def test_long_invoices_span_pages(self):
+        self.invoice.save_items([InvoiceItem(description=f'Hour {i}', quantity=1, unit_price=20) for i in range(120)])
+        path, _ = rendering.invoice_pdf(self.invoice)
+        with open(path, 'rb') as fh:
+            content = fh.read()
+        self.assertValidPdf(content)
+        self.assertIn(b'/Count 4', content)  # 30 rows on page one, 44 on the others
+        self.assertIn(b'(Page 4 of 4)', content)
+
+    def test_only_the_parties_can_download(self):
+        outsider = User.objects.create(username='other', email='other@example.com', user_type=1)
+        self.client.force_login(outsider)
+        self.assertEqual(self.client.get(f'/invoices/{self.invoice.pk}/pdf/').status_code, 404)
+
+    def test_process_pool_renders_batches(self):
+        snapshots = []
+        for i in range(3):
+            data = rendering.snapshot(self.invoice)
+            data['number'] = f'POOL-{i}'
+            snapshots.append(data)
+        with override_settings(INVOICE_PDF_WORKERS=2):
+            try:
+                paths = rendering.render_many(snapshots)
+            finally:
+                rendering.shutdown_pool()
+        self.assertEqual(len(paths), 3)
+        for path in paths.values():
+            with open(path, 'rb') as fh:
+                self.assertValidPdf(fh.read())
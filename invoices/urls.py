@@ -17,6 +17,12 @@ urlpatterns = [
     # 3. Invoice Detail View 
     path('<int:pk>/', views.InvoiceDetailView.as_view(), name='invoice_detail'), 
     
+    # Printable PDF of an invoice (cached by content hash)
+    path('<int:pk>/pdf/', views.invoice_pdf_view, name='invoice_pdf'),
+    
+    # CSV export of invoices and line items (streamed; same filters as the list)
+    path('export/', views.invoice_export_view, name='invoice_export'),
+    
     
     # --- MPESA TRANSACTION VIEWS ---
     
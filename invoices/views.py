@@ -3,20 +3,26 @@
 from django.views.generic import ListView, DetailView
 from django.views.generic.edit import CreateView
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib.auth.decorators import login_required
 from django.urls import reverse_lazy
 from django.db import transaction
+from django.db.models import Q
 from .models import Transactions, Invoice
-from .forms import InvoiceForm, InvoiceItemFormSet # Assuming these exist
+from .forms import InvoiceForm, InvoiceItemFormSet, InvoiceFilterForm, RecurrenceForm # Assuming these exist
+from .listing import invoices_for, with_summary, summary
+from .numbering import next_invoice_number
+from . import rendering, export, recurring, daraja
 import requests # API interaction 
 from django.db.models.expressions import result
 from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse # json format 
+from django.http import JsonResponse, FileResponse, HttpResponseNotModified, HttpResponseBadRequest, StreamingHttpResponse # json format 
 import base64 # encryption
 from datetime import datetime
 import json
 from django.core.mail import send_mail
 from django.core.paginator import Paginator
+from FREELANCE.pagination import paginate_keyset
 import os
 from dotenv import load_dotenv
 
@@ -46,9 +52,8 @@ class MpesaPassword:
         return online_password
 
 def generate_access_token():
-    auth_url = f'{BASE_URL}/oauth/v1/generate?grant_type=client_credentials'
-    response = requests.get(auth_url, auth=(CONSUMER_KEY, CONSUMER_SECRET))
-    return response.json().get('access_token')
+    # Cached until shortly before it expires; concurrent callers share one fetch (see invoices.daraja)
+    return daraja.access_token(BASE_URL, CONSUMER_KEY, CONSUMER_SECRET)
 
 # -----------------------------------------------
 # MPESA TRANSACTION VIEWS
@@ -103,6 +108,11 @@ def stk_push(request):
         }
         
         response = requests.post(stk_url, json=payload, headers=headers)
+        if response.status_code == 401:
+            # The cached token was revoked before its expiry: drop it and retry once with a new one
+            daraja.invalidate(BASE_URL, CONSUMER_KEY)
+            headers['Authorization'] = f'Bearer {generate_access_token()}'
+            response = requests.post(stk_url, json=payload, headers=headers)
         response_data = response.json()
 
         transaction_id = response_data.get('CheckoutRequestID', None)
@@ -217,6 +227,10 @@ def payment_cancelled(request):
 # INVOICE CRUD VIEWS
 # -----------------------------------------------
 
+# Keyset ordering for the invoice list; matches Invoice.Meta.ordering plus its unique tiebreaker
+INVOICE_ORDERING = ('-issue_date', 'invoice_number')
+INVOICES_PER_PAGE = 25
+
 # 1. Invoice List View (for issued and received)
 class InvoiceListView(LoginRequiredMixin, ListView):
     model = Invoice
@@ -224,10 +238,23 @@ class InvoiceListView(LoginRequiredMixin, ListView):
     context_object_name = 'invoices'
 
     def get_queryset(self):
-        user = self.request.user
-        # Show all invoices where the user is either the freelancer (issued) or the client (received)
-        # Using Q objects or | (OR) is efficient for this type of query
-        return Invoice.objects.filter(freelancer=user) | Invoice.objects.filter(client=user)
+        # Invoices the user issued (as freelancer) or received (as client), in one indexed Q query;
+        # invalid filter values are ignored rather than emptying the list
+        self.filter_form = InvoiceFilterForm(self.request.GET)
+        filters = self.filter_form.cleaned_data if self.filter_form.is_valid() else {}
+        self.filtered = invoices_for(self.request.user, **filters)
+        return with_summary(self.filtered).select_related('client', 'freelancer')
+
+    def get_context_data(self, **kwargs):
+        # Keyset pagination: deep pages cost the same as page one (see FREELANCE.pagination)
+        page = paginate_keyset(self.object_list, INVOICE_ORDERING, self.request.GET.get('cursor'),
+                               per_page=INVOICES_PER_PAGE)
+        context = super().get_context_data(object_list=page, **kwargs)
+        context['page'] = page
+        context['filter_form'] = self.filter_form
+        # Totals of the whole filtered list, returned with the page's rows
+        context['summary'] = summary(self.filtered, page, first_page=not self.request.GET.get('cursor'))
+        return context
     
 # 2. Invoice Detail View
 class InvoiceDetailView(LoginRequiredMixin, DetailView):
@@ -238,35 +265,72 @@ class InvoiceDetailView(LoginRequiredMixin, DetailView):
     def get_queryset(self):
         # Ensure only the freelancer or client can view the invoice
         user = self.request.user
-        # Filter by PK AND (freelancer=user OR client=user)
-        return Invoice.objects.filter(pk=self.kwargs['pk']).filter(
-            freelancer=user
-        ) | Invoice.objects.filter(pk=self.kwargs['pk']).filter(
-            client=user
-        )
+        # Parties, task and line items up front instead of one query per template lookup
+        return (Invoice.objects.filter(Q(freelancer=user) | Q(client=user))
+                .select_related('client', 'freelancer', 'task').prefetch_related('items'))
+
+# 2b. Invoice PDF download (rendered in a process pool, cached by content hash)
+@login_required
+def invoice_pdf_view(request, pk):
+    invoice = get_object_or_404(
+        Invoice.objects.filter(Q(freelancer=request.user) | Q(client=request.user))
+        .select_related('client', 'freelancer', 'task'),
+        pk=pk,
+    )
+    # The hash of the content is the ETag: a client with this version gets a 304 before anything is rendered
+    data = rendering.snapshot(invoice)
+    digest = rendering.content_hash(data)
+    etag = f'"{digest}"'
+    if request.headers.get('If-None-Match') == etag:
+        return HttpResponseNotModified(headers={'ETag': etag})
+    response = FileResponse(rendering.open_pdf(data, digest), content_type='application/pdf',
+                            filename=f'{invoice.invoice_number}.pdf')
+    response['ETag'] = etag
+    return response
+
+# 2c. CSV export of invoices and line items, streamed in chunks (see invoices.export)
+@login_required
+def invoice_export_view(request):
+    form = InvoiceFilterForm(request.GET)
+    # Unlike the list, a bad filter is an error: ignoring it would export everything
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text(), content_type='text/plain')
+    filters = form.cleaned_data
+    # Staff (accountants) export every invoice unless they pick a role; everyone else their own
+    user = None if request.user.is_staff and not filters['role'] else request.user
+    invoices = invoices_for(user, **filters)
+
+    period = '_'.join(str(filters[key]) for key in ('issued_from', 'issued_to') if filters[key])
+    response = StreamingHttpResponse(export.csv_blocks(export.rows(invoices)), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="invoices{"_" + period if period else ""}.csv"'
+    return response
 
 # 3. Invoice Create View (Handles nested items using formsets)
 def invoice_create_view(request):
     if request.method == 'POST':
         form = InvoiceForm(request.POST)
         formset = InvoiceItemFormSet(request.POST) # Formset handles validation and data for items
+        recurrence_form = RecurrenceForm(request.POST, prefix='recurrence')
         
-        if form.is_valid() and formset.is_valid():
+        if form.is_valid() and formset.is_valid() and recurrence_form.is_valid():
+            invoice = form.save(commit=False)
+            # Set the freelancer to the currently logged-in user
+            invoice.freelancer = request.user 
+            # Allocated before the transaction starts, so it comes from this process's reserved block
+            invoice.invoice_number = next_invoice_number(request.user.pk)
             with transaction.atomic():
                 # Save the main Invoice object first
-                invoice = form.save(commit=False)
-                # Set the freelancer to the currently logged-in user
-                invoice.freelancer = request.user 
                 invoice.save()
                 
-                # Link the items to the saved invoice and save them
-                # Note: The formset will automatically link items via the ForeignKey when saved
+                # Link the items to the saved invoice and save them in one batch;
+                # save_items() then calculates subtotal/total_amount with one aggregate
                 formset.instance = invoice 
-                formset.save()
+                invoice.save_items(formset.save(commit=False), formset.deleted_objects)
                 
-                # The totals (subtotal, total_amount) are calculated and saved 
-                # automatically by the InvoiceItem model's save method, which triggers
-                # the parent invoice's calculate_totals method.
+                # Optionally make it the first of a series, issued by the issue_recurring_invoices job
+                if recurrence_form.cleaned_data['repeat']:
+                    recurring.schedule(invoice, recurrence_form.cleaned_data['repeat'],
+                                       recurrence_form.cleaned_data['repeat_until'])
                 
                 return redirect('invoices:invoice_detail', pk=invoice.pk)
     else:
@@ -274,10 +338,12 @@ def invoice_create_view(request):
         form = InvoiceForm()
         # Initialize formset with a new Invoice instance for the foreign key context
         formset = InvoiceItemFormSet(instance=Invoice()) 
+        recurrence_form = RecurrenceForm(prefix='recurrence')
         
     return render(request, 'invoices/invoice_create.html', {
         'form': form, 
-        'formset': formset
+        'formset': formset,
+        'recurrence_form': recurrence_form,
     })
 
 # DELETED: The InvoiceCreateView class stub is removed as the function-based view is used.
\ No newline at end of file
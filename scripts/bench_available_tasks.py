@@ -0,0 +1,80 @@
+"""
+Benchmark: available-jobs feed, legacy OR-chain query vs the Skill -> OPEN Task index.
+
+    python scripts/bench_available_tasks.py [task_count ...]
+"""
+import random
+import sys
+
+from benchmark_support import test_database, timed, report
+
+from django.db.models import Q
+
+from accounts.models import User
+from freelancers.models import Skill, FreelancerProfile
+from tasks.models import Task, Bid
+from tasks import skill_index
+
+SKILL_COUNT = 200
+FREELANCER_SKILLS = 20
+SKILLS_PER_TASK = 4
+PAGE_SIZE = 50
+
+
+def legacy_feed(profile, limit=None):
+    skill_filter = Q()
+    for skill in profile.skills.all():
+        skill_filter |= Q(skills_required__in=[skill])
+    bids_made = Bid.objects.filter(freelancer=profile).values_list('task__pk', flat=True)
+    tasks = Task.objects.filter(status='OPEN').filter(skill_filter).distinct().order_by('-created_at')
+    return list(tasks.exclude(pk__in=bids_made)[:limit])
+
+
+def indexed_feed(profile, limit=None):
+    skill_ids = list(profile.skills.values_list('pk', flat=True))
+    return list(skill_index.open_tasks_for_skills(skill_ids, exclude_bids_by=profile)[:limit])
+
+
+def seed(task_count, rng):
+    client = User.objects.create(username=f'client{task_count}', email=f'c{task_count}@example.com', user_type=1)
+    user = User.objects.create(username=f'free{task_count}', email=f'f{task_count}@example.com', user_type=2)
+    profile = FreelancerProfile.objects.create(user=user)
+    skills = Skill.objects.bulk_create([Skill(name=f'skill-{task_count}-{i}') for i in range(SKILL_COUNT)])
+    profile.skills.set(rng.sample(skills, FREELANCER_SKILLS))
+
+    statuses = ['OPEN'] * 6 + ['IN_PROGRESS', 'COMPLETED', 'PAID', 'CANCELLED']
+    tasks = Task.objects.bulk_create([
+        Task(title=f'Task {i}', description='Benchmark task', client=client, status=rng.choice(statuses))
+        for i in range(task_count)
+    ])
+    Through = Task.skills_required.through
+    Through.objects.bulk_create([
+        Through(task_id=t.pk, skill_id=s.pk) for t in tasks for s in rng.sample(skills, SKILLS_PER_TASK)
+    ], batch_size=5000)
+    Bid.objects.bulk_create([
+        Bid(task=t, freelancer=profile, amount=100, delivery_days=3) for t in rng.sample(tasks, task_count // 50)
+    ])
+    # bulk_create bypasses the signals, so build the index the way a backfill would
+    skill_index.rebuild()
+    return profile
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [1000, 10000, 50000]
+    rng = random.Random(42)
+    rows = []
+    with test_database():
+        for size in sizes:
+            profile = seed(size, rng)
+            assert {t.pk for t in legacy_feed(profile)} == {t.pk for t in indexed_feed(profile)}
+            for limit in (PAGE_SIZE, None):
+                legacy_ms = timed(lambda: legacy_feed(profile, limit))
+                indexed_ms = timed(lambda: indexed_feed(profile, limit))
+                rows.append((size, limit or 'all', len(indexed_feed(profile, limit)), f'{legacy_ms:.1f}',
+                             f'{indexed_ms:.1f}', f'{legacy_ms / indexed_ms:.1f}x'))
+            Task.objects.all().delete()
+    report(rows, ['tasks', 'limit', 'rows', 'legacy ms', 'indexed ms', 'speedup'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark: bid acceptance under contention (tasks.workflow.accept_bid).
+
+For each thread count N, seeds TASKS open tasks with one bid per thread,
+then N threads race through the tasks, each trying to accept its own bid
+on every one. Exactly one acceptance per task can win; the others are
+conflicts (BidAcceptanceError). Any other exception (e.g. "database is
+locked") is counted as an error. Afterwards the script checks that every
+task has exactly one accepted bid, its freelancer assigned and the other
+bids rejected.
+
+    python scripts/bench_bid_acceptance.py [thread_count ...]
+"""
+import sys
+import threading
+import time
+
+from benchmark_support import test_database, report
+
+from django.db import connection
+from django.db.models import Count, Q
+
+from accounts.models import User
+from freelancers.models import FreelancerProfile
+from tasks.models import Bid, Task
+from tasks.workflow import BidAcceptanceError, accept_bid
+
+TASKS = 500
+
+
+def seed(threads, client):
+    users = User.objects.bulk_create([
+        User(username=f'acceptor-{threads}-{i}', email=f'a{threads}-{i}@example.com', user_type=2)
+        for i in range(threads)
+    ])
+    profiles = FreelancerProfile.objects.bulk_create([FreelancerProfile(user=u) for u in users])
+    tasks = Task.objects.bulk_create([
+        Task(title=f'Task {threads}-{i}', description='Contention', client=client) for i in range(TASKS)
+    ], batch_size=5000)
+    Bid.objects.bulk_create([
+        Bid(task=task, freelancer=profile, amount=50, delivery_days=2) for task in tasks for profile in profiles
+    ], batch_size=5000)
+    bids = {}
+    for task_id, freelancer_id, bid_id in (Bid.objects.filter(task__in=tasks)
+                                           .values_list('task_id', 'freelancer_id', 'pk')):
+        bids.setdefault(task_id, {})[freelancer_id] = bid_id
+    return [[bids[task.pk][profile.pk] for task in tasks] for profile in profiles], [task.pk for task in tasks]
+
+
+def run(threads, client):
+    bids_by_slot, task_ids = seed(threads, client)
+    results = {'accepts': 0, 'conflicts': 0, 'errors': 0}
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(slot):
+        local = {'accepts': 0, 'conflicts': 0, 'errors': 0}
+        barrier.wait()
+        try:
+            for task_id, bid_id in zip(task_ids, bids_by_slot[slot]):
+                try:
+                    accept_bid(task_id, bid_id, client)
+                    local['accepts'] += 1
+                except BidAcceptanceError:
+                    local['conflicts'] += 1
+                except Exception:
+                    local['errors'] += 1
+        finally:
+            connection.close()
+            with lock:
+                for k, v in local.items():
+                    results[k] += v
+
+    workers = [threading.Thread(target=worker, args=(slot,)) for slot in range(threads)]
+    for t in workers:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in workers:
+        t.join()
+    return results, time.perf_counter() - start, task_ids
+
+
+def check_consistency(task_ids, threads):
+    broken = (
+        Task.objects.filter(pk__in=task_ids)
+        .annotate(accepted=Count('bids', filter=Q(bids__is_accepted=True)),
+                  rejected=Count('bids', filter=Q(bids__is_rejected=True)))
+        .exclude(status='BID_ACCEPTED', freelancer__isnull=False, accepted=1, rejected=threads - 1)
+    )
+    return not broken.exists()
+
+
+def main():
+    thread_counts = [int(a) for a in sys.argv[1:]] or [1, 4, 8]
+    rows = []
+    with test_database():
+        client = User.objects.create(username='client', email='client@example.com', user_type=1)
+        for threads in thread_counts:
+            results, elapsed, task_ids = run(threads, client)
+            attempts = sum(results.values())
+            rows.append((
+                connection.vendor, threads, attempts, results['accepts'], results['conflicts'], results['errors'],
+                f'{elapsed:.2f}', f"{results['accepts'] / elapsed:,.0f}", f'{attempts / elapsed:,.0f}',
+                'ok' if check_consistency(task_ids, threads) else 'BROKEN',
+            ))
+    report(rows, ['database', 'threads', 'attempts', 'accepts', 'conflicts', 'errors', 'seconds',
+                  'accepts/s', 'attempts/s', 'consistent'])
+
+
+if __name__ == '__main__':
+    main()
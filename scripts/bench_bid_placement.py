@@ -0,0 +1,127 @@
+"""
+Load test: sustained throughput of the JSON bid endpoint (POST /tasks/<pk>/bids/).
+
+Each worker thread logs in as its own freelancer and places bids on a pool
+of OPEN tasks as fast as it can for DURATION seconds. RETRY_SHARE of the
+bids are immediately re-sent with the same Idempotency-Key, as a mobile
+client would after a timeout, and must come back as replays. Afterwards the
+script checks that no bid was duplicated and that every task's bid_count
+matches its bids.
+
+    python scripts/bench_bid_placement.py [thread_count ...]
+
+The scratch database is created on the project's default database. To
+measure a server database, point DJANGO_SETTINGS_MODULE at settings whose
+default database is PostgreSQL or MySQL; the benchmark is unchanged.
+"""
+import random
+import sys
+import threading
+import time
+import uuid
+
+from benchmark_support import test_database, report
+
+from django.db import connection
+from django.db.models import Count, F
+from django.test import Client
+
+from accounts.models import User
+from freelancers.models import FreelancerProfile
+from tasks.models import Task, Bid
+
+TASKS = 5000
+DURATION = 5.0  # seconds per run
+RETRY_SHARE = 0.1
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+def run(threads, task_ids, rng):
+    users = User.objects.bulk_create([
+        User(username=f'bidder-{threads}-{i}', email=f'b{threads}-{i}@example.com', user_type=2)
+        for i in range(threads)
+    ])
+    FreelancerProfile.objects.bulk_create([FreelancerProfile(user=u) for u in users])
+    results = {'created': 0, 'replayed': 0, 'failed': 0}
+    latencies = []
+    lock = threading.Lock()
+    deadline = [None]
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(user, order):
+        client = Client()
+        client.force_login(user)
+        local = {'created': 0, 'replayed': 0, 'failed': 0}
+        local_latencies = []
+        barrier.wait()
+        try:
+            for task_id in order:
+                if time.perf_counter() > deadline[0]:
+                    break
+                key = uuid.uuid4().hex
+                sends = 2 if rng.random() < RETRY_SHARE else 1
+                for _ in range(sends):
+                    start = time.perf_counter()
+                    response = client.post(
+                        f'/tasks/{task_id}/bids/', {'amount': '150.00', 'delivery_days': 5},
+                        content_type='application/json', headers={'Idempotency-Key': key},
+                    )
+                    local_latencies.append((time.perf_counter() - start) * 1000)
+                    outcome = {201: 'created', 200: 'replayed'}.get(response.status_code, 'failed')
+                    local[outcome] += 1
+        finally:
+            connection.close()
+            with lock:
+                for k, v in local.items():
+                    results[k] += v
+                latencies.extend(local_latencies)
+
+    workers = []
+    for user in users:
+        order = list(task_ids)
+        rng.shuffle(order)
+        workers.append(threading.Thread(target=worker, args=(user, order)))
+    for t in workers:
+        t.start()
+    deadline[0] = time.perf_counter() + DURATION
+    barrier.wait()
+    start = time.perf_counter()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return results, latencies, elapsed
+
+
+def check_consistency():
+    stale = Task.objects.annotate(n=Count('bids')).exclude(bid_count=F('n')).count()
+    duplicates = Bid.objects.values('task', 'freelancer').annotate(n=Count('pk')).filter(n__gt=1).count()
+    return stale == 0 and duplicates == 0
+
+
+def main():
+    thread_counts = [int(a) for a in sys.argv[1:]] or [1, 4, 8]
+    rng = random.Random(42)
+    rows = []
+    with test_database():
+        client = User.objects.create(username='client', email='client@example.com', user_type=1)
+        tasks = Task.objects.bulk_create([
+            Task(title=f'Task {i}', description='Load test', client=client) for i in range(TASKS)
+        ], batch_size=5000)
+        task_ids = [t.pk for t in tasks]
+
+        for threads in thread_counts:
+            results, latencies, elapsed = run(threads, task_ids, rng)
+            rows.append((
+                connection.vendor, threads, results['created'], results['replayed'], results['failed'],
+                f"{results['created'] / elapsed:.0f}", f'{percentile(latencies, 0.5):.1f}',
+                f'{percentile(latencies, 0.99):.1f}', 'ok' if check_consistency() else 'BROKEN',
+            ))
+    report(rows, ['database', 'threads', 'bids', 'replays', 'failed', 'bids/s', 'p50 ms', 'p99 ms', 'consistent'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark: the streaming invoice CSV export (invoices.export).
+
+Seeds invoices with ITEMS_PER_INVOICE line items each, then exports them
+to a null sink: once untraced for throughput (rows/s) and once under
+tracemalloc for the peak Python memory. The peak should not grow with the
+number of rows. For contrast, the in-memory approach it replaces
+(list(Invoice.objects.all()) with every item prefetched) is traced on the
+smallest size only.
+
+    python scripts/bench_invoice_export.py [row_count ...]
+"""
+import csv
+import io
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+
+from benchmark_support import test_database, report
+
+from django.db import connection, transaction
+
+from accounts.models import User
+from invoices import export
+from invoices.models import Invoice, InvoiceItem
+
+ITEMS_PER_INVOICE = 5
+
+
+class NullSink:
+    def write(self, text):
+        return len(text)
+
+
+def seed(rows, freelancer, client, start_number):
+    invoices = Invoice.objects.bulk_create([
+        Invoice(freelancer=freelancer, client=client, invoice_number=f'E-{start_number + i}',
+                issue_date=date(2020, 1, 1) + timedelta(days=i % 2000), due_date=date(2026, 1, 1),
+                subtotal=Decimal('50.00'), total_amount=Decimal('50.00'))
+        for i in range(rows // ITEMS_PER_INVOICE)
+    ], batch_size=5000)
+    # Raw executemany: the ORM's bulk_create would dominate seeding a million items
+    table = connection.ops.quote_name(InvoiceItem._meta.db_table)
+    # One transaction: in autocommit mode every executemany row would be its own commit
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {table} (invoice_id, description, quantity, unit_price, total_price) VALUES (%s, %s, %s, %s, %s)',
+            [(invoice.pk, f'Consulting block {n}', '1.00', '10.00', '10.00')
+             for invoice in invoices for n in range(ITEMS_PER_INVOICE)],
+        )
+    return len(invoices)
+
+
+def in_memory_export():
+    """ The approach this replaces: everything loaded, then written. """
+    out = csv.writer(io.StringIO())
+    for invoice in list(Invoice.objects.select_related('freelancer', 'client', 'task').prefetch_related('items')):
+        for item in invoice.items.all():
+            out.writerow((invoice.invoice_number, invoice.freelancer.username, item.description, item.total_price))
+
+
+def traced_peak_mb(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    sizes = sorted(int(a) for a in sys.argv[1:]) or [100000, 1000000]
+    rows = []
+    with test_database():
+        freelancer = User.objects.create(username='free', email='free@example.com', user_type=2)
+        client = User.objects.create(username='client', email='client@example.com', user_type=1)
+        seeded = 0
+        for size in sizes:
+            seed(size - seeded, freelancer, client, start_number=seeded)
+            seeded = size
+            invoices = Invoice.objects.all()
+
+            start = time.perf_counter()
+            count = export.write_csv(invoices, NullSink())
+            elapsed = time.perf_counter() - start
+            assert count == size, count
+
+            peak = traced_peak_mb(lambda: export.write_csv(invoices, NullSink()))
+            naive = f'{traced_peak_mb(in_memory_export):.0f}' if size == sizes[0] else '-'
+            rows.append((count, f'{elapsed:.1f}', f'{count / elapsed:,.0f}', f'{peak:.1f}', naive))
+    report(rows, ['rows', 'seconds', 'rows/s', 'streaming peak MB', 'in-memory peak MB'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark: the invoice list page for a user with many invoices.
+
+Times the full view (session, filters, page rows with the summary sums,
+template) at page one, a deep page and with a status filter, and prints
+the query count of each.
+
+    python scripts/bench_invoice_list.py [invoice_count ...]
+"""
+import random
+import sys
+from datetime import date, timedelta
+from decimal import Decimal
+
+from benchmark_support import test_database, timed, report
+
+from django.db import connection
+from django.test import Client
+
+from accounts.models import User
+from invoices.models import Invoice
+
+OTHER_USERS_INVOICES = 50000
+
+
+def seed(count, rng):
+    users = User.objects.bulk_create([
+        User(username=f'user-{count}-{i}', email=f'u{count}-{i}@example.com', user_type=1 + i % 2) for i in range(200)
+    ])
+    power = User.objects.create(username=f'power-{count}', email=f'power{count}@example.com', user_type=2)
+    start = date(2020, 1, 1)
+
+    def invoice(n, freelancer, client):
+        amount = Decimal(rng.randrange(1000, 100000)) / 100
+        return Invoice(freelancer=freelancer, client=client, invoice_number=f'B{count}-{n}',
+                       issue_date=start + timedelta(days=rng.randrange(2000)), due_date=start,
+                       status=rng.choice(Invoice.STATUS_CHOICES)[0], subtotal=amount, total_amount=amount)
+
+    rows = [invoice(i, power, rng.choice(users)) if i % 4 else invoice(i, rng.choice(users), power) for i in range(count)]
+    rows += [invoice(count + i, rng.choice(users), rng.choice(users)) for i in range(OTHER_USERS_INVOICES)]
+    Invoice.objects.bulk_create(rows, batch_size=5000)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return power
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [1000, 10000]
+    rng = random.Random(42)
+    rows = []
+    with test_database():
+        for size in sizes:
+            client = Client()
+            client.force_login(seed(size, rng))
+            first = client.get('/invoices/')
+            deep_url = '/invoices/'
+            for _ in range(20):
+                deep_url = '/invoices/?cursor=' + client.get(deep_url).context['page'].next_cursor
+
+            for label, url in (('page 1', '/invoices/'), ('page 21', deep_url),
+                               ('status=paid', f'/invoices/?status={Invoice.STATUS_PAID}'),
+                               ('received, 2023', '/invoices/?role=received&issued_from=2023-01-01&issued_to=2023-12-31')):
+                executed = []
+                # request_started resets connection.queries, so count at the cursor instead
+                with connection.execute_wrapper(lambda execute, *args: executed.append(1) or execute(*args)):
+                    response = client.get(url)
+                assert response.status_code == 200
+                ms = timed(lambda: client.get(url), repeat=10)
+                rows.append((size, label, len(executed), f'{ms:.1f}'))
+            assert first.context['summary']['count'] == size
+    report(rows, ['invoices', 'page', 'queries', 'ms'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark: invoice number allocation under contention (invoices.numbering).
+
+THREADS threads, each with its own InvoiceNumberAllocator (standing in for
+separate web processes), draw PER_THREAD numbers for one freelancer at once
+through next_number(), the path invoice_create_view uses. Block size 1 is
+the per-number path (one counter UPDATE per invoice); larger blocks
+reserve that many numbers per UPDATE. After each run the allocators release
+their unused tails, and the script checks that no number was issued twice
+and counts the gaps left.
+
+    python scripts/bench_invoice_numbering.py [block_size ...]
+"""
+import sys
+import threading
+import time
+
+from benchmark_support import test_database, report
+
+from django.db import connection
+from django.test.utils import override_settings
+
+from accounts.models import User
+from invoices.models import InvoiceNumberSequence
+from invoices.numbering import InvoiceNumberAllocator
+
+THREADS = 8
+PER_THREAD = 250
+
+
+def draw(block_size, freelancer_id):
+    numbers, errors = [], []
+    allocators = [InvoiceNumberAllocator(block_size=block_size) for _ in range(THREADS)]
+    barrier = threading.Barrier(THREADS + 1)
+
+    def worker(allocator):
+        barrier.wait()
+        try:
+            drawn = [allocator.next_number(freelancer_id) for _ in range(PER_THREAD)]
+            allocator.release()
+            numbers.extend(drawn)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connection.close()
+
+    workers = [threading.Thread(target=worker, args=(allocator,)) for allocator in allocators]
+    for t in workers:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in workers:
+        t.join()
+    return numbers, errors, time.perf_counter() - start
+
+
+def main():
+    block_sizes = [int(a) for a in sys.argv[1:]] or [1, 5, 20, 100]
+    if 1 not in block_sizes:
+        block_sizes.insert(0, 1)  # the per-number baseline
+    rows, baseline = [], None
+    with test_database(), override_settings(INVOICE_NUMBER_PER_FREELANCER=True):
+        freelancer = User.objects.create(username='free', email='free@example.com', user_type=2)
+        for block_size in block_sizes:
+            InvoiceNumberSequence.objects.all().delete()
+            numbers, errors, elapsed = draw(block_size, freelancer.pk)
+            rate = len(numbers) / elapsed
+            baseline = baseline or rate
+            issued = InvoiceNumberSequence.objects.get().next_value - 1
+            rows.append((
+                connection.vendor, block_size, THREADS, len(numbers), len(errors), f'{elapsed:.2f}',
+                f'{rate:,.0f}', f'{rate / baseline:.1f}x', issued - len(numbers),
+                'ok' if len(set(numbers)) == len(numbers) else 'DUPLICATES',
+            ))
+    report(rows, ['database', 'block size', 'threads', 'numbers', 'errors', 'seconds', 'numbers/s',
+                  'vs per-number', 'gaps', 'unique'])
+
+
+if __name__ == '__main__':
+    main()
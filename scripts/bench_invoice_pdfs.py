@@ -0,0 +1,84 @@
+"""
+Benchmark: invoice PDF rendering (invoices.rendering).
+
+Renders a batch of invoices inline and through the process pool (cold
+cache), then times a single download of an unchanged invoice, which is a
+hash plus a file serve.
+
+    python scripts/bench_invoice_pdfs.py [invoice_count ...]
+"""
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date
+from decimal import Decimal
+
+from benchmark_support import test_database, timed, report
+
+from django.test.utils import override_settings
+
+from accounts.models import User
+from invoices import rendering
+from invoices.models import Invoice, InvoiceItem
+
+ITEMS_PER_INVOICE = 60
+WORKERS = 4
+
+
+def seed(count):
+    freelancer = User.objects.create(username=f'free-{count}', email=f'free{count}@example.com', user_type=2)
+    client = User.objects.create(username=f'client-{count}', email=f'client{count}@example.com', user_type=1)
+    invoices = Invoice.objects.bulk_create([
+        Invoice(client=client, freelancer=freelancer, invoice_number=f'B{count}-{i}',
+                issue_date=date(2026, 1, 1), due_date=date(2026, 2, 1), tax_rate=Decimal('0.16'))
+        for i in range(count)
+    ])
+    for invoice in invoices:
+        invoice.save_items([
+            InvoiceItem(description=f'Design work, revision round {i}', quantity=Decimal('2.5'), unit_price=Decimal('40.00'))
+            for i in range(ITEMS_PER_INVOICE)
+        ])
+    return [invoice.pk for invoice in invoices]
+
+
+def cold_render(ids, workers):
+    root = tempfile.mkdtemp()
+    try:
+        with override_settings(INVOICE_PDF_ROOT=root, INVOICE_PDF_WORKERS=workers):
+            start = time.perf_counter()
+            rendering.prerender(ids)
+            return (time.perf_counter() - start) * 1000
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [50, 200]
+    rows = []
+    with test_database():
+        # Start the pool once so worker start-up is not charged to the first run
+        with override_settings(INVOICE_PDF_WORKERS=WORKERS):
+            rendering._get_pool().submit(int).result()
+        try:
+            for size in sizes:
+                ids = seed(size)
+                inline_ms = cold_render(ids, 0)
+                pool_ms = cold_render(ids, WORKERS)
+
+                root = tempfile.mkdtemp()
+                with override_settings(INVOICE_PDF_ROOT=root, INVOICE_PDF_WORKERS=WORKERS):
+                    invoice = Invoice.objects.select_related('client', 'freelancer', 'task').get(pk=ids[0])
+                    rendering.invoice_pdf(invoice)
+                    cached_ms = timed(lambda: rendering.invoice_pdf(invoice), repeat=20)
+                shutil.rmtree(root, ignore_errors=True)
+
+                rows.append((size, f'{inline_ms:.0f}', f'{pool_ms:.0f}', f'{inline_ms / pool_ms:.1f}x',
+                             f'{inline_ms / size:.1f}', f'{cached_ms:.2f}'))
+        finally:
+            rendering.shutdown_pool()
+    report(rows, ['invoices', 'inline ms', f'pool({WORKERS}) ms', 'speedup', 'ms/render', 'cached download ms'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark: saving an invoice's line items one by one vs in one batch.
+
+"legacy" replays the original behaviour: every item save re-read all items
+to sum them and saved the whole invoice. "per-item" is InvoiceItem.save() for
+every item as it is now (one aggregate and one invoice UPDATE per item).
+"bulk" is Invoice.save_items(): one batched INSERT, one aggregate and one
+invoice UPDATE for the whole set.
+
+    python scripts/bench_invoice_totals.py [item_count ...]
+"""
+import sys
+from datetime import date
+from decimal import Decimal
+
+from benchmark_support import test_database, timed, report
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import User
+from invoices.models import Invoice, InvoiceItem
+
+REPEAT = 5
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [20, 200]
+    rows = []
+    with test_database():
+        freelancer = User.objects.create(username='free', email='free@example.com', user_type=2)
+        client = User.objects.create(username='client', email='client@example.com', user_type=1)
+        counter = iter(range(10 ** 9))
+
+        def new_invoice():
+            return Invoice.objects.create(
+                client=client, freelancer=freelancer, invoice_number=f'B-{next(counter)}',
+                issue_date=date(2026, 1, 1), due_date=date(2026, 2, 1), tax_rate=Decimal('0.16'),
+            )
+
+        def items(count):
+            return [InvoiceItem(description=f'Line {i}', quantity=Decimal('1.5'), unit_price=Decimal('20.00'))
+                    for i in range(count)]
+
+        def legacy(count):
+            invoice = new_invoice()
+            with transaction.atomic():
+                for item in items(count):
+                    item.invoice = invoice
+                    item.save(update_parent=False)
+                    invoice.subtotal = sum(i.total_price for i in invoice.items.all())
+                    invoice.total_amount = invoice.subtotal + invoice.subtotal * invoice.tax_rate
+                    invoice.save()
+            return invoice
+
+        def per_item(count):
+            invoice = new_invoice()
+            with transaction.atomic():
+                for item in items(count):
+                    item.invoice = invoice
+                    item.save()
+            return invoice
+
+        def bulk(count):
+            invoice = new_invoice()
+            with transaction.atomic():
+                invoice.save_items(items(count))
+            return invoice
+
+        for size in sizes:
+            results = []
+            for save in (legacy, per_item, bulk):
+                with CaptureQueriesContext(connection) as captured:
+                    invoice = save(size)
+                assert invoice.total_amount == Decimal('34.80') * size, invoice.total_amount
+                results.append((timed(lambda: save(size), repeat=REPEAT), len(captured)))
+            (legacy_ms, legacy_q), (item_ms, item_q), (bulk_ms, bulk_q) = results
+            rows.append((size, f'{legacy_ms:.1f}', legacy_q, f'{item_ms:.1f}', item_q, f'{bulk_ms:.1f}', bulk_q,
+                         f'{legacy_ms / bulk_ms:.0f}x', f'{item_ms / bulk_ms:.0f}x'))
+    report(rows, ['items', 'legacy ms', 'queries', 'per-item ms', 'queries', 'bulk ms', 'queries',
+                  'vs legacy', 'vs per-item'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark: the overdue-invoice sweep (invoices.overdue) as history grows.
+
+Seeds a growing number of historic (PAID) invoices plus a fixed number of
+SENT invoices that have just fallen due, then compares a Python scan of the
+whole table with send_overdue_reminders(), whose runtime should not depend
+on the history.
+
+    python scripts/bench_overdue_invoices.py [historic_invoices ...]
+"""
+import random
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from benchmark_support import test_database, report
+
+from django.db import connection
+
+from accounts.models import User
+from invoices import overdue
+from invoices.models import Invoice
+
+NEWLY_OVERDUE = 500
+CLIENTS = 100
+LOCMEM = 'django.core.mail.backends.locmem.EmailBackend'
+TODAY = date(2026, 5, 10)
+
+
+def seed(history, rng, freelancer, clients):
+    def invoice(n, status, due):
+        return Invoice(freelancer=freelancer, client=rng.choice(clients), invoice_number=f'H{history}-{n}',
+                       issue_date=due - timedelta(days=30), due_date=due, status=status,
+                       total_amount=Decimal(rng.randrange(1000, 100000)) / 100)
+
+    Invoice.objects.all().delete()
+    Invoice.objects.bulk_create(
+        [invoice(i, Invoice.STATUS_PAID, TODAY - timedelta(days=rng.randrange(1, 2000))) for i in range(history)]
+        + [invoice(history + i, Invoice.STATUS_SENT, TODAY - timedelta(days=rng.randrange(1, 30)))
+           for i in range(NEWLY_OVERDUE)],
+        batch_size=5000,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def python_scan():
+    """ The approach this replaces: load every invoice and save the overdue ones one by one. """
+    for invoice in Invoice.objects.all():
+        if invoice.status == Invoice.STATUS_SENT and invoice.due_date < TODAY:
+            invoice.status = Invoice.STATUS_OVERDUE
+            invoice.save(update_fields=['status', 'updated_at'])
+
+
+def timed_once(fn):
+    start = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [10000, 50000, 200000]
+    rng = random.Random(7)
+    rows = []
+    with test_database():
+        freelancer = User.objects.create(username='free', email='free@example.com', user_type=2)
+        clients = [User.objects.create(username=f'client{i}', email=f'client{i}@example.com', user_type=1)
+                   for i in range(CLIENTS)]
+        for history in sizes:
+            seed(history, rng, freelancer, clients)
+            scan_ms, _ = timed_once(python_scan)
+
+            seed(history, rng, freelancer, clients)
+            sweep_ms, run = timed_once(lambda: overdue.send_overdue_reminders(backend=LOCMEM, today=TODAY))
+            assert run.invoices == NEWLY_OVERDUE
+            rows.append((history, NEWLY_OVERDUE, f'{scan_ms:.0f}', f'{sweep_ms:.0f}', run.digests))
+    report(rows, ['historic', 'newly overdue', 'python scan ms', 'sweep + digests ms', 'digests'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark: freelancer recommender (freelancers.recommender) at scale.
+
+Reports the full matrix build, a top-K query, and an incremental refresh
+after a handful of profiles change.
+
+    python scripts/bench_recommender.py [freelancer_count ...]
+"""
+import random
+import sys
+import time
+from datetime import timedelta
+
+from benchmark_support import test_database, timed, report
+
+from django.utils import timezone
+
+from accounts.models import User
+from freelancers.models import Skill, FreelancerProfile, TIER_CHOICES
+from freelancers.recommender import SkillMatrix
+from tasks.models import Task
+
+SKILL_COUNT = 500
+SKILLS_PER_FREELANCER = 12
+TASK_SKILLS = 4
+TOP_K = 20
+CHANGED_PROFILES = 50
+
+
+def seed(count, rng):
+    skills = Skill.objects.bulk_create([Skill(name=f'skill-{count}-{i}') for i in range(SKILL_COUNT)])
+    users = User.objects.bulk_create([
+        User(username=f'free-{count}-{i}', email=f'f{count}-{i}@example.com', user_type=2) for i in range(count)
+    ], batch_size=5000)
+    tiers = [code for code, _ in TIER_CHOICES]
+    profiles = FreelancerProfile.objects.bulk_create([
+        FreelancerProfile(user=u, tier=rng.choice(tiers), hourly_rate=rng.choice([None, 10, 25, 50, 100]))
+        for u in users
+    ], batch_size=5000)
+    Through = FreelancerProfile.skills.through
+    Through.objects.bulk_create([
+        Through(freelancerprofile_id=p.pk, skill_id=s.pk)
+        for p in profiles for s in rng.sample(skills, SKILLS_PER_FREELANCER)
+    ], batch_size=10000)
+    # Existing profiles were last edited long ago, not inside the refresh overlap window
+    FreelancerProfile.objects.update(updated_at=timezone.now() - timedelta(days=1))
+    client = User.objects.create(username=f'client-{count}', email=f'c{count}@example.com', user_type=1)
+    return skills, profiles, client
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [10000, 50000]
+    rng = random.Random(42)
+    rows = []
+    with test_database():
+        for size in sizes:
+            skills, profiles, client = seed(size, rng)
+            task = Task.objects.create(title='Bench', description='x', client=client, budget=3000)
+            task_skills = [s.pk for s in rng.sample(skills, TASK_SKILLS)]
+
+            matrix = SkillMatrix()
+            start = time.perf_counter()
+            matrix.build()
+            build_ms = (time.perf_counter() - start) * 1000
+
+            top_ms = timed(lambda: matrix.top_k(task_skills, budget=task.budget, k=TOP_K), repeat=20)
+            noop_ms = timed(matrix.refresh, repeat=5)
+
+            for profile in rng.sample(profiles, CHANGED_PROFILES):
+                profile.skills.add(rng.choice(skills))
+            start = time.perf_counter()
+            patched = matrix.refresh()
+            refresh_ms = (time.perf_counter() - start) * 1000
+
+            rows.append((size, f'{build_ms:.0f}', f'{top_ms:.2f}', f'{noop_ms:.2f}', patched, f'{refresh_ms:.1f}'))
+            FreelancerProfile.objects.all().delete()
+    report(rows, ['freelancers', 'build ms', f'top-{TOP_K} ms', 'idle refresh ms', 'patched', 'refresh ms'])
+
+
+if __name__ == '__main__':
+    main()
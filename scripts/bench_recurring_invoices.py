@@ -0,0 +1,92 @@
+"""
+Benchmark: bulk issuance of recurring invoices (invoices.recurring).
+
+Seeds recurring templates with ITEMS_PER_TEMPLATE line items each, spread
+over FREELANCERS freelancers, all due on one day, then issues them with
+issue_due_invoices(). For contrast, a sample of SAMPLE templates is
+issued the way invoice_create_view creates an invoice (numbered one at a
+time, Invoice.save(), save_items()), and that rate is extrapolated to the
+full size.
+
+    python scripts/bench_recurring_invoices.py [template_count ...]
+"""
+import sys
+import time
+from datetime import date
+from decimal import Decimal
+
+from benchmark_support import test_database, report
+
+from django.db import transaction
+
+from accounts.models import User
+from invoices import recurring, revenue
+from invoices.models import Invoice, InvoiceItem, RecurringInvoice, RecurringInvoiceItem, RevenueRollup
+from invoices.numbering import next_invoice_number
+
+FREELANCERS = 500
+ITEMS_PER_TEMPLATE = 3
+SAMPLE = 300
+DUE = date(2026, 7, 1)
+
+
+def seed(count, freelancers, client_ids):
+    Invoice.objects.all().delete()
+    RecurringInvoice.objects.all().delete()
+    templates = RecurringInvoice.objects.bulk_create([
+        RecurringInvoice(freelancer_id=freelancers[i % len(freelancers)], client_id=client_ids[i % len(client_ids)],
+                         tax_rate=Decimal('0.16'), start_date=DUE, next_issue_date=DUE)
+        for i in range(count)
+    ], batch_size=5000)
+    RecurringInvoiceItem.objects.bulk_create([
+        RecurringInvoiceItem(recurring=template, description=f'Retainer block {n}', quantity=Decimal('10.00'),
+                             unit_price=Decimal('45.00'))
+        for template in templates for n in range(ITEMS_PER_TEMPLATE)
+    ], batch_size=5000)
+    return templates
+
+
+def issue_one_by_one(templates):
+    """ The per-invoice path: what re-creating each invoice through invoice_create_view costs. """
+    for template in templates:
+        invoice = Invoice(freelancer_id=template.freelancer_id, client_id=template.client_id, tax_rate=template.tax_rate,
+                          issue_date=DUE, due_date=DUE, status=Invoice.STATUS_SENT)
+        invoice.invoice_number = next_invoice_number(template.freelancer_id)
+        with transaction.atomic():
+            invoice.save()
+            invoice.save_items([InvoiceItem(description=item.description, quantity=item.quantity,
+                                            unit_price=item.unit_price) for item in template.items.all()])
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [1000, 10000]
+    rows = []
+    with test_database():
+        User.objects.bulk_create([
+            User(username=f'user{i}', email=f'u{i}@example.com', user_type=1 + i % 2) for i in range(2 * FREELANCERS)
+        ])
+        users = list(User.objects.values_list('pk', flat=True))
+        freelancers, clients = users[:FREELANCERS], users[FREELANCERS:]
+        for size in sizes:
+            templates = seed(size, freelancers, clients)
+
+            start = time.perf_counter()
+            issue_one_by_one(RecurringInvoice.objects.prefetch_related('items')[:SAMPLE])
+            per_invoice_s = (time.perf_counter() - start) / SAMPLE
+            Invoice.objects.all().delete()
+            revenue.rebuild()
+
+            run = recurring.issue_due_invoices(today=DUE)
+            assert run.invoices == len(templates), run.invoices
+            assert InvoiceItem.objects.count() == size * ITEMS_PER_TEMPLATE
+            issued = RevenueRollup.objects.filter(kind=revenue.KIND_ISSUED).values_list('amount', flat=True)
+            # 3 x 450.00, plus 16% tax
+            assert sum(issued) == size * Decimal('1566.00'), sum(issued)
+
+            rows.append((size, run.batches, f'{run.elapsed:.2f}', f'{size / run.elapsed:,.0f}',
+                         f'{per_invoice_s * size:.1f}', f'{1 / per_invoice_s:,.0f}'))
+    report(rows, ['templates', 'batches', 'bulk s', 'bulk invoices/s', 'one-by-one s (est.)', 'one-by-one invoices/s'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark: monthly revenue reports from the rollup (invoices.revenue) vs
+aggregating the invoice table, plus the cost of a full rebuild.
+
+Seeds invoices spread over 50 busy users and 3 years (bulk_create, so the
+rollup is built afterwards by rebuild()), then times one user's 12-month
+invoicing summary and a finance-wide monthly total both ways.
+
+    python scripts/bench_revenue_rollups.py [invoice_count ...]
+"""
+import random
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from benchmark_support import test_database, timed, report
+
+from django.db import connection
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+from accounts.models import User
+from invoices import revenue
+from invoices.models import Invoice, RevenueRollup
+
+USERS = 50
+TODAY = date(2026, 6, 30)
+
+
+def seed(count, rng):
+    Invoice.objects.all().delete()
+    users = list(User.objects.values_list('pk', flat=True))
+    start = TODAY - timedelta(days=3 * 365)
+    batch = []
+    for i in range(count):
+        freelancer, client = rng.sample(users, 2)
+        amount = Decimal(rng.randrange(1000, 100000)) / 100
+        batch.append(Invoice(freelancer_id=freelancer, client_id=client, invoice_number=f'R{count}-{i}',
+                             issue_date=start + timedelta(days=rng.randrange(3 * 365)), due_date=TODAY,
+                             status=rng.choice(Invoice.STATUS_CHOICES)[0], subtotal=amount, total_amount=amount))
+        if len(batch) == 5000:
+            Invoice.objects.bulk_create(batch)
+            batch = []
+    Invoice.objects.bulk_create(batch)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return users[0]
+
+
+def user_summary_from_invoices(user_id):
+    """ The query revenue.monthly_invoicing replaces. """
+    return list(
+        Invoice.objects.filter(freelancer_id=user_id, issue_date__gte=date(2025, 7, 1))
+        .annotate(month=TruncMonth('issue_date')).values('month', 'status')
+        .annotate(total=Sum('total_amount')).order_by('month')
+    )
+
+
+def platform_totals_from_invoices():
+    return list(
+        Invoice.objects.filter(status=Invoice.STATUS_PAID).annotate(month=TruncMonth('issue_date'))
+        .values('month').annotate(total=Sum('total_amount')).order_by('month')
+    )
+
+
+def platform_totals_from_rollup():
+    return list(
+        RevenueRollup.objects.filter(kind=revenue.KIND_ISSUED, status='PAID')
+        .values('month').annotate(total=Sum('amount')).order_by('month')
+    )
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [50000, 200000]
+    rng = random.Random(3)
+    rows = []
+    with test_database():
+        User.objects.bulk_create([
+            User(username=f'user{i}', email=f'u{i}@example.com', user_type=1 + i % 2) for i in range(USERS)
+        ])
+        for size in sizes:
+            user_id = seed(size, rng)
+            start = time.perf_counter()
+            revenue.rebuild()
+            rebuild_ms = (time.perf_counter() - start) * 1000
+            user = User.objects.get(pk=user_id)
+
+            expected, actual = platform_totals_from_invoices(), platform_totals_from_rollup()
+            # SQLite keeps decimals as REAL, so sums taken in a different order may differ by a cent
+            assert all(e['month'] == a['month'] and abs(e['total'] - a['total']) <= Decimal('0.01')
+                       for e, a in zip(expected, actual))
+            rows.append((
+                size, RevenueRollup.objects.count(), f'{rebuild_ms:.0f}',
+                f'{timed(lambda: user_summary_from_invoices(user_id)):.2f}',
+                f'{timed(lambda: revenue.monthly_invoicing(user, months=12, today=TODAY)):.2f}',
+                f'{timed(platform_totals_from_invoices, repeat=3):.1f}',
+                f'{timed(platform_totals_from_rollup):.1f}',
+            ))
+    report(rows, ['invoices', 'rollup rows', 'rebuild ms', 'user: invoices ms', 'user: rollup ms',
+                  'platform: invoices ms', 'platform: rollup ms'])
+
+
+if __name__ == '__main__':
+    main()
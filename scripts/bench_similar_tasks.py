@@ -0,0 +1,94 @@
+"""
+Benchmark: the "similar open tasks" lookup (tasks.similarity) at scale.
+
+Compares the LSH lookup with a brute-force scan that scores every OPEN
+task's signature, and reports how many of the brute-force top 5 the LSH
+lookup also found (recall).
+
+    python scripts/bench_similar_tasks.py [task_count ...]
+"""
+import random
+import sys
+import time
+
+import numpy as np
+
+from benchmark_support import test_database, timed, report
+
+from accounts.models import User
+from freelancers.models import Skill
+from tasks import similarity
+from tasks.models import Task, TaskSignature
+
+TOPICS = 200
+TOPIC_WORDS = 12
+WORDS_PER_TASK = 9
+VOCABULARY = 5000
+SKILL_COUNT = 300
+QUERIES = 50
+LIMIT = 5
+
+
+def seed(count, rng):
+    vocabulary = [f'word{i}' for i in range(VOCABULARY)]
+    topics = [rng.sample(vocabulary, TOPIC_WORDS) for _ in range(TOPICS)]
+    skills = Skill.objects.bulk_create([Skill(name=f'skill-{count}-{i}') for i in range(SKILL_COUNT)])
+    topic_skills = [rng.sample(skills, 3) for _ in range(TOPICS)]
+    client = User.objects.create(username=f'client-{count}', email=f'c{count}@example.com', user_type=1)
+
+    tasks, topic_of = [], []
+    for i in range(count):
+        topic = rng.randrange(TOPICS)
+        words = rng.sample(topics[topic], WORDS_PER_TASK - 3) + rng.sample(vocabulary, 3)
+        tasks.append(Task(title=' '.join(words[:4]), description=' '.join(words[4:]), client=client))
+        topic_of.append(topic)
+    tasks = Task.objects.bulk_create(tasks, batch_size=5000)
+    Through = Task.skills_required.through
+    Through.objects.bulk_create([
+        Through(task_id=t.pk, skill_id=s.pk) for t, topic in zip(tasks, topic_of) for s in topic_skills[topic][:2]
+    ], batch_size=10000)
+    return tasks
+
+
+def brute_force(task):
+    """ Scores every OPEN task's signature: the cost the LSH buckets avoid. """
+    sig = np.frombuffer(bytes(task.signature.minhash), dtype=np.uint32)
+    rows = list(TaskSignature.objects.filter(task__status='OPEN').exclude(task_id=task.pk)
+                .values_list('task_id', 'minhash'))
+    ids = [r[0] for r in rows]
+    matrix = np.frombuffer(b''.join(bytes(r[1]) for r in rows), dtype=np.uint32).reshape(len(rows), -1)
+    scores = (matrix == sig).mean(axis=1)
+    best = np.argsort(-scores)[:LIMIT]
+    return [ids[i] for i in best if scores[i] >= similarity.MIN_SIMILARITY]
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [10000, 50000]
+    rng = random.Random(42)
+    rows = []
+    with test_database():
+        for size in sizes:
+            tasks = seed(size, rng)
+            start = time.perf_counter()
+            similarity.rebuild()
+            sign_s = time.perf_counter() - start
+
+            queries = list(Task.objects.select_related('signature').filter(pk__in=[t.pk for t in rng.sample(tasks, QUERIES)]))
+            lsh_ms = timed(lambda: [similarity.similar_open_tasks(t, LIMIT) for t in queries], repeat=3) / QUERIES
+            brute_ms = timed(lambda: [brute_force(t) for t in queries], repeat=1) / QUERIES
+
+            found = expected = 0
+            for task in queries:
+                exact = set(brute_force(task))
+                found += len(exact & {t.pk for t in similarity.similar_open_tasks(task, LIMIT)})
+                expected += len(exact)
+
+            rows.append((size, f'{sign_s:.1f}', f'{lsh_ms:.2f}', f'{brute_ms:.1f}',
+                         f'{brute_ms / lsh_ms:.0f}x', f'{found / expected:.0%}' if expected else '-'))
+            Task.objects.all().delete()
+            User.objects.all().delete()
+    report(rows, ['tasks', 'rebuild s', 'lsh ms', 'brute-force ms', 'speedup', f'recall@{LIMIT}'])
+
+
+if __name__ == '__main__':
+    main()
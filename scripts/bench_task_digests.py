@@ -0,0 +1,89 @@
+"""
+Benchmark: skill-match notifications, one email per (task, freelancer) pair
+vs one digest per freelancer over a single connection (tasks.digests).
+
+Uses the locmem email backend, so it measures query and message-building
+cost plus connection handling, not SMTP latency.
+
+    python scripts/bench_task_digests.py [freelancer_count ...]
+"""
+import random
+import sys
+import time
+
+from benchmark_support import test_database, report
+
+from django.core import mail
+from django.core.mail import send_mail
+
+from accounts.models import User
+from freelancers.models import Skill, FreelancerProfile
+from tasks.models import Task
+from tasks import digests
+
+LOCMEM = 'django.core.mail.backends.locmem.EmailBackend'
+SKILL_COUNT = 100
+SKILLS_PER_FREELANCER = 8
+SKILLS_PER_TASK = 3
+NEW_TASKS = 200
+
+
+def per_pair_notifications():
+    """ The naive approach: one query per task, one send_mail (and connection) per match. """
+    sent = 0
+    for task in Task.objects.filter(digest_sent_at__isnull=True, status='OPEN'):
+        profiles = FreelancerProfile.objects.filter(skills__in=task.skills_required.all()).distinct()
+        for profile in profiles.select_related('user'):
+            sent += send_mail(f'New task: {task.title}', task.description, None, [profile.user.email])
+    return sent
+
+
+def seed(freelancer_count, rng):
+    client = User.objects.create(username=f'client{freelancer_count}', email=f'c{freelancer_count}@example.com', user_type=1)
+    skills = Skill.objects.bulk_create([Skill(name=f'skill-{freelancer_count}-{i}') for i in range(SKILL_COUNT)])
+    users = User.objects.bulk_create([
+        User(username=f'free-{freelancer_count}-{i}', email=f'f{freelancer_count}-{i}@example.com', user_type=2)
+        for i in range(freelancer_count)
+    ])
+    profiles = FreelancerProfile.objects.bulk_create([FreelancerProfile(user=u) for u in users])
+    ProfileSkill = FreelancerProfile.skills.through
+    ProfileSkill.objects.bulk_create([
+        ProfileSkill(freelancerprofile_id=p.pk, skill_id=s.pk)
+        for p in profiles for s in rng.sample(skills, SKILLS_PER_FREELANCER)
+    ], batch_size=5000)
+
+    tasks = Task.objects.bulk_create([
+        Task(title=f'Task {i}', description='Benchmark task', client=client) for i in range(NEW_TASKS)
+    ])
+    TaskSkill = Task.skills_required.through
+    TaskSkill.objects.bulk_create([
+        TaskSkill(task_id=t.pk, skill_id=s.pk) for t in tasks for s in rng.sample(skills, SKILLS_PER_TASK)
+    ])
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [500, 2000, 5000]
+    rng = random.Random(42)
+    rows = []
+    with test_database():
+        # create_test_db switched EMAIL_BACKEND to locmem already
+        for size in sizes:
+            seed(size, rng)
+
+            mail.outbox = []
+            start = time.perf_counter()
+            pair_emails = per_pair_notifications()
+            pair_s = time.perf_counter() - start
+
+            mail.outbox = []
+            run = digests.send_task_digests(backend=LOCMEM)
+
+            rows.append((size, NEW_TASKS, pair_emails, f'{pair_s:.2f}', run.digests, f'{run.elapsed:.2f}',
+                         f'{run.digests_per_second:,.0f}', f'{pair_s / run.elapsed:.1f}x'))
+            Task.objects.all().delete()
+            FreelancerProfile.objects.all().delete()
+    report(rows, ['freelancers', 'new tasks', 'pair emails', 'pair s', 'digests', 'digest s', 'digests/s', 'speedup'])
+
+
+if __name__ == '__main__':
+    main()
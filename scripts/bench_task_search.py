@@ -0,0 +1,68 @@
+"""
+Benchmark: FTS5 task search vs the admin's icontains scan.
+
+    python scripts/bench_task_search.py [task_count]
+"""
+import random
+import sys
+
+from benchmark_support import test_database, timed, report
+
+from django.db.models import Q
+
+from accounts.models import User
+from tasks.models import Task
+from tasks.search import search_tasks
+
+WORDS = (
+    'django python react logo design api backend frontend mobile android ios copywriting seo '
+    'blog article translation video editing animation data scraping excel dashboard wordpress '
+    'shopify ecommerce payment mpesa integration database postgres migration cloud aws docker '
+    'testing automation illustration branding marketing social media research report'
+).split()
+
+QUERIES = ['django', 'mpesa integration', 'dash*', 'postgres migration docker']
+
+# Filler vocabulary so the topic words above stay selective, as in real postings
+FILLER_SIZE = 20_000
+
+
+def icontains_search(query):
+    tasks = Task.objects.all()
+    for word in query.rstrip('*').split():
+        tasks = tasks.filter(Q(title__icontains=word) | Q(description__icontains=word))
+    return list(tasks[:50])
+
+
+def fts_search(query):
+    return list(search_tasks(query, status=None)[:50])
+
+
+def main():
+    task_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = random.Random(7)
+    rows = []
+    with test_database():
+        client = User.objects.create(username='client', email='client@example.com', user_type=1)
+        filler = [f'w{i:05d}' for i in range(FILLER_SIZE)]
+        for start in range(0, task_count, 10_000):
+            Task.objects.bulk_create([
+                Task(
+                    title=' '.join(rng.sample(WORDS, 2) + rng.sample(filler, 3)).capitalize(),
+                    description=' '.join(rng.choices(filler, k=60) + rng.sample(WORDS, 2)),
+                    client=client,
+                )
+                for _ in range(min(10_000, task_count - start))
+            ])
+
+        for query in QUERIES:
+            icontains_ms = timed(lambda: icontains_search(query))
+            fts_ms = timed(lambda: fts_search(query))
+            rows.append((query, f'{icontains_ms:.1f}', f'{fts_ms:.1f}', f'{icontains_ms / fts_ms:.1f}x'))
+
+    print(f'{task_count} tasks, first 50 results')
+    report(rows, ['query', 'icontains ms', 'fts5 ms', 'speedup'])
+
+
+if __name__ == '__main__':
+    main()
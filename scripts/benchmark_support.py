@@ -0,0 +1,55 @@
+"""
+Shared helpers for the scripts/bench_*.py benchmarks.
+
+Every benchmark runs against a throwaway test database created from the
+project's migrations, so db.sqlite3 is never touched. Run from the project root:
+
+    python scripts/bench_available_tasks.py
+"""
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# Add project root so settings import works
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'FREELANCE.settings')
+
+import django
+django.setup()
+
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+
+@contextmanager
+def test_database():
+    """ Creates a migrated scratch database for the duration of the block. """
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, serialize=False, keepdb=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def timed(fn, repeat=5):
+    """ Runs fn() `repeat` times and returns the best wall-clock time in milliseconds. """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def report(rows, headers):
+    """ Prints a fixed-width results table. """
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print('  '.join(str(h).rjust(w) for h, w in zip(headers, widths)))
+    for row in rows:
+        print('  '.join(str(c).rjust(w) for c, w in zip(row, widths)))
@@ -1,24 +1,106 @@
-from django.contrib import admin
-from .models import TaskCategory, Task
+from django.contrib import admin, messages
+from .models import TaskCategory, Task, Bid, TaskTransition, STATUS_CHOICES
+from .workflow import accept_bid, transition, BidAcceptanceError, InvalidTransition
+from .search import search_tasks
+from . import category_stats
 # Register your models here.
 
 @admin.register(TaskCategory)
 class TaskCategoryAdmin(admin.ModelAdmin):
     # Display the name and icon class in the list view
-    list_display = ('name', 'icon_class', 'task_count') 
+    list_display = ('name', 'icon_class', 'open_task_count', 'task_count') 
     # Enable searching by category name
     search_fields = ('name',) 
     
-    # Add a method to display the count of tasks in each category (optional, but useful)
+    def get_queryset(self, request):
+        # One grouped query for the whole changelist instead of a COUNT per row
+        return category_stats.annotate_counts(super().get_queryset(request))
+
+    @admin.display(description='No. of Tasks', ordering='total_count')
     def task_count(self, obj):
-        return obj.tasks.count()
-    
-    task_count.short_description = 'No. of Tasks'
+        return obj.total_count
+
+    @admin.display(description='Open Tasks', ordering='open_count')
+    def open_task_count(self, obj):
+        return obj.open_count
+
+def transition_action(status, label):
+    """ An admin action moving the selected tasks to `status` through tasks.workflow.transition(). """
+
+    def action(modeladmin, request, queryset):
+        moved, refused = 0, []
+        for task in queryset:
+            try:
+                transition(task, status, actor=request.user)
+                moved += 1
+            except InvalidTransition:
+                refused.append(f'{task} ({task.status})')
+        if moved:
+            modeladmin.message_user(request, f"Moved {moved} task(s) to {label}.", messages.SUCCESS)
+        if refused:
+            modeladmin.message_user(request, f"Not allowed to move to {label}: {', '.join(refused)}", messages.WARNING)
+
+    action.__name__ = f'move_to_{status.lower()}'
+    return admin.action(description=f"Move selected tasks to {label}")(action)
+
 
 # If you have a basic Task model, register it here too:
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):
-    list_display = ('title', 'freelancer', 'client', 'category', 'status', 'budget')
+    list_display = ('title', 'freelancer', 'client', 'category', 'status', 'budget', 'bid_count', 'lowest_bid')
     list_filter = ('status', 'category')
     search_fields = ('title', 'description')
-    date_hierarchy = 'created_at' # Assumes your Task model has a 'created_at' field
\ No newline at end of file
+    date_hierarchy = 'created_at' # Assumes your Task model has a 'created_at' field
+    list_select_related = ('freelancer', 'client', 'category')
+    # Status only changes through the workflow (validated and logged); see the actions.
+    # A bid is accepted from the Bid admin, through workflow.accept_bid()
+    readonly_fields = ('status',)
+    actions = [transition_action(status, label) for status, label in STATUS_CHOICES
+               if status not in ('OPEN', 'BID_ACCEPTED')]
+
+    def get_search_results(self, request, queryset, search_term):
+        # Use the FTS5 index instead of an icontains scan (falls back to icontains off SQLite)
+        if not search_term:
+            return queryset, False
+        return search_tasks(search_term, status=None, tasks=queryset), False
+
+
+@admin.register(Bid)
+class BidAdmin(admin.ModelAdmin):
+    list_display = ('task', 'freelancer', 'amount', 'delivery_days', 'is_accepted', 'is_rejected', 'created_at')
+    list_filter = ('is_accepted', 'is_rejected')
+    list_select_related = ('task', 'freelancer__user')
+    # Acceptance assigns the task and rejects the other bids, so it only happens through the action
+    readonly_fields = ('is_accepted', 'is_rejected')
+    actions = ['accept_selected_bid']
+
+    @admin.action(description="Accept the selected bid (assigns its task)")
+    def accept_selected_bid(self, request, queryset):
+        if len(queryset) != 1:
+            self.message_user(request, "Select exactly one bid to accept.", messages.WARNING)
+            return
+        bid = queryset.select_related('task').get()
+        try:
+            accept_bid(bid.task_id, bid.pk, bid.task.client, actor=request.user)
+        except BidAcceptanceError as e:
+            self.message_user(request, str(e), messages.WARNING)
+        else:
+            self.message_user(request, f"Accepted the bid; {bid.task} is now assigned.", messages.SUCCESS)
+
+
+@admin.register(TaskTransition)
+class TaskTransitionAdmin(admin.ModelAdmin):
+    # Append-only audit log: viewable, never editable
+    list_display = ('task', 'from_status', 'status', 'actor', 'timestamp')
+    list_filter = ('status',)
+    date_hierarchy = 'timestamp'
+    list_select_related = ('task', 'actor')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class TasksConfig(AppConfig):
     name = 'tasks'
+
+    def ready(self):
+        # Register signal receivers that maintain the denormalized task indexes
+        from . import signals  # noqa: F401
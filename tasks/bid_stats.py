@@ -0,0 +1,82 @@
+# tasks/bid_stats.py
+"""
+Maintenance of the denormalized bid statistics on Task
+(bid_count, bid_total, lowest_bid; average_bid is derived from the first two).
+
+Creates and deletes are applied as single-statement deltas. Edits to an
+existing bid (amount change, acceptance) recompute the task's figures
+from its bids. Every write is one UPDATE, so concurrent bids cannot lose
+each other's increments.
+"""
+
+from django.db.models import Case, Count, DecimalField, F, Min, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import Task, Bid
+
+DECIMAL = DecimalField(max_digits=14, decimal_places=2)
+
+
+def record_bid_added(bid, only_open=False):
+    """ Applies a new bid to its task's figures. With only_open, tasks no longer OPEN are left alone. Returns the rows updated. """
+    tasks = Task.objects.filter(pk=bid.task_id)
+    if only_open:
+        tasks = tasks.filter(status='OPEN')
+    return tasks.update(
+        bid_count=F('bid_count') + 1,
+        bid_total=F('bid_total') + bid.amount,
+        lowest_bid=Case(
+            When(lowest_bid__isnull=True, then=Value(bid.amount)),
+            When(lowest_bid__gt=bid.amount, then=Value(bid.amount)),
+            default=F('lowest_bid'),
+            output_field=DECIMAL,
+        ),
+    )
+
+
+def record_bid_removed(bid):
+    # The lowest bid only has to be looked up again when the removed bid was it
+    remaining_min = Subquery(
+        Bid.objects.filter(task=OuterRef('pk')).order_by().values('task').annotate(m=Min('amount')).values('m')
+    )
+    Task.objects.filter(pk=bid.task_id).update(
+        bid_count=F('bid_count') - 1,
+        bid_total=F('bid_total') - bid.amount,
+        lowest_bid=Case(
+            When(lowest_bid=bid.amount, then=remaining_min),
+            default=F('lowest_bid'),
+            output_field=DECIMAL,
+        ),
+    )
+
+
+def _stat_subqueries():
+    bids = Bid.objects.filter(task=OuterRef('pk')).order_by().values('task')
+    return {
+        'bid_count': Coalesce(Subquery(bids.annotate(c=Count('pk')).values('c')), 0),
+        'bid_total': Coalesce(Subquery(bids.annotate(t=Sum('amount')).values('t')), Value(0), output_field=DECIMAL),
+        'lowest_bid': Subquery(bids.annotate(m=Min('amount')).values('m')),
+    }
+
+
+def refresh(task_ids):
+    """ Recomputes the statistics of the given tasks from their bids in one UPDATE. """
+    Task.objects.filter(pk__in=task_ids).update(**_stat_subqueries())
+
+
+def rebuild_all(batch_size=1000):
+    """
+    Recomputes every task's statistics in pk-ordered batches, so each
+    UPDATE (and the write lock it holds) stays short. Returns the number of tasks visited.
+    """
+    updated = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            Task.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not batch:
+            return updated
+        Task.objects.filter(pk__gte=batch[0], pk__lte=batch[-1]).update(**_stat_subqueries())
+        updated += len(batch)
+        last_pk = batch[-1]
@@ -0,0 +1,47 @@
+# tasks/category_stats.py
+"""
+Per-category OPEN/total task counts for the category browser, computed in one
+grouped query and cached.
+
+The cache entry is dropped whenever a task is created or deleted, or changes
+category or status (see tasks.signals). Bulk code paths that bypass signals
+call invalidate() themselves. The timeout only bounds staleness in
+deployments where the cache is per-process (the default LocMemCache).
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import TaskCategory
+
+CACHE_KEY = 'tasks:category_counts'
+CACHE_TIMEOUT = 300
+
+
+def annotate_counts(categories):
+    return categories.annotate(
+        open_count=Count('tasks', filter=Q(tasks__status='OPEN')),
+        total_count=Count('tasks'),
+    )
+
+
+def category_counts():
+    """
+    Returns a list of dicts (pk, name, description, icon_class, open_count,
+    total_count) ordered by name. Costs one query on a cache miss, none on a hit.
+    """
+    counts = cache.get(CACHE_KEY)
+    if counts is None:
+        counts = list(
+            annotate_counts(TaskCategory.objects.all())
+            .values('pk', 'name', 'description', 'icon_class', 'open_count', 'total_count')
+            .order_by('name')
+        )
+        cache.set(CACHE_KEY, counts, CACHE_TIMEOUT)
+    return counts
+
+
+def invalidate():
+    # Deferred to commit so a concurrent reader cannot re-cache pre-commit counts
+    transaction.on_commit(lambda: cache.delete(CACHE_KEY))
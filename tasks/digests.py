@@ -0,0 +1,138 @@
+# tasks/digests.py
+"""
+Skill-match digest emails: "new tasks that match your skills".
+
+Instead of one email per (task, freelancer) pair, a periodic run
+(manage.py send_task_digests):
+
+1. claims every task posted since the last run (digest_sent_at IS NULL, read
+   through a partial index) by stamping it with one conditional UPDATE,
+2. finds all (freelancer, task) matches for the claimed OPEN tasks in ONE
+   set-based query joining the two skill through tables, streamed in
+   freelancer order,
+3. renders one digest per freelancer and sends them all over a single mail
+   connection, in chunks of MESSAGE_CHUNK_SIZE.
+
+So each freelancer gets at most one email per run, and the run interval is
+the digest interval.
+"""
+
+import time
+from dataclasses import dataclass
+from itertools import groupby
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Task
+
+# Tasks listed in one digest; the rest are summarised as "and N more"
+DIGEST_TASK_LIMIT = 20
+MESSAGE_CHUNK_SIZE = 100
+DEFAULT_MAX_TASKS = 5000
+
+
+@dataclass
+class DigestRun:
+    tasks: int = 0
+    digests: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def digests_per_second(self):
+        return self.digests / self.elapsed if self.elapsed else 0.0
+
+
+def pending_tasks():
+    return Task.objects.filter(digest_sent_at__isnull=True)
+
+
+def claim_pending_tasks(stamp, max_tasks=DEFAULT_MAX_TASKS):
+    """ Stamps up to max_tasks undigested tasks with `stamp`. Returns how many were claimed. """
+    # Read outside the write so the UPDATE is the first statement of its transaction
+    candidate_ids = list(pending_tasks().order_by('created_at').values_list('pk', flat=True)[:max_tasks])
+    if not candidate_ids:
+        return 0
+    # Conditional on still being unclaimed, so two overlapping runs never share a task
+    return Task.objects.filter(pk__in=candidate_ids, digest_sent_at__isnull=True).update(digest_sent_at=stamp)
+
+
+def matches_for_claim(stamp):
+    """
+    (freelancer user id, email, username, task id) rows for the OPEN tasks
+    claimed at `stamp`, one row per distinct pair, ordered by freelancer.
+    A single query over the task and freelancer skill tables.
+    """
+    Through = Task.skills_required.through
+    return (
+        Through.objects
+        .filter(task__digest_sent_at=stamp, task__status='OPEN',
+                skill__freelancerprofile__user__is_active=True)
+        .exclude(skill__freelancerprofile__user__email='')
+        .values_list('skill__freelancerprofile__user_id', 'skill__freelancerprofile__user__email',
+                     'skill__freelancerprofile__user__username', 'task_id')
+        .order_by('skill__freelancerprofile__user_id', '-task_id')
+        .distinct()
+    )
+
+
+def build_digest(email, username, task_ids, tasks_by_id, feed_url):
+    shown = [tasks_by_id[pk] for pk in task_ids[:DIGEST_TASK_LIMIT]]
+    count = len(task_ids)
+    body = render_to_string('tasks/email/task_digest.txt', {
+        'username': username,
+        'tasks': shown,
+        'more': count - len(shown),
+        'feed_url': feed_url,
+    })
+    subject = f"{count} new task{'s' if count != 1 else ''} match your skills"
+    return EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL or None, [email])
+
+
+def send_task_digests(max_tasks=DEFAULT_MAX_TASKS, backend=None, base_url=''):
+    """
+    Runs one digest interval. Returns a DigestRun with the number of tasks
+    claimed, digests sent and the elapsed time.
+
+    `backend` overrides EMAIL_BACKEND (e.g. the locmem backend for throughput
+    measurements). If sending fails before any digest went out, the claim is
+    released so the next run retries those tasks.
+    """
+    start = time.perf_counter()
+    stamp = timezone.now()
+    run = DigestRun(tasks=claim_pending_tasks(stamp, max_tasks))
+    if not run.tasks:
+        run.elapsed = time.perf_counter() - start
+        return run
+
+    tasks_by_id = {}
+    for task in (Task.objects.filter(digest_sent_at=stamp, status='OPEN')
+                 .select_related('category').only('pk', 'title', 'budget', 'due_date', 'category__name')):
+        # Reversed once per task, not once per digest that lists it
+        task.digest_url = base_url + reverse('tasks:task_detail', args=[task.pk])
+        tasks_by_id[task.pk] = task
+    feed_url = base_url + reverse('tasks:available_tasks_list')
+
+    try:
+        with get_connection(backend=backend) as connection:
+            chunk = []
+            for (user_id, email, username), rows in groupby(
+                matches_for_claim(stamp).iterator(), key=lambda row: row[:3]
+            ):
+                task_ids = [row[3] for row in rows]
+                chunk.append(build_digest(email, username, task_ids, tasks_by_id, feed_url))
+                if len(chunk) >= MESSAGE_CHUNK_SIZE:
+                    run.digests += connection.send_messages(chunk) or 0
+                    chunk = []
+            if chunk:
+                run.digests += connection.send_messages(chunk) or 0
+    except Exception:
+        if not run.digests:
+            Task.objects.filter(digest_sent_at=stamp).update(digest_sent_at=None)
+        raise
+
+    run.elapsed = time.perf_counter() - start
+    return run
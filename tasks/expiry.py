@@ -0,0 +1,68 @@
+# tasks/expiry.py
+"""
+Cancels OPEN tasks whose due_date has passed, in bounded batches.
+
+Each batch is one short transaction. Expired task ids are found with a range
+scan on the (status, due_date) index. Then a conditional UPDATE cancels them,
+their open bids are flagged rejected, their skill-index rows are dropped and
+an OPEN -> CANCELLED transition is logged for each. Runtime is proportional
+to the number of expired tasks, not to the size of the task table.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Task, Bid, OpenTaskSkill, TaskTransition, TaskLSHBucket
+from . import category_stats
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def expired_open_tasks(now=None):
+    return Task.objects.filter(status='OPEN', due_date__lt=now or timezone.now())
+
+
+def expire_batch(now, batch_size=DEFAULT_BATCH_SIZE):
+    """ Cancels up to batch_size expired tasks. Returns how many were cancelled. """
+    # Read outside the write transaction so the transaction starts with its write
+    candidate_ids = list(
+        expired_open_tasks(now).order_by().values_list('pk', flat=True)[:batch_size]
+    )
+    if not candidate_ids:
+        return 0
+
+    stamp = timezone.now()
+    with transaction.atomic():
+        # Re-check status/due_date: a task may have been accepted or extended meanwhile
+        Task.objects.filter(pk__in=candidate_ids, status='OPEN', due_date__lt=now).update(
+            status='CANCELLED', updated_at=stamp,
+        )
+        cancelled_ids = list(
+            Task.objects.filter(pk__in=candidate_ids, status='CANCELLED', updated_at=stamp)
+            .values_list('pk', flat=True)
+        )
+        if not cancelled_ids:
+            return 0
+
+        Bid.objects.filter(task_id__in=cancelled_ids, is_accepted=False).update(is_rejected=True)
+        OpenTaskSkill.objects.filter(task_id__in=cancelled_ids).delete()
+        TaskLSHBucket.objects.filter(task_id__in=cancelled_ids).delete()
+        TaskTransition.objects.bulk_create([
+            TaskTransition(task_id=pk, from_status='OPEN', status='CANCELLED', timestamp=stamp)
+            for pk in cancelled_ids
+        ])
+        category_stats.invalidate()
+    return len(cancelled_ids)
+
+
+def expire_overdue_tasks(batch_size=DEFAULT_BATCH_SIZE, max_batches=None, now=None):
+    """ Runs expire_batch until nothing is left (or max_batches). Returns the total cancelled. """
+    now = now or timezone.now()
+    total = batches = 0
+    while max_batches is None or batches < max_batches:
+        cancelled = expire_batch(now, batch_size)
+        if not cancelled:
+            break
+        total += cancelled
+        batches += 1
+    return total
@@ -1,5 +1,5 @@
 from django import forms
-from .models import Task, Bid, TaskCategory
+from .models import Task, Bid, TaskCategory, STATUS_CHOICES
 from freelancers.models import Skill # Import Skill for the ManyToMany field
 
 class TaskCreateForm(forms.ModelForm):
@@ -40,4 +40,30 @@ class BidCreateForm(forms.ModelForm):
             'message': forms.Textarea(attrs={'rows': 3, 'placeholder': 'Tell the client why you are the best person for this task.'}),
             'amount': forms.NumberInput(attrs={'placeholder': 'Your total charge (KSh)'}),
             'delivery_days': forms.NumberInput(attrs={'placeholder': 'Days to complete'}),
-        }
\ No newline at end of file
+        }
+
+class TaskSearchForm(forms.Form):
+    """
+    GET form for the full-text task search page.
+    """
+    q = forms.CharField(
+        max_length=200,
+        required=False,
+        label="Keywords",
+        widget=forms.TextInput(attrs={'placeholder': 'e.g. django api, logo*'}),
+    )
+    status = forms.ChoiceField(
+        choices=(('', 'Any status'),) + STATUS_CHOICES,
+        required=False,
+        initial='OPEN',
+    )
+    category = forms.ModelChoiceField(
+        queryset=TaskCategory.objects.all(),
+        required=False,
+        empty_label="Any category",
+    )
+    skills = forms.ModelMultipleChoiceField(
+        queryset=Skill.objects.all(),
+        required=False,
+        widget=forms.SelectMultiple(attrs={'size': 4}),
+    )
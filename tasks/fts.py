@@ -0,0 +1,75 @@
+# tasks/fts.py
+"""
+DDL for the SQLite FTS5 index over Task.title / Task.description.
+
+tasks_task_fts is an external-content FTS5 table: it stores only the inverted
+index and reads the text back from tasks_task. Triggers keep it in sync for
+every write path (save(), delete(), QuerySet.update(), bulk_create()).
+
+NOTE: SQLite's schema editor rebuilds tasks_task for some AlterField/AddField
+(and, reversed, RemoveField) operations, which silently drops these triggers.
+Such a migration must reinstall them after its schema operations in both
+directions: it ends with RunPython(fts.install, noop) and starts with
+RunPython(noop, fts.install), which runs last when it is unapplied (see 0007).
+"""
+
+FTS_TABLE = 'tasks_task_fts'
+
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS tasks_task_fts USING fts5(
+        title, description,
+        content='tasks_task', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_task_fts_ai AFTER INSERT ON tasks_task BEGIN
+        INSERT INTO tasks_task_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_task_fts_ad AFTER DELETE ON tasks_task BEGIN
+        INSERT INTO tasks_task_fts(tasks_task_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_task_fts_au AFTER UPDATE OF title, description ON tasks_task BEGIN
+        INSERT INTO tasks_task_fts(tasks_task_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO tasks_task_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    # Re-derive the index from tasks_task (covers rows written while triggers were missing)
+    "INSERT INTO tasks_task_fts(tasks_task_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS tasks_task_fts_au",
+    "DROP TRIGGER IF EXISTS tasks_task_fts_ad",
+    "DROP TRIGGER IF EXISTS tasks_task_fts_ai",
+    "DROP TABLE IF EXISTS tasks_task_fts",
+]
+
+
+def is_supported(connection):
+    return connection.vendor == 'sqlite'
+
+
+def install(apps, schema_editor):
+    """ RunPython-compatible: creates (or repairs) the FTS table and triggers. """
+    if not is_supported(schema_editor.connection):
+        return
+    for sql in CREATE_SQL:
+        schema_editor.execute(sql)
+
+
+def uninstall(apps, schema_editor):
+    if not is_supported(schema_editor.connection):
+        return
+    for sql in DROP_SQL:
+        schema_editor.execute(sql)
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tasks import expiry
+
+
+class Command(BaseCommand):
+    help = (
+        "Cancels OPEN tasks whose due date has passed, in bounded batches. "
+        "Meant to run periodically (e.g. every 5 minutes from cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=expiry.DEFAULT_BATCH_SIZE,
+                            help="Tasks cancelled per transaction.")
+        parser.add_argument('--max-batches', type=int, default=None,
+                            help="Stop after this many batches (the next run picks up the rest).")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Only report how many tasks are overdue.")
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = expiry.expired_open_tasks().count()
+            self.stdout.write(f"{count} OPEN tasks are past their due date.")
+            return
+
+        start = time.perf_counter()
+        cancelled = expiry.expire_overdue_tasks(
+            batch_size=options['batch_size'], max_batches=options['max_batches'],
+        )
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f"Cancelled {cancelled} overdue tasks in {elapsed:.2f}s."))
@@ -0,0 +1,243 @@
+import csv
+import json
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction, reset_queries
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime, parse_date
+
+from freelancers.models import Skill
+from tasks.models import Task, TaskCategory, OpenTaskSkill, STATUS_CHOICES
+from tasks import category_stats, similarity
+
+VALID_STATUSES = {code for code, _ in STATUS_CHOICES}
+TEXT_FIELDS = ('title', 'description', 'category', 'due_date', 'status', 'client')
+BUDGET_FIELD = Task._meta.get_field('budget')
+
+
+class RowError(ValueError):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Streams tasks from a CSV or JSONL file into the database in batches. "
+        "Columns/keys: title, description, category, skills, budget, due_date, status, client. "
+        "In CSV, skills are separated by '|'. Imported tasks are not announced in the skill-match "
+        "digest unless --notify is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or JSONL file.")
+        parser.add_argument('--format', choices=('csv', 'jsonl'),
+                            help="Input format. Defaults to the file extension.")
+        parser.add_argument('--client', help="Username that owns every imported task (overrides a 'client' column).")
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--create-missing', action='store_true',
+                            help="Create unknown categories and skills instead of rejecting the row.")
+        parser.add_argument('--max-errors', type=int, default=100,
+                            help="Abort after this many rejected rows.")
+        parser.add_argument('--notify', action='store_true',
+                            help="Leave the tasks to the next skill-match digest (send_task_digests). "
+                                 "By default they are marked as already digested, so a historic import "
+                                 "does not email every matching freelancer.")
+
+    # --- input ---
+
+    def _rows(self, path, fmt):
+        """ Yields (line number, row); a CSV row's number is the file line it ends on. """
+        with open(path, newline='', encoding='utf-8') as fh:
+            if fmt == 'csv':
+                reader = csv.DictReader(fh)
+                for row in reader:
+                    yield reader.line_num, row
+            else:
+                for line_num, line in enumerate(fh, start=1):
+                    if not line.strip():
+                        continue
+                    try:
+                        yield line_num, json.loads(line)
+                    except ValueError as e:
+                        yield line_num, {'_error': f"invalid JSON ({e})"}
+
+    # --- lookups (one query each, then in-memory) ---
+
+    def _load_lookups(self):
+        self.categories = dict(TaskCategory.objects.values_list('name', 'pk'))
+        self.skills = dict(Skill.objects.values_list('name', 'pk'))
+        self.clients = {}
+
+    def _category_id(self, name):
+        if not name:
+            return None
+        if name not in self.categories:
+            if not self.create_missing:
+                raise RowError(f"unknown category '{name}'")
+            self.categories[name] = TaskCategory.objects.create(name=name).pk
+        return self.categories[name]
+
+    def _skill_ids(self, value):
+        names = value if isinstance(value, list) else (value or '').split('|')
+        if not isinstance(value, (list, str, type(None))) or not all(isinstance(n, str) for n in names):
+            raise RowError("'skills' must be text or a list of text")
+        ids = []
+        for name in (n.strip() for n in names):
+            if not name:
+                continue
+            if name not in self.skills:
+                if not self.create_missing:
+                    raise RowError(f"unknown skill '{name}'")
+                self.skills[name] = Skill.objects.create(name=name).pk
+            ids.append(self.skills[name])
+        return ids
+
+    def _client_id(self, username):
+        if self.default_client_id:
+            return self.default_client_id
+        if not username:
+            raise RowError("no client given (use --client or a 'client' column)")
+        if username not in self.clients:
+            pk = get_user_model().objects.filter(username=username, user_type=1).values_list('pk', flat=True).first()
+            if pk is None:
+                raise RowError(f"unknown client '{username}'")
+            self.clients[username] = pk
+        return self.clients[username]
+
+    # --- row conversion ---
+
+    def _budget(self, value):
+        if value in (None, ''):
+            return None
+        # JSON numbers are accepted as they are written; bool is an int subclass, so exclude it
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            raise RowError(f"invalid budget '{value}'")
+        try:
+            budget = Decimal(str(value).strip())
+            # Stored with the column's scale, so check the digits after rounding to it
+            budget = budget.quantize(Decimal(1).scaleb(-BUDGET_FIELD.decimal_places))
+        except InvalidOperation:
+            raise RowError(f"invalid budget '{value}'")
+        if not budget.is_finite():
+            raise RowError(f"invalid budget '{value}'")
+        if len(budget.as_tuple().digits) > BUDGET_FIELD.max_digits:
+            raise RowError(f"budget '{value}' has more than {BUDGET_FIELD.max_digits} digits")
+        return budget
+
+    def _due_date(self, value):
+        if not value:
+            return None
+        try:
+            parsed = parse_datetime(value)
+            if parsed is None and parse_date(value):
+                parsed = datetime.combine(parse_date(value), datetime.min.time())
+        except ValueError:
+            parsed = None  # well-formed but not a real date, e.g. 2030-02-30
+        if parsed is None:
+            raise RowError(f"invalid due_date '{value}'")
+        return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+    def _build(self, row):
+        if not isinstance(row, dict):
+            raise RowError(f"expected an object, got {type(row).__name__}")
+        if '_error' in row:
+            raise RowError(row['_error'])
+        for name in TEXT_FIELDS:
+            value = row.get(name)
+            if value is not None and not isinstance(value, str):
+                raise RowError(f"'{name}' must be text, got {type(value).__name__}")
+
+        title = (row.get('title') or '').strip()
+        if not title:
+            raise RowError("missing title")
+
+        status = row.get('status') or 'OPEN'
+        if status not in VALID_STATUSES:
+            raise RowError(f"invalid status '{status}'")
+
+        budget = self._budget(row.get('budget'))
+        due_date = self._due_date(row.get('due_date'))
+
+        task = Task(
+            title=title[:255],
+            description=row.get('description') or '',
+            client_id=self._client_id(row.get('client')),
+            category_id=self._category_id(row.get('category')),
+            budget=budget,
+            due_date=due_date,
+            status=status,
+            digest_sent_at=self.digest_stamp,
+        )
+        return task, self._skill_ids(row.get('skills'))
+
+    # --- batch write ---
+
+    def _write_batch(self, built):
+        Through = Task.skills_required.through
+        with transaction.atomic():
+            tasks = Task.objects.bulk_create([task for task, _ in built])
+            pairs = [(task, skill_id) for task, (_, skill_ids) in zip(tasks, built) for skill_id in set(skill_ids)]
+            Through.objects.bulk_create([Through(task_id=task.pk, skill_id=skill_id) for task, skill_id in pairs])
+            # bulk_create bypasses the signals that maintain the skill index; the rows
+            # are brand new, so their index entries can be written directly
+            OpenTaskSkill.objects.bulk_create([
+                OpenTaskSkill(skill_id=skill_id, task_id=task.pk, task_created_at=task.created_at)
+                for task, skill_id in pairs if task.status == 'OPEN'
+            ])
+            similarity.sync_tasks([task.pk for task in tasks])
+        category_stats.invalidate()
+        # With DEBUG on, Django keeps every executed query; drop them so memory stays flat
+        reset_queries()
+        return len(tasks)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        batch_size = options['batch_size']
+        self.create_missing = options['create_missing']
+        # Stamped as digested unless --notify: send_task_digests only picks up digest_sent_at IS NULL
+        self.digest_stamp = None if options['notify'] else timezone.now()
+
+        self.default_client_id = None
+        if options['client']:
+            self.default_client_id = get_user_model().objects.filter(
+                username=options['client'], user_type=1
+            ).values_list('pk', flat=True).first()
+            if self.default_client_id is None:
+                raise CommandError(f"Client '{options['client']}' does not exist.")
+
+        self._load_lookups()
+
+        imported = rejected = 0
+        start = time.perf_counter()
+        rows = self._rows(path, fmt)
+        while True:
+            chunk = list(islice(rows, batch_size))
+            if not chunk:
+                break
+
+            built = []
+            for line_num, row in chunk:
+                try:
+                    built.append(self._build(row))
+                except RowError as e:
+                    rejected += 1
+                    self.stderr.write(f"Line {line_num}: {e}")
+                    if rejected >= options['max_errors']:
+                        raise CommandError(f"Aborting after {rejected} rejected rows ({imported} imported).")
+
+            if built:
+                imported += self._write_batch(built)
+
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f"  {imported} tasks imported ({imported / elapsed:,.0f} rows/s)")
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {imported} tasks in {elapsed:.1f}s ({imported / max(elapsed, 1e-9):,.0f} rows/s); "
+            f"{rejected} rows rejected."
+        ))
@@ -0,0 +1,17 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from tasks import uploads
+
+
+class Command(BaseCommand):
+    help = "Deletes chunked deliverable uploads that were abandoned before completion, with their partial files."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7,
+                            help="Remove uploads with no chunk received for this many days.")
+
+    def handle(self, *args, **options):
+        removed = uploads.purge_stale_uploads(timedelta(days=options['days']))
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} stale uploads."))
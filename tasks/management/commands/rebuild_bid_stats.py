@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from tasks import bid_stats
+
+
+class Command(BaseCommand):
+    help = "Recomputes the denormalized bid statistics (count, total, lowest) on every Task."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Tasks updated per UPDATE statement.")
+
+    def handle(self, *args, **options):
+        updated = bid_stats.rebuild_all(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Recomputed bid statistics for {updated} tasks."))
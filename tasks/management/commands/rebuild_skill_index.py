@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from tasks import skill_index
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the Skill -> OPEN Task index used by the available-jobs feed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        written = skill_index.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {written} skill/task pairs."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from tasks import similarity
+
+
+class Command(BaseCommand):
+    help = "Recomputes the MinHash signatures and LSH buckets behind the similar-tasks panel."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = similarity.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Signed {total} tasks."))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from tasks import digests
+
+
+class Command(BaseCommand):
+    help = (
+        "Emails each freelancer one digest of the tasks posted since the last run that match "
+        "their skills. Meant to run periodically (e.g. hourly from cron); the run interval is "
+        "the digest interval."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-tasks', type=int, default=digests.DEFAULT_MAX_TASKS,
+                            help="Tasks picked up per run (the next run takes the rest).")
+        parser.add_argument('--backend', default=None,
+                            help="Email backend to use instead of EMAIL_BACKEND, e.g. "
+                                 "django.core.mail.backends.locmem.EmailBackend to measure throughput.")
+        parser.add_argument('--base-url', default='',
+                            help="Scheme and host prefixed to task links, e.g. https://example.com")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Only report how many tasks are waiting for a digest.")
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = digests.pending_tasks().count()
+            self.stdout.write(f"{count} tasks are waiting for a digest.")
+            return
+
+        run = digests.send_task_digests(
+            max_tasks=options['max_tasks'], backend=options['backend'], base_url=options['base_url'].rstrip('/'),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Sent {run.digests} digests covering {run.tasks} new tasks in {run.elapsed:.2f}s "
+            f"({run.digests_per_second:,.0f} digests/s)."
+        ))
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from tasks import skill_index
+
+
+def populate_index(apps, schema_editor):
+    skill_index.backfill(apps.get_model('tasks', 'Task'), apps.get_model('tasks', 'OpenTaskSkill'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('freelancers', '0001_initial'),
+        ('tasks', '0003_remove_task_budget_amount_task_budget_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OpenTaskSkill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_created_at', models.DateTimeField()),
+                ('skill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='open_task_entries', to='freelancers.skill')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='skill_index_entries', to='tasks.task')),
+            ],
+            options={
+                'unique_together': {('skill', 'task')},
+            },
+        ),
+        migrations.RunPython(populate_index, migrations.RunPython.noop),
+    ]
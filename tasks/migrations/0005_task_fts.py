@@ -0,0 +1,15 @@
+from django.db import migrations
+
+from tasks import fts
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_open_task_skill_index'),
+    ]
+
+    operations = [
+        # SQLite only; other backends fall back to icontains in tasks.search
+        migrations.RunPython(fts.install, fts.uninstall),
+    ]
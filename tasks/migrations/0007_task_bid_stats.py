@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:37
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+from tasks import fts
+
+
+def backfill_bid_stats(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+    Bid = apps.get_model('tasks', 'Bid')
+    stats = Bid.objects.order_by().values('task').annotate(c=Count('pk'), t=Sum('amount'), m=Min('amount'))
+    for row in stats.iterator():
+        Task.objects.filter(pk=row['task']).update(bid_count=row['c'], bid_total=row['t'], lowest_bid=row['m'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0006_keyset_indexes'),
+    ]
+
+    operations = [
+        # Reversed last: removing the columns may rebuild tasks_task too, dropping the FTS triggers
+        migrations.RunPython(migrations.RunPython.noop, fts.install),
+        migrations.AddField(
+            model_name='task',
+            name='bid_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='bid_total',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='lowest_bid',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.RunPython(backfill_bid_stats, migrations.RunPython.noop),
+        # Adding NOT NULL columns makes SQLite rebuild tasks_task, dropping the FTS triggers
+        migrations.RunPython(fts.install, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0007_task_bid_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bid',
+            name='is_rejected',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:53
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_existing_tasks_digested(apps, schema_editor):
+    # Tasks posted before digests existed must not all be mailed on the first run
+    Task = apps.get_model('tasks', 'Task')
+    Task.objects.update(digest_sent_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('freelancers', '0001_initial'),
+        ('tasks', '0010_task_status_due_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='digest_sent_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(mark_existing_tasks_digested, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('digest_sent_at__isnull', True)), fields=['created_at'], name='task_digest_pending_idx'),
+        ),
+    ]
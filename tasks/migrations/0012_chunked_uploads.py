@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:57
+
+import django.db.models.deletion
+import tasks.models
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('freelancers', '0001_initial'),
+        ('tasks', '0011_task_digest_sent_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tasksubmission',
+            name='delivery_checksum',
+            field=models.CharField(blank=True, editable=False, help_text='SHA-256 over the per-chunk SHA-256 digests of the uploaded file.', max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='tasksubmission',
+            name='delivery_file',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=tasks.models.deliverable_storage, upload_to='submissions/%Y/%m/%d/'),
+        ),
+        migrations.CreateModel(
+            name='ChunkedUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField(help_text='Total file size in bytes, declared when the upload starts.')),
+                ('offset', models.BigIntegerField(default=0)),
+                ('chunk_digests', models.TextField(blank=True, default='')),
+                ('status', models.CharField(choices=[('UPLOADING', 'Uploading'), ('COMPLETE', 'Complete')], default='UPLOADING', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('freelancer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='uploads', to='freelancers.freelancerprofile')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='uploads', to='tasks.task')),
+            ],
+        ),
+    ]
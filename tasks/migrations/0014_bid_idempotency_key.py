@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0013_task_similarity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bid',
+            name='idempotency_key',
+            field=models.CharField(blank=True, editable=False, help_text='Client-chosen key of the API request that placed the bid.', max_length=64),
+        ),
+    ]
@@ -1,7 +1,12 @@
 # tasks/models.py (FIXED AND CONSOLIDATED)
 
-from django.db import models
+import os
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+from django.db import models, transaction
 from django.conf import settings
+from django.utils import timezone
 # NOTE: Removed 'from .models import TaskCategory' to fix the circular import.
 
 # Get Custom User model
@@ -20,6 +25,18 @@ STATUS_CHOICES = (
     ('CANCELLED', 'Cancelled'),
 )
 
+# Allowed Task.status transitions, enforced by tasks.workflow.transition().
+# Anything not listed here (e.g. PAID -> OPEN) is rejected.
+ALLOWED_TRANSITIONS = {
+    'OPEN': ('BID_ACCEPTED', 'CANCELLED'),
+    'BID_ACCEPTED': ('IN_PROGRESS', 'CANCELLED'),
+    'IN_PROGRESS': ('UNDER_REVIEW', 'CANCELLED'),
+    'UNDER_REVIEW': ('COMPLETED', 'CANCELLED'),
+    'COMPLETED': ('PAID',),
+    'PAID': (),
+    'CANCELLED': (),
+}
+
 # -----------------------------------------------
 # 2. TASK CATEGORY (Must be defined first)
 # -----------------------------------------------
@@ -94,15 +111,70 @@ class Task(models.Model):
         default='OPEN'
     )
     
+    # Bid statistics (denormalized from Bid, maintained by tasks.signals / tasks.bid_stats)
+    bid_count = models.PositiveIntegerField(default=0, editable=False)
+    bid_total = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
+    lowest_bid = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, editable=False)
+
     # Tracking
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Set when the task has been picked up by the skill-match digest (tasks.digests)
+    digest_sent_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    # Written only by tasks.bid_stats' relative UPDATEs; see save()
+    BID_STAT_FIELDS = ('bid_count', 'bid_total', 'lowest_bid')
+    # Changed only by tasks.workflow (conditional UPDATE plus a TaskTransition row); see save()
+    WORKFLOW_FIELDS = ('status',)
+    # Claimed and released only by tasks.digests' conditional UPDATEs; see save()
+    DIGEST_FIELDS = ('digest_sent_at',)
 
     def __str__(self):
         return self.title
+
+    def save(self, *args, update_fields=None, **kwargs):
+        # An instance's bid statistics, status and digest stamp may be stale (loaded before a bid,
+        # a transition or a digest run); writing them back would undo those changes, so updates
+        # never include them. They can still be set when the task is created.
+        if not self._state.adding and not kwargs.get('force_insert'):
+            loaded = getattr(self, '_loaded_category_status', None)
+            if loaded is not None and loaded[1] is not None and self.status != loaded[1]:
+                raise ValueError("Task status changes must go through tasks.workflow.transition().")
+            if update_fields is None:
+                update_fields = [field.name for field in self._meta.concrete_fields if not field.primary_key]
+            protected = self.BID_STAT_FIELDS + self.WORKFLOW_FIELDS + self.DIGEST_FIELDS
+            update_fields = [name for name in update_fields if name not in protected]
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what was loaded so tasks.signals can tell whether category/status changed
+        instance._loaded_category_status = (
+            instance.__dict__.get('category_id'), instance.__dict__.get('status'),
+        )
+        return instance
+
+    def can_transition_to(self, status):
+        return status in ALLOWED_TRANSITIONS.get(self.status, ())
+
+    @property
+    def average_bid(self):
+        if not self.bid_count:
+            return None
+        return self.bid_total / self.bid_count
     
     class Meta:
         ordering = ['-created_at']
+        # Keyset pagination of a client's tasks: WHERE client = ? AND (created_at, id) < cursor
+        indexes = [
+            models.Index(fields=['client', '-created_at', '-id'], name='task_client_created_idx'),
+            # Expiry sweep: WHERE status = 'OPEN' AND due_date < now
+            models.Index(fields=['status', 'due_date'], name='task_status_due_idx'),
+            # Digest pickup: only tasks not yet digested are indexed, so the index stays tiny
+            models.Index(fields=['created_at'], name='task_digest_pending_idx',
+                         condition=models.Q(digest_sent_at__isnull=True)),
+        ]
 
 # -----------------------------------------------
 # 4. BID MODEL
@@ -123,14 +195,43 @@ class Bid(models.Model):
     message = models.TextField(blank=True, help_text="A cover letter explaining why you are the best fit.")
     
     is_accepted = models.BooleanField(default=False)
+    # Set on the competing bids when another bid on the task is accepted
+    is_rejected = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    idempotency_key = models.CharField(max_length=64, blank=True, editable=False,
+                                       help_text="Client-chosen key of the API request that placed the bid.")
+
+    def save(self, *args, **kwargs):
+        # The bid-stats receivers in tasks.signals run inside post_save; keep them
+        # in the same transaction as the bid row itself.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def __str__(self):
-        # NOTE: You must use self.freelancer.user.username once the profile exists
-        return f"Bid on {self.task.title}"
+        # Only local fields: __str__ must not cost a query per row in admin and logs
+        return f"Bid of {self.amount} on task #{self.task_id}"
     
     class Meta:
         unique_together = ('task', 'freelancer')
+        # Keyset pagination of a task's bids, cheapest first
+        indexes = [
+            models.Index(fields=['task', 'amount', 'id'], name='bid_task_amount_idx'),
+        ]
+
+class DeliverableStorage(FileSystemStorage):
+    """ Local storage under DELIVERABLES_ROOT, so chunked uploads can be moved into place without copying. """
+
+    @property
+    def base_location(self):
+        return settings.DELIVERABLES_ROOT
+
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
+
+
+def deliverable_storage():
+    return DeliverableStorage()
 
 # -----------------------------------------------
 # 5. TASK SUBMISSION MODEL
@@ -143,11 +244,135 @@ class TaskSubmission(models.Model):
     freelancer = models.ForeignKey('freelancers.FreelancerProfile', on_delete=models.CASCADE) # CRITICAL: String reference
     
     # Deliverable Details
-    delivery_file = models.FileField(upload_to='submissions/%Y/%m/%d/', blank=True, null=True) 
+    delivery_file = models.FileField(upload_to='submissions/%Y/%m/%d/', storage=deliverable_storage, max_length=255,
+                                     blank=True, null=True) 
+    delivery_checksum = models.CharField(max_length=64, blank=True, editable=False,
+                                         help_text="SHA-256 over the per-chunk SHA-256 digests of the uploaded file.")
     delivery_link = models.URLField(max_length=500, blank=True, null=True, help_text="Link to the final deliverable (e.g., Google Drive).")
     notes = models.TextField(blank=True)
     
     submitted_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"Submission for {self.task.title}"
\ No newline at end of file
+        return f"Submission for task #{self.task_id}"
+
+# -----------------------------------------------
+# 6. SKILL -> OPEN TASK INDEX
+# -----------------------------------------------
+class OpenTaskSkill(models.Model):
+    """
+    Inverted index row linking a Skill to an OPEN Task that requires it.
+    Rows are maintained by tasks.signals (see tasks.skill_index) so the
+    available-jobs feed can be served from one indexed lookup.
+    """
+    skill = models.ForeignKey('freelancers.Skill', on_delete=models.CASCADE, related_name='open_task_entries')
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='skill_index_entries')
+
+    # Copied from Task.created_at for cheap rebuilds and newest-first scans of a single skill
+    task_created_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.skill_id} -> {self.task_id}"
+
+    class Meta:
+        # The (skill, task) unique index doubles as the lookup index for the feed
+        unique_together = ('skill', 'task')
+
+
+
+# -----------------------------------------------
+# 7. TASK STATUS TRANSITION LOG
+# -----------------------------------------------
+class TaskTransition(models.Model):
+    """
+    Append-only history of Task.status changes, written by tasks.workflow.
+    A task's time in OPEN before its first transition is measured from Task.created_at.
+    """
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='transitions')
+    from_status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, help_text="The status the task entered.")
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Task transitions are append-only and cannot be modified.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Task transitions are append-only and cannot be deleted.")
+
+    def __str__(self):
+        return f"Task {self.task_id}: {self.from_status} -> {self.status}"
+
+    class Meta:
+        ordering = ['timestamp', 'id']
+        indexes = [
+            # History of one task
+            models.Index(fields=['task', 'timestamp'], name='transition_task_time_idx'),
+            # "Entered UNDER_REVIEW before <cutoff>" range scans
+            models.Index(fields=['status', 'timestamp'], name='transition_status_time_idx'),
+        ]
+
+# -----------------------------------------------
+# 8. CHUNKED DELIVERABLE UPLOAD
+# -----------------------------------------------
+class ChunkedUpload(models.Model):
+    """
+    A resumable upload of a TaskSubmission deliverable (see tasks.uploads).
+    `offset` is the number of bytes acknowledged so far; the next chunk must start there.
+    """
+    STATUS_UPLOADING = 'UPLOADING'
+    STATUS_COMPLETE = 'COMPLETE'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='uploads')
+    freelancer = models.ForeignKey('freelancers.FreelancerProfile', on_delete=models.CASCADE, related_name='uploads')
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField(help_text="Total file size in bytes, declared when the upload starts.")
+    offset = models.BigIntegerField(default=0)
+    # Hex SHA-256 of every acknowledged chunk, concatenated in order
+    chunk_digests = models.TextField(blank=True, default='')
+    status = models.CharField(
+        max_length=10,
+        choices=((STATUS_UPLOADING, 'Uploading'), (STATUS_COMPLETE, 'Complete')),
+        default=STATUS_UPLOADING,
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size} bytes)"
+
+    @property
+    def is_complete(self):
+        return self.status == self.STATUS_COMPLETE
+
+# -----------------------------------------------
+# 9. SIMILAR-TASK SIGNATURES (MinHash + LSH)
+# -----------------------------------------------
+class TaskSignature(models.Model):
+    """
+    MinHash signature of a task's title, description and required skills
+    (see tasks.similarity), stored as packed uint32 values.
+    """
+    task = models.OneToOneField(Task, on_delete=models.CASCADE, primary_key=True, related_name='signature')
+    minhash = models.BinaryField()
+
+    def __str__(self):
+        return f"Signature of task #{self.task_id}"
+
+
+class TaskLSHBucket(models.Model):
+    """
+    One LSH band bucket of an OPEN task's signature. Tasks sharing a bucket
+    are candidate neighbours. Maintained by tasks.similarity.sync_tasks.
+    """
+    key = models.BigIntegerField(help_text="Hash of (band number, band values).")
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='lsh_buckets')
+
+    def __str__(self):
+        return f"{self.key} -> {self.task_id}"
+
+    class Meta:
+        unique_together = ('key', 'task')
@@ -0,0 +1,83 @@
+# tasks/ranking.py
+"""
+Relevance scoring for the available-jobs feed.
+
+Everything is expressed as queryset annotations so the ranked feed is still a
+single SQL query: one GROUP BY over the skills_required join produces the
+overlap counts, and budget fit and recency are plain column expressions.
+
+Recency is tiered by age relative to `now`. A paginated feed must pass the
+same `now` for every page (the view keeps it in the cursor): the score is a
+keyset pagination key, and a task crossing a tier boundary between two
+requests would otherwise move across the page boundary.
+"""
+
+from datetime import timedelta
+
+from django.db.models import Case, Count, F, FloatField, Q, Value, When
+from django.db.models.functions import Cast, Least
+from django.utils import timezone
+
+# Relative weight of each signal in the final score (they sum to 1.0)
+OVERLAP_WEIGHT = 0.6
+BUDGET_WEIGHT = 0.25
+RECENCY_WEIGHT = 0.15
+
+# A budget that pays for this many hours at the freelancer's hourly rate is a perfect fit
+BUDGET_FIT_HOURS = 40
+
+# Score used when budget fit cannot be judged (no budget or no hourly rate)
+NEUTRAL_SCORE = 0.5
+
+# (max age, score) tiers for recency, newest first
+RECENCY_TIERS = (
+    (timedelta(days=1), 1.0),
+    (timedelta(days=7), 0.7),
+    (timedelta(days=30), 0.4),
+)
+STALE_SCORE = 0.1
+
+
+def _overlap_expression(skill_ids):
+    matched = Count('skills_required', filter=Q(skills_required__in=skill_ids))
+    required = Count('skills_required')
+    return Cast(matched, FloatField()) / Cast(required, FloatField())
+
+
+def _budget_fit_expression(hourly_rate):
+    if not hourly_rate:
+        return Value(NEUTRAL_SCORE, output_field=FloatField())
+
+    target = float(hourly_rate) * BUDGET_FIT_HOURS
+    return Case(
+        When(budget__isnull=True, then=Value(NEUTRAL_SCORE)),
+        default=Least(Cast('budget', FloatField()) / Value(target), Value(1.0)),
+        output_field=FloatField(),
+    )
+
+
+def _recency_expression(now):
+    return Case(
+        *[When(created_at__gte=now - age, then=Value(score)) for age, score in RECENCY_TIERS],
+        default=Value(STALE_SCORE),
+        output_field=FloatField(),
+    )
+
+
+def rank_for_freelancer(tasks, profile, skill_ids, now=None):
+    """
+    Annotates `tasks` with skill_overlap, budget_fit, recency (as of `now`,
+    default the current time) and match_score for the given FreelancerProfile
+    and orders them best match first.
+    """
+    return tasks.annotate(
+        skill_overlap=_overlap_expression(skill_ids),
+        budget_fit=_budget_fit_expression(profile.hourly_rate),
+        recency=_recency_expression(now or timezone.now()),
+    ).annotate(
+        match_score=(
+            F('skill_overlap') * OVERLAP_WEIGHT
+            + F('budget_fit') * BUDGET_WEIGHT
+            + F('recency') * RECENCY_WEIGHT
+        ),
+    ).order_by('-match_score', '-created_at')
@@ -0,0 +1,85 @@
+# tasks/search.py
+"""
+Full-text task search.
+
+On SQLite the query runs against the tasks_task_fts FTS5 index (see tasks/fts.py)
+and results are ordered by BM25. Other backends fall back to the old
+icontains scan so the feature keeps working, just without ranking.
+"""
+
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .models import Task
+from . import fts
+
+# BM25 column weights: a hit in the title counts more than one in the description
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+_TERM_RE = re.compile(r'\w+\*?', re.UNICODE)
+
+
+def build_match_expression(query):
+    """
+    Turns free text into a safe FTS5 MATCH expression.
+
+    Every word is quoted so user input can never inject FTS5 syntax; a
+    trailing * is kept as a prefix query ("pyth*" matches "python").
+    Terms are ANDed. Returns '' when the query has no searchable words.
+    """
+    terms = []
+    for term in _TERM_RE.findall(query):
+        if term.endswith('*'):
+            terms.append(f'"{term[:-1]}"*')
+        else:
+            terms.append(f'"{term}"')
+    return ' '.join(terms)
+
+
+def _apply_filters(tasks, status=None, category=None, skills=None):
+    if status:
+        tasks = tasks.filter(status=status)
+    if category:
+        tasks = tasks.filter(category=category)
+    if skills:
+        # Subquery rather than a join so a task matching several skills is not duplicated
+        through = Task.skills_required.through.objects.filter(skill__in=skills)
+        tasks = tasks.filter(pk__in=through.values('task_id'))
+    return tasks
+
+
+def search_tasks(query, status='OPEN', category=None, skills=None, tasks=None):
+    """
+    Returns tasks whose title/description match `query`, best match first,
+    optionally narrowed by status, category and any of `skills`. An empty
+    query with a category or skills filter lists the matching tasks, newest first.
+
+    On SQLite each result carries a `rank` attribute (BM25, lower is better).
+    """
+    tasks = _apply_filters(tasks if tasks is not None else Task.objects.all(), status, category, skills)
+
+    match = build_match_expression(query)
+    if not match:
+        # No keywords: browsing by category/skills is still allowed, newest first
+        return tasks.order_by('-created_at') if (category or skills) else tasks.none()
+
+    if not fts.is_supported(connection):
+        for word in (term.rstrip('*') for term in _TERM_RE.findall(query)):
+            tasks = tasks.filter(Q(title__icontains=word) | Q(description__icontains=word))
+        return tasks
+
+    # Filter with one MATCH over the index, then rank only the matching rows (a rowid
+    # lookup each); plain expressions, so callers such as the admin can re-order and count
+    matching = RawSQL(f'SELECT rowid FROM {fts.FTS_TABLE} WHERE {fts.FTS_TABLE} MATCH %s', [match])
+    task_id = f'{connection.ops.quote_name(Task._meta.db_table)}.{connection.ops.quote_name(Task._meta.pk.column)}'
+    rank = RawSQL(
+        f'SELECT bm25({fts.FTS_TABLE}, %s, %s) FROM {fts.FTS_TABLE} '
+        f'WHERE {fts.FTS_TABLE} MATCH %s AND {fts.FTS_TABLE}.rowid = {task_id}',
+        [TITLE_WEIGHT, DESCRIPTION_WEIGHT, match],
+        output_field=FloatField(),
+    )
+    return tasks.filter(pk__in=matching).annotate(rank=rank).order_by('rank', '-created_at')
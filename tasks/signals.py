@@ -0,0 +1,97 @@
+# tasks/signals.py
+"""
+Signal receivers that keep denormalized task data in sync with the source tables.
+Connected in TasksConfig.ready().
+"""
+
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from .models import Task, Bid, TaskCategory
+from . import skill_index, bid_stats, category_stats, similarity
+
+
+# --- Skill -> OPEN task index ---
+
+@receiver(post_save, sender=Task)
+def update_skill_index_on_task_save(sender, instance, created, raw=False, **kwargs):
+    # A brand-new task has no skills yet; its rows arrive through m2m_changed.
+    if raw or created:
+        return
+    skill_index.sync_task(instance)
+
+
+@receiver(m2m_changed, sender=Task.skills_required.through)
+def update_skill_index_on_skills_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        skill_index.sync_task(instance)
+    elif action == 'post_clear':
+        # skill.task_set.clear(): the Skill's own index rows are all stale
+        instance.open_task_entries.all().delete()
+    else:
+        skill_index.sync_tasks(pk_set)
+
+
+# --- Similar-task signatures ---
+
+@receiver(post_save, sender=Task)
+def update_similarity_on_task_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    similarity.sync_task(instance)
+
+
+@receiver(m2m_changed, sender=Task.skills_required.through)
+def update_similarity_on_skills_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # pk_set is None on clear; remember which tasks are about to lose the skill
+        instance._similarity_task_ids = list(instance.task_set.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        similarity.sync_task(instance)
+    elif action == 'post_clear':
+        similarity.sync_tasks(getattr(instance, '_similarity_task_ids', ()))
+    else:
+        similarity.sync_tasks(pk_set)
+
+
+# --- Bid statistics on Task ---
+
+@receiver(post_save, sender=Bid)
+def update_bid_stats_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        bid_stats.record_bid_added(instance)
+    else:
+        # Amount edits and acceptance: recompute rather than trust a stale old value
+        bid_stats.refresh([instance.task_id])
+
+
+@receiver(post_delete, sender=Bid)
+def update_bid_stats_on_delete(sender, instance, **kwargs):
+    # Runs inside the deletion's transaction (including cascades from FreelancerProfile)
+    bid_stats.record_bid_removed(instance)
+
+
+# --- Cached category counts ---
+
+@receiver(post_save, sender=Task)
+def invalidate_category_counts_on_task_save(sender, instance, created, **kwargs):
+    loaded = getattr(instance, '_loaded_category_status', None)
+    if created or loaded != (instance.category_id, instance.status):
+        category_stats.invalidate()
+        instance._loaded_category_status = (instance.category_id, instance.status)
+
+
+@receiver(post_delete, sender=Task)
+@receiver(post_save, sender=TaskCategory)
+@receiver(post_delete, sender=TaskCategory)
+def invalidate_category_counts(sender, **kwargs):
+    category_stats.invalidate()
@@ -0,0 +1,186 @@
+# tasks/similarity.py
+"""
+"Similar open tasks" via MinHash signatures and LSH banding.
+
+A task's features are the distinct words of its title and description
+(lowercased, stop words and very short words dropped) plus one token per
+required skill. Its MinHash signature (NUM_PERM uint32 values, computed with
+NumPy) estimates the Jaccard similarity of two feature sets as the fraction of
+positions on which their signatures agree.
+
+Signatures are stored for every task (TaskSignature). OPEN tasks also get
+BANDS bucket rows (TaskLSHBucket): the signature is cut into bands of
+ROWS_PER_BAND values, and each band is hashed to one key. Tasks that share a
+key are candidates.
+
+A lookup reads the rows for the query task's keys, capped at
+MAX_BUCKET_ROWS, through the (key, task) index. It scores at most
+MAX_CANDIDATES of them on their signatures and returns the best matches.
+Latency is bounded by those caps, not by catalogue size.
+
+sync_tasks() recomputes signatures and buckets. tasks.signals calls it on
+save and on skills changes. Code that changes Task.status with
+QuerySet.update() calls it too, as it does for the skill index.
+"""
+
+import hashlib
+import re
+import zlib
+from collections import Counter
+
+import numpy as np
+from django.db import connection, transaction
+
+from .models import Task, TaskSignature, TaskLSHBucket
+
+NUM_PERM = 96
+ROWS_PER_BAND = 3
+BANDS = NUM_PERM // ROWS_PER_BAND
+
+MAX_BUCKET_ROWS = 2000
+MAX_CANDIDATES = 200
+MIN_SIMILARITY = 0.15
+DEFAULT_LIMIT = 5
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20261018)  # fixed seed: stored signatures must stay comparable
+_A = _rng.integers(1, _PRIME, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, size=NUM_PERM, dtype=np.uint64)
+
+_INSERT_BUCKET = 'INSERT INTO {} ({}, {}) VALUES (%s, %s)'.format(
+    *map(connection.ops.quote_name, (TaskLSHBucket._meta.db_table, 'key', 'task_id'))
+)
+
+_WORD_RE = re.compile(r'[^\W_]{3,}', re.UNICODE)
+STOP_WORDS = frozenset("""
+    the and for with that this from have will are you your our not but can all any need needs needed
+    who what when where which into about also more than then them they their there these those must
+    should would could been being was were has had its it's get got make looking want wanted please
+""".split())
+
+
+def features(title, description, skill_ids):
+    words = {w for w in _WORD_RE.findall(f'{title} {description}'.lower()) if w not in STOP_WORDS}
+    return words | {f'skill:{pk}' for pk in skill_ids}
+
+
+def signature(tokens):
+    """ MinHash signature (uint32 array of NUM_PERM values) of a set of string tokens. """
+    if not tokens:
+        return np.full(NUM_PERM, _PRIME, dtype=np.uint32)
+    hashes = np.fromiter((zlib.crc32(t.encode()) for t in tokens), dtype=np.uint64, count=len(tokens))
+    # (a * x + b) mod p for every (permutation, token); the minimum per permutation
+    return ((_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+def band_keys(sig):
+    """ The BANDS bucket keys of a signature, as signed 64-bit integers. """
+    keys = []
+    for band in range(BANDS):
+        chunk = sig[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes()
+        digest = hashlib.blake2b(band.to_bytes(2, 'big') + chunk, digest_size=8).digest()
+        keys.append(int.from_bytes(digest, 'big', signed=True))
+    return keys
+
+
+def _unpack(blob):
+    return np.frombuffer(bytes(blob), dtype=np.uint32)
+
+
+def sync_tasks(task_ids):
+    """
+    Recomputes the signatures of the given tasks and rebuilds their bucket
+    rows; tasks that are not OPEN keep a signature but lose their buckets.
+    """
+    task_ids = list(task_ids)
+    if not task_ids:
+        return
+
+    rows = list(Task.objects.filter(pk__in=task_ids).values_list('pk', 'title', 'description', 'status'))
+    skills = {}
+    for task_id, skill_id in Task.skills_required.through.objects.filter(
+        task_id__in=task_ids
+    ).values_list('task_id', 'skill_id'):
+        skills.setdefault(task_id, []).append(skill_id)
+
+    signatures, buckets = [], []
+    for pk, title, description, status in rows:
+        tokens = features(title, description, skills.get(pk, ()))
+        sig = signature(tokens)
+        signatures.append(TaskSignature(task_id=pk, minhash=sig.tobytes()))
+        # Featureless tasks would all share every bucket without being alike
+        if status == 'OPEN' and tokens:
+            buckets.extend((key, pk) for key in set(band_keys(sig)))
+
+    with transaction.atomic():
+        TaskLSHBucket.objects.filter(task_id__in=task_ids).delete()
+        TaskSignature.objects.bulk_create(
+            signatures, update_conflicts=True, unique_fields=['task'], update_fields=['minhash'],
+        )
+        # Plain tuples through executemany: ~BANDS rows per task make model instances the bottleneck
+        with connection.cursor() as cursor:
+            cursor.executemany(_INSERT_BUCKET, buckets)
+
+
+def sync_task(task):
+    sync_tasks([task.pk])
+
+
+def rebuild(batch_size=1000):
+    """ Recomputes every signature and bucket, batch_size tasks at a time. Returns the task count. """
+    TaskLSHBucket.objects.all().delete()
+    total = 0
+    last_pk = 0
+    while True:
+        ids = list(Task.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return total
+        sync_tasks(ids)
+        total += len(ids)
+        last_pk = ids[-1]
+
+
+def similar_open_tasks(task, limit=DEFAULT_LIMIT):
+    """
+    Up to `limit` OPEN tasks most similar to `task`, best first, each with a
+    `similarity` attribute (estimated Jaccard). Costs one query for the
+    candidates and their signatures, and one for the chosen tasks, plus the
+    task's own signature unless it was loaded with select_related('signature').
+    """
+    try:
+        sig = _unpack(task.signature.minhash)
+    except TaskSignature.DoesNotExist:
+        return []
+
+    # Candidate rows carry their signature, so no second round trip is needed to score them
+    rows = (
+        TaskLSHBucket.objects.filter(key__in=band_keys(sig))
+        .exclude(task_id=task.pk)
+        .values_list('task_id', 'task__signature__minhash')[:MAX_BUCKET_ROWS]
+    )
+    hits, blobs = Counter(), {}
+    for task_id, blob in rows:
+        hits[task_id] += 1
+        blobs[task_id] = blob
+    if not hits:
+        return []
+
+    # Tasks sharing more bands are likelier neighbours; score only the most promising
+    candidate_ids = [task_id for task_id, _ in hits.most_common(MAX_CANDIDATES)]
+    matrix = np.stack([_unpack(blobs[task_id]) for task_id in candidate_ids])
+    scores = (matrix == sig).mean(axis=1)
+
+    ranked = sorted(
+        ((score, task_id) for score, task_id in zip(scores.tolist(), candidate_ids) if score >= MIN_SIMILARITY),
+        reverse=True,
+    )[:limit]
+    if not ranked:
+        return []
+
+    tasks = Task.objects.filter(status='OPEN').select_related('category').in_bulk([task_id for _, task_id in ranked])
+    similar = []
+    for score, task_id in ranked:
+        if task_id in tasks:
+            tasks[task_id].similarity = score
+            similar.append(tasks[task_id])
+    return similar
@@ -0,0 +1,97 @@
+# tasks/skill_index.py
+"""
+Maintenance and lookup helpers for the Skill -> OPEN Task inverted index
+(tasks.models.OpenTaskSkill).
+
+The index is kept current by the receivers in tasks/signals.py. Code paths
+that change Task.status with QuerySet.update() bypass those signals and must
+call sync_tasks() themselves.
+"""
+
+from django.db import transaction
+
+from .models import Task, OpenTaskSkill, Bid
+
+SkillThrough = Task.skills_required.through
+
+
+def sync_tasks(task_ids):
+    """
+    Rebuilds the index rows for the given task ids from their current
+    status and skills_required. Non-OPEN tasks simply lose their rows.
+    """
+    task_ids = list(task_ids)
+    if not task_ids:
+        return
+
+    with transaction.atomic():
+        OpenTaskSkill.objects.filter(task_id__in=task_ids).delete()
+
+        created_at = dict(
+            Task.objects.filter(pk__in=task_ids, status='OPEN').values_list('pk', 'created_at')
+        )
+        if not created_at:
+            return
+
+        pairs = SkillThrough.objects.filter(task_id__in=created_at).values_list('skill_id', 'task_id')
+        OpenTaskSkill.objects.bulk_create(
+            [OpenTaskSkill(skill_id=skill_id, task_id=task_id, task_created_at=created_at[task_id])
+             for skill_id, task_id in pairs],
+            ignore_conflicts=True,
+        )
+
+
+def sync_task(task):
+    sync_tasks([task.pk])
+
+
+def backfill(task_model, index_model, batch_size=5000):
+    """
+    Writes the index rows of every OPEN task into an empty index and returns
+    how many were written. Takes the model classes so migration 0004 can run
+    it with its historical models; it must only use fields those models have
+    (Task.status, created_at and skills_required, and OpenTaskSkill as created there).
+    """
+    pairs = (
+        task_model.skills_required.through.objects.filter(task__status='OPEN')
+        .values_list('skill_id', 'task_id', 'task__created_at')
+        .order_by('task_id')
+    )
+    written = 0
+    batch = []
+    for skill_id, task_id, created_at in pairs.iterator(chunk_size=batch_size):
+        batch.append(index_model(skill_id=skill_id, task_id=task_id, task_created_at=created_at))
+        if len(batch) >= batch_size:
+            index_model.objects.bulk_create(batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        index_model.objects.bulk_create(batch)
+        written += len(batch)
+    return written
+
+
+def rebuild(batch_size=5000):
+    """
+    Regenerates the whole index from scratch. Used by the rebuild_skill_index
+    management command. Returns the number of rows written.
+    """
+    with transaction.atomic():
+        OpenTaskSkill.objects.all().delete()
+        return backfill(Task, OpenTaskSkill, batch_size)
+
+
+def open_tasks_for_skills(skill_ids, exclude_bids_by=None):
+    """
+    Returns OPEN tasks requiring at least one of skill_ids, newest first.
+
+    The skill match is an index search on OpenTaskSkill's (skill, task) key; tasks
+    the given FreelancerProfile already bid on are removed with an anti-join
+    against that freelancer's bids.
+    """
+    entries = OpenTaskSkill.objects.filter(skill_id__in=skill_ids)
+    if exclude_bids_by is not None:
+        entries = entries.exclude(
+            task_id__in=Bid.objects.filter(freelancer=exclude_bids_by).values('task_id')
+        )
+    return Task.objects.filter(pk__in=entries.values('task_id')).order_by('-created_at')
@@ -1,3 +1,999 @@
-from django.test import TestCase
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import User
+from FREELANCE.pagination import NEXT, encode_cursor
+from FREELANCE.testing import ConcurrencyMixin, QueryBudgetMixin
+from freelancers.models import FreelancerProfile, Skill
+from .models import Task, TaskCategory, Bid, TaskTransition, OpenTaskSkill, TaskSubmission, ChunkedUpload
+from .category_stats import category_counts
+from .ranking import rank_for_freelancer
+from .search import search_tasks
+from . import bid_stats, fts, similarity, skill_index, uploads
+from .digests import send_task_digests
+from .expiry import expire_overdue_tasks
+from .workflow import accept_bid, BidAcceptanceError, place_bid, transition, InvalidTransition, tasks_in_status_longer_than
+
+
+def make_client(username='client'):
+    return User.objects.create(username=username, email=f'{username}@example.com', user_type=1)
+
+
+def make_freelancer(username):
+    user = User.objects.create(username=username, email=f'{username}@example.com', user_type=2)
+    return FreelancerProfile.objects.create(user=user)
+
+
+class AcceptBidTests(TestCase):
+
+    def setUp(self):
+        self.client_user = make_client()
+        self.task = Task.objects.create(title='Logo', description='A logo', client=self.client_user)
+        self.profiles = [make_freelancer(f'free{i}') for i in range(3)]
+        self.bids = [
+            Bid.objects.create(task=self.task, freelancer=p, amount=100 + i, delivery_days=3)
+            for i, p in enumerate(self.profiles)
+        ]
+
+    def test_accept_assigns_task_and_flags_competing_bids(self):
+        accept_bid(self.task.pk, self.bids[1].pk, self.client_user)
+
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, 'BID_ACCEPTED')
+        self.assertEqual(self.task.freelancer_id, self.profiles[1].user_id)
+        self.assertEqual(
+            list(self.task.bids.order_by('pk').values_list('is_accepted', 'is_rejected')),
+            [(False, True), (True, False), (False, True)],
+        )
+
+    def test_second_acceptance_is_refused(self):
+        accept_bid(self.task.pk, self.bids[0].pk, self.client_user)
+        with self.assertRaises(BidAcceptanceError):
+            accept_bid(self.task.pk, self.bids[2].pk, self.client_user)
+        self.assertEqual(self.task.bids.filter(is_accepted=True).count(), 1)
+
+    def test_acceptance_is_logged(self):
+        accept_bid(self.task.pk, self.bids[0].pk, self.client_user)
+        entry = self.task.transitions.get()
+        self.assertEqual((entry.from_status, entry.status, entry.actor), ('OPEN', 'BID_ACCEPTED', self.client_user))
+
+    def test_other_clients_and_foreign_bids_are_refused(self):
+        other_task = Task.objects.create(title='Other', description='x', client=self.client_user)
+        with self.assertRaises(BidAcceptanceError):
+            accept_bid(other_task.pk, self.bids[0].pk, self.client_user)
+        with self.assertRaises(BidAcceptanceError):
+            accept_bid(self.task.pk, self.bids[0].pk, make_client('intruder'))
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, 'OPEN')
+
+
+class BidStatsTests(TestCase):
+
+    def setUp(self):
+        self.task = Task.objects.create(title='Logo', description='A logo', client=make_client())
+        self.profiles = [make_freelancer(f'free{i}') for i in range(3)]
+
+    def bid(self, profile, amount):
+        return Bid.objects.create(task=self.task, freelancer=profile, amount=amount, delivery_days=3)
+
+    def stats(self):
+        self.task.refresh_from_db()
+        return self.task.bid_count, self.task.bid_total, self.task.lowest_bid
+
+    def test_create_and_delete_apply_deltas(self):
+        bids = [self.bid(p, amount) for p, amount in zip(self.profiles, (120, 80, 100))]
+        self.assertEqual(self.stats(), (3, 300, 80))
+        self.assertEqual(self.task.average_bid, 100)
+
+        bids[1].delete()
+        self.assertEqual(self.stats(), (2, 220, 100))
+        bids[0].delete()
+        bids[2].delete()
+        self.assertEqual(self.stats(), (0, 0, None))
+
+    def test_stale_instance_save_keeps_the_counters(self):
+        stale = Task.objects.get(pk=self.task.pk)
+        self.bid(self.profiles[0], 50)
+        stale.title = 'Logo and icon'
+        stale.save()
+        stale.save(update_fields=['title', 'bid_count'])
+        self.assertEqual(self.stats(), (1, 50, 50))
+        self.assertEqual(self.task.title, 'Logo and icon')
+
+    def test_rebuild_repairs_drift(self):
+        self.bid(self.profiles[0], 70)
+        self.bid(self.profiles[1], 90)
+        Task.objects.filter(pk=self.task.pk).update(bid_count=9, bid_total=1, lowest_bid=None)
+        self.assertEqual(bid_stats.rebuild_all(batch_size=1), 1)
+        self.assertEqual(self.stats(), (2, 160, 70))
+
+
+class SkillIndexTests(TestCase):
+
+    def setUp(self):
+        self.client_user = make_client()
+        self.python, self.design, self.video = (Skill.objects.create(name=name) for name in ('Python', 'Design', 'Video'))
+        self.task = Task.objects.create(title='Scraper', description='x', client=self.client_user)
+        self.other = Task.objects.create(title='Logo', description='x', client=self.client_user)
+
+    def entries(self):
+        return set(OpenTaskSkill.objects.values_list('skill_id', 'task_id'))
+
+    def test_m2m_changes_follow_both_sides(self):
+        self.task.skills_required.add(self.python, self.design)
+        self.other.skills_required.add(self.design)
+        self.assertEqual(self.entries(), {(self.python.pk, self.task.pk), (self.design.pk, self.task.pk),
+                                          (self.design.pk, self.other.pk)})
+
+        self.task.skills_required.remove(self.python)
+        self.assertEqual(self.entries(), {(self.design.pk, self.task.pk), (self.design.pk, self.other.pk)})
+
+        self.video.task_set.add(self.task, self.other)
+        self.video.task_set.remove(self.other)
+        self.assertEqual(self.entries(), {(self.design.pk, self.task.pk), (self.design.pk, self.other.pk),
+                                          (self.video.pk, self.task.pk)})
+
+        self.design.task_set.clear()
+        self.assertEqual(self.entries(), {(self.video.pk, self.task.pk)})
+        self.task.skills_required.clear()
+        self.assertEqual(self.entries(), set())
+
+    def test_tasks_leaving_open_drop_out(self):
+        self.task.skills_required.add(self.python)
+        self.other.skills_required.add(self.python)
+        transition(self.task, 'CANCELLED', actor=self.client_user)
+        self.assertEqual(self.entries(), {(self.python.pk, self.other.pk)})
+
+        Task.objects.filter(pk=self.other.pk).update(status='EXPIRED')
+        skill_index.sync_tasks([self.other.pk])
+        self.assertEqual(self.entries(), set())
+        self.assertFalse(skill_index.open_tasks_for_skills([self.python.pk]).exists())
+
+    def test_feed_skips_tasks_the_freelancer_bid_on(self):
+        self.task.skills_required.add(self.python)
+        self.other.skills_required.add(self.python)
+        profile = make_freelancer('maker')
+        Bid.objects.create(task=self.task, freelancer=profile, amount=10, delivery_days=2)
+        self.assertEqual(list(skill_index.open_tasks_for_skills([self.python.pk], exclude_bids_by=profile)), [self.other])
+
+    def test_rebuild_repairs_drift(self):
+        self.task.skills_required.add(self.python, self.design)
+        self.other.skills_required.add(self.video)
+        expected = self.entries()
+        Task.objects.filter(pk=self.other.pk).update(status='IN_PROGRESS')  # bypasses the signals
+        OpenTaskSkill.objects.filter(task=self.task, skill=self.python).delete()
+
+        self.assertEqual(skill_index.rebuild(batch_size=1), 2)
+        self.assertEqual(self.entries(), expected - {(self.video.pk, self.other.pk)})
+        self.assertEqual(
+            set(OpenTaskSkill.objects.values_list('task_created_at', flat=True)), {self.task.created_at},
+        )
+
+
+class RankingTests(TestCase):
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.client_user = make_client()
+        self.profile = make_freelancer('ranked')
+        self.python, self.design, self.video = (Skill.objects.create(name=name) for name in ('Python', 'Design', 'Video'))
+        self.profile.skills.set([self.python, self.design])
+
+    def make(self, title, skills, budget=None, age=timedelta(0)):
+        task = Task.objects.create(title=title, description='x', client=self.client_user, budget=budget)
+        task.skills_required.set(skills)
+        Task.objects.filter(pk=task.pk).update(created_at=self.now - age)
+        return task
+
+    def ranked(self, **kwargs):
+        skill_ids = [self.python.pk, self.design.pk]
+        tasks = rank_for_freelancer(Task.objects.all(), self.profile, skill_ids, now=self.now, **kwargs)
+        return {task.title: task for task in tasks}
+
+    def test_scores_weigh_overlap_budget_fit_and_recency(self):
+        self.profile.hourly_rate = Decimal('50.00')  # 40 hours: a 2000.00 budget fits perfectly
+        self.make('full', [self.python, self.design], budget=Decimal('4000.00'))
+        self.make('half', [self.python, self.video], budget=Decimal('1000.00'), age=timedelta(days=3))
+        self.make('stale', [self.python], age=timedelta(days=60))
+        ranked = self.ranked()
+
+        self.assertEqual(list(ranked), ['full', 'stale', 'half'])
+        # Budgets above the target do not score above a perfect fit
+        self.assertEqual(ranked['full'].budget_fit, 1.0)
+        self.assertAlmostEqual(ranked['full'].match_score, 1.0)
+        self.assertEqual((ranked['half'].skill_overlap, ranked['half'].budget_fit, ranked['half'].recency), (0.5, 0.5, 0.7))
+        self.assertAlmostEqual(ranked['half'].match_score, 0.5 * 0.6 + 0.5 * 0.25 + 0.7 * 0.15)
+        # No budget: neutral fit
+        self.assertAlmostEqual(ranked['stale'].match_score, 0.6 + 0.5 * 0.25 + 0.1 * 0.15)
+
+        self.profile.hourly_rate = None
+        self.assertEqual({task.budget_fit for task in self.ranked().values()}, {0.5})
+
+    def test_relevance_pages_are_ranked_as_of_the_first_page(self):
+        # 15 tasks stay in the 7-day tier, 15 drop to the 30-day tier an hour after the first page
+        for i in range(15):
+            self.make(f'steady {i}', [self.python], age=timedelta(days=3, seconds=i))
+            self.make(f'ageing {i}', [self.python], age=timedelta(days=7, minutes=-30, seconds=i))
+        self.client.force_login(self.profile.user)
+        first = self.client.get('/tasks/available/', {'sort': 'relevance'}).context['page']
+        with mock.patch('django.utils.timezone.now', return_value=self.now + timedelta(hours=1)):
+            second = self.client.get('/tasks/available/', {'sort': 'relevance', 'cursor': first.next_cursor}).context['page']
+            back = self.client.get('/tasks/available/', {'sort': 'relevance', 'cursor': second.prev_cursor}).context['page']
+
+        titles = [task.title for task in first] + [task.title for task in second]
+        self.assertEqual(len(titles), 30)
+        self.assertEqual(len(set(titles)), 30)
+        self.assertEqual([task.pk for task in back], [task.pk for task in first])
+
+    def test_tampered_ranking_time_ranks_from_now(self):
+        self.make('steady', [self.python], age=timedelta(days=3))
+        self.client.force_login(self.profile.user)
+        for ranked_at in ('0001-01-01T00:00:00+00:00', '9999-12-31T23:59:59-23:59', '2026-01-01T00:00:00', 'x', 1, ['x']):
+            with self.subTest(ranked_at=ranked_at):
+                cursor = encode_cursor(NEXT, [2.0, self.now.isoformat(), 0], ranked_at)
+                response = self.client.get('/tasks/available/', {'sort': 'relevance', 'cursor': cursor})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual([task.title for task in response.context['page']], ['steady'])
+
+
+class SearchTests(TestCase):
+
+    def setUp(self):
+        self.client_user = make_client()
+
+    def make(self, title, description='x', **kwargs):
+        return Task.objects.create(title=title, description=description, client=self.client_user, **kwargs)
+
+    def titles(self, query, **kwargs):
+        return [task.title for task in search_tasks(query, status=None, **kwargs)]
+
+    def test_index_follows_inserts_updates_and_deletes(self):
+        task = self.make('Logo design')
+        self.assertEqual(self.titles('logo'), ['Logo design'])
+
+        task.title = 'Brand mascot'
+        task.save()
+        self.assertEqual(self.titles('logo'), [])
+        self.assertEqual(self.titles('mascot'), ['Brand mascot'])
+
+        Task.objects.filter(pk=task.pk).update(description='Vector illustration')
+        self.assertEqual(self.titles('vector'), ['Brand mascot'])
+
+        Task.objects.bulk_create([Task(title='Vector icons', description='x', client=self.client_user)])
+        self.assertEqual(set(self.titles('vector')), {'Brand mascot', 'Vector icons'})
+
+        task.delete()
+        self.assertEqual(self.titles('mascot'), [])
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {fts.FTS_TABLE} WHERE {fts.FTS_TABLE} MATCH 'mascot'")
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_prefix_queries_and_unsafe_input(self):
+        self.make('Python scraper')
+        self.assertEqual(self.titles('pyth*'), ['Python scraper'])
+        self.assertEqual(self.titles('pyth'), [])
+        # FTS5 syntax is quoted away, not interpreted
+        self.assertEqual(self.titles('"python" scraper) OR'), [])
+        self.assertEqual(self.titles('"python" (scraper'), ['Python scraper'])
+        self.assertEqual(self.titles('*** "'), [])
+
+    def test_results_in_bm25_order_with_title_hits_first(self):
+        self.make('Flyer', description='A logo for print')
+        self.make('Logo refresh', description='Modernise the brand')
+        self.make('Poster', description='A logo, logo print')
+        for i in range(8):  # so that "logo" is a rare enough term to carry weight
+            self.make(f'Unrelated {i}', description='Nothing here')
+        results = list(search_tasks('logo', status=None))
+        # The title hit first, then the description with more hits
+        self.assertEqual([task.title for task in results], ['Logo refresh', 'Poster', 'Flyer'])
+        self.assertEqual([task.rank for task in results], sorted(task.rank for task in results))
+
+    def test_admin_search_uses_the_index(self):
+        self.make('Logo design')
+        self.make('Copywriting', description='No match')
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        response = self.client.get('/admin/tasks/task/', {'q': 'logo', 'o': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([task.title for task in response.context['cl'].result_list], ['Logo design'])
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+
+class TransitionTests(TestCase):
+
+    def setUp(self):
+        self.client_user = make_client()
+        self.task = Task.objects.create(title='Copy', description='Web copy', client=self.client_user)
+
+    def test_valid_path_is_logged(self):
+        for status in ('BID_ACCEPTED', 'IN_PROGRESS', 'UNDER_REVIEW', 'COMPLETED', 'PAID'):
+            transition(self.task, status, actor=self.client_user)
+
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, 'PAID')
+        self.assertEqual(
+            list(self.task.transitions.values_list('from_status', 'status')),
+            [('OPEN', 'BID_ACCEPTED'), ('BID_ACCEPTED', 'IN_PROGRESS'), ('IN_PROGRESS', 'UNDER_REVIEW'),
+             ('UNDER_REVIEW', 'COMPLETED'), ('COMPLETED', 'PAID')],
+        )
+
+    def test_invalid_and_stale_transitions_are_rejected(self):
+        with self.assertRaises(InvalidTransition):
+            transition(self.task, 'COMPLETED')
+
+        stale_copy = Task.objects.get(pk=self.task.pk)
+        transition(self.task, 'CANCELLED')
+        with self.assertRaises(InvalidTransition):
+            transition(stale_copy, 'BID_ACCEPTED')
+        self.assertEqual(self.task.transitions.count(), 1)
+
+    def test_instance_saves_cannot_change_status(self):
+        task = Task.objects.get(pk=self.task.pk)
+        task.status = 'PAID'
+        with self.assertRaises(ValueError):
+            task.save()
+
+        stale = Task.objects.get(pk=self.task.pk)
+        transition(self.task, 'CANCELLED')
+        self.task.save()  # the status it was moved to is not a change
+        stale.title = 'Web copy, revised'
+        stale.save()
+        self.task.refresh_from_db()
+        self.assertEqual((self.task.status, self.task.title), ('CANCELLED', 'Web copy, revised'))
+
+    def test_admin_changes_status_only_through_transitions(self):
+        admin_user = User.objects.create_superuser(username='admin', email='admin@example.com', password='x')
+        self.client.force_login(admin_user)
+        url = f'/admin/tasks/task/{self.task.pk}/change/'
+        self.assertNotContains(self.client.get(url), 'name="status"')
+
+        done = Task.objects.create(title='Done', description='x', client=self.client_user)
+        transition(done, 'CANCELLED')
+        self.client.post('/admin/tasks/task/', {
+            'action': 'move_to_cancelled', '_selected_action': [self.task.pk, done.pk],
+        })
+        self.assertEqual(dict(Task.objects.values_list('pk', 'status')),
+                         {self.task.pk: 'CANCELLED', done.pk: 'CANCELLED'})
+        entry = self.task.transitions.get()
+        self.assertEqual((entry.status, entry.actor), ('CANCELLED', admin_user))
+
+    def test_admin_accepts_bids_only_through_accept_bid(self):
+        admin_user = User.objects.create_superuser(username='admin', email='admin@example.com', password='x')
+        self.client.force_login(admin_user)
+        chosen, other = (Bid.objects.create(task=self.task, freelancer=make_freelancer(name), amount=50, delivery_days=2)
+                         for name in ('chosen', 'other'))
+        # No generic action can move a task to BID_ACCEPTED without a bid
+        self.client.post('/admin/tasks/task/', {'action': 'move_to_bid_accepted', '_selected_action': [self.task.pk]})
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, 'OPEN')
+
+        self.client.post('/admin/tasks/bid/', {'action': 'accept_selected_bid', '_selected_action': [chosen.pk, other.pk]})
+        self.assertFalse(Bid.objects.filter(is_accepted=True).exists())
+        self.client.post('/admin/tasks/bid/', {'action': 'accept_selected_bid', '_selected_action': [chosen.pk]})
+        self.task.refresh_from_db()
+        self.assertEqual((self.task.status, self.task.freelancer_id), ('BID_ACCEPTED', chosen.freelancer.user_id))
+        self.assertEqual(set(Bid.objects.values_list('pk', 'is_accepted', 'is_rejected')),
+                         {(chosen.pk, True, False), (other.pk, False, True)})
+        entry = self.task.transitions.get()
+        self.assertEqual((entry.status, entry.actor), ('BID_ACCEPTED', admin_user))
+
+    def test_log_is_append_only(self):
+        entry = transition(self.task, 'CANCELLED').transitions.get()
+        with self.assertRaises(ValueError):
+            entry.save()
+        with self.assertRaises(ValueError):
+            entry.delete()
+
+    def test_tasks_in_status_longer_than(self):
+        transition(self.task, 'BID_ACCEPTED')
+        transition(self.task, 'IN_PROGRESS')
+        transition(self.task, 'UNDER_REVIEW')
+        fresh = Task.objects.create(title='Fresh', description='x', client=self.client_user, status='UNDER_REVIEW')
+        TaskTransition.objects.create(task=fresh, from_status='IN_PROGRESS', status='UNDER_REVIEW')
+        TaskTransition.objects.filter(task=self.task, status='UNDER_REVIEW').update(
+            timestamp=self.task.updated_at - timedelta(days=4)
+        )
+
+        self.assertEqual(list(tasks_in_status_longer_than('UNDER_REVIEW', timedelta(days=3))), [self.task])
+
+
+class ExpiryTests(TestCase):
+
+    def test_only_overdue_open_tasks_are_cancelled(self):
+        from freelancers.models import Skill
+
+        client = make_client()
+        skill = Skill.objects.create(name='Copywriting')
+        past, future = timezone.now() - timedelta(days=1), timezone.now() + timedelta(days=1)
+        overdue = [Task.objects.create(title=f'Old {i}', description='x', client=client, due_date=past) for i in range(5)]
+        for task in overdue:
+            task.skills_required.add(skill)
+        current = Task.objects.create(title='Current', description='x', client=client, due_date=future)
+        finished = Task.objects.create(title='Done', description='x', client=client, due_date=past, status='PAID')
+        bid = Bid.objects.create(task=overdue[0], freelancer=make_freelancer('free'), amount=10, delivery_days=1)
+
+        self.assertEqual(expire_overdue_tasks(batch_size=2), 5)
+
+        self.assertEqual(Task.objects.filter(status='CANCELLED').count(), 5)
+        self.assertEqual(Task.objects.get(pk=current.pk).status, 'OPEN')
+        self.assertEqual(Task.objects.get(pk=finished.pk).status, 'PAID')
+        self.assertTrue(Bid.objects.get(pk=bid.pk).is_rejected)
+        self.assertFalse(OpenTaskSkill.objects.exists())
+        self.assertEqual(TaskTransition.objects.filter(from_status='OPEN', status='CANCELLED').count(), 5)
+        self.assertEqual(expire_overdue_tasks(), 0)
+
+
+class CategoryCountTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client_user = make_client()
+        self.design = TaskCategory.objects.create(name='Design')
+        self.writing = TaskCategory.objects.create(name='Writing')
+        self.task = Task.objects.create(title='Logo', description='x', client=self.client_user, category=self.design)
+        Task.objects.create(title='Banner', description='x', client=self.client_user, category=self.design)
+
+    def counts(self):
+        return {row['name']: (row['open_count'], row['total_count']) for row in category_counts()}
+
+    def test_counts_are_cached(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.counts(), {'Design': (2, 2), 'Writing': (0, 0)})
+        with self.assertNumQueries(0):
+            self.counts()
+
+    def test_status_and_category_changes_invalidate(self):
+        self.counts()
+        with self.captureOnCommitCallbacks(execute=True):
+            transition(self.task, 'CANCELLED')
+        self.assertEqual(self.counts(), {'Design': (1, 2), 'Writing': (0, 0)})
+
+        task = Task.objects.get(pk=self.task.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            task.category = self.writing
+            task.save()
+        self.assertEqual(self.counts(), {'Design': (1, 1), 'Writing': (0, 1)})
+
+        # A save that touches neither field keeps the cached entry
+        with self.captureOnCommitCallbacks() as callbacks:
+            task.title = 'Renamed'
+            task.save()
+        self.assertEqual(callbacks, [])
+
+    def test_category_page(self):
+        response = self.client.get('/tasks/categories/')
+        self.assertContains(response, '2 open')
+
+
+class DigestTests(TestCase):
+
+    def setUp(self):
+        from freelancers.models import Skill
+
+        client = make_client()
+        self.python, self.design, self.writing = (Skill.objects.create(name=n) for n in ('Python', 'Design', 'Writing'))
+        self.api = Task.objects.create(title='Build API', description='x', client=client)
+        self.api.skills_required.set([self.python, self.design])
+        self.logo = Task.objects.create(title='Logo', description='x', client=client)
+        self.logo.skills_required.set([self.design])
+        closed = Task.objects.create(title='Closed', description='x', client=client, status='CANCELLED')
+        closed.skills_required.set([self.python])
+
+        self.both = make_freelancer('both')
+        self.both.skills.set([self.python, self.design])
+        self.coder = make_freelancer('coder')
+        self.coder.skills.set([self.python])
+        make_freelancer('writer').skills.set([self.writing])
+
+    def test_one_digest_per_matching_freelancer(self):
+        run = send_task_digests()
+
+        self.assertEqual((run.tasks, run.digests), (3, 2))
+        by_recipient = {m.to[0]: m for m in mail.outbox}
+        self.assertEqual(set(by_recipient), {'both@example.com', 'coder@example.com'})
+        self.assertIn('2 new tasks', by_recipient['both@example.com'].subject)
+        self.assertIn('Build API', by_recipient['both@example.com'].body)
+        self.assertIn('Logo', by_recipient['both@example.com'].body)
+        self.assertNotIn('Closed', by_recipient['coder@example.com'].body)
+
+    def test_tasks_are_digested_once(self):
+        send_task_digests()
+        self.assertEqual(send_task_digests().tasks, 0)
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_stale_instance_save_keeps_the_digest_stamp(self):
+        send_task_digests()
+        self.api.title = 'Build REST API'  # loaded before the run, digest_sent_at still None
+        self.api.save()
+        self.api.save(update_fields=['title', 'digest_sent_at'])
+        self.api.refresh_from_db()
+        self.assertEqual(self.api.title, 'Build REST API')
+        self.assertIsNotNone(self.api.digest_sent_at)
+        self.assertEqual(send_task_digests().tasks, 0)
+
+    def test_query_count_does_not_grow_with_freelancers(self):
+        for i in range(10):
+            make_freelancer(f'extra{i}').skills.set([self.design])
+        # claim (select + update), task details, and the set-based match query
+        with self.assertNumQueries(4):
+            self.assertEqual(send_task_digests().digests, 12)
+
+
+class ImportTasksTests(TestCase):
+
+    def setUp(self):
+        self.client_user = make_client()
+        self.python, self.design = (Skill.objects.create(name=n) for n in ('Python', 'Design'))
+        TaskCategory.objects.create(name='Web')
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp, name)
+        with open(path, 'w', encoding='utf-8', newline='') as fh:
+            fh.write(text)
+        return path
+
+    def run_import(self, path, *args):
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_tasks', path, '--client', 'client', *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    CSV = (
+        'title,description,category,skills,budget,due_date,status\n'
+        'Django API,Build a Django REST API,Web,Python|Design,500,2030-01-31,OPEN\n'
+        'Old logo,"Hand lettered logo,\nsecond line",,Design,,,COMPLETED\n'
+        'Landing page,Responsive landing page,Web,Design,120.50,2030-02-01T10:00:00,OPEN\n'
+    )
+
+    def test_imports_rows_and_keeps_indexes_in_step(self):
+        out, err = self.run_import(self.write('tasks.csv', self.CSV))
+        self.assertEqual(err, '')
+        self.assertIn('Imported 3 tasks', out)
+
+        api = Task.objects.get(title='Django API')
+        self.assertEqual((api.client, api.category.name, api.budget), (self.client_user, 'Web', 500))
+        self.assertEqual(set(api.skills_required.all()), {self.python, self.design})
+        # Only OPEN tasks enter the skill index and the LSH buckets; every task gets a signature
+        self.assertEqual(set(OpenTaskSkill.objects.values_list('task__title', 'skill__name')),
+                         {('Django API', 'Python'), ('Django API', 'Design'), ('Landing page', 'Design')})
+        self.assertTrue(api.lsh_buckets.exists())
+        self.assertFalse(Task.objects.get(title='Old logo').lsh_buckets.exists())
+        self.assertEqual(Task.objects.filter(signature__isnull=False).count(), 3)
+
+    def test_imported_tasks_are_not_digested_unless_notify(self):
+        make_freelancer('designer').skills.set([self.design])
+        self.run_import(self.write('tasks.csv', self.CSV))
+        self.assertEqual(send_task_digests().tasks, 0)
+        self.assertEqual(mail.outbox, [])
+
+        self.run_import(self.write('more.csv', self.CSV.replace('Django API', 'Flask API')), '--notify')
+        self.assertEqual(send_task_digests().tasks, 3)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_rejected_rows_report_file_lines(self):
+        path = self.write('bad.csv', self.CSV + (
+            ',No title,,,,,OPEN\n'
+            'Bad budget,"multi\nline",,,lots,,OPEN\n'
+            'Bad skill,x,,Cobol,,,OPEN\n'
+            'Bad status,x,,,,,DONE\n'
+        ))
+        out, err = self.run_import(path)
+        self.assertEqual(err.splitlines(), [
+            "Line 6: missing title",
+            "Line 8: invalid budget 'lots'",
+            "Line 9: unknown skill 'Cobol'",
+            "Line 10: invalid status 'DONE'",
+        ])
+        self.assertIn('Imported 3 tasks', out)
+        self.assertIn('4 rows rejected', out)
+
+        with self.assertRaises(CommandError):
+            self.run_import(path, '--max-errors', '2')
+
+    def test_jsonl_in_batches(self):
+        lines = [f'{{"title": "Task {i}", "skills": ["Python"], "category": "Data"}}' for i in range(5)]
+        path = self.write('tasks.jsonl', '\n'.join(lines[:2] + ['', 'not json'] + lines[2:]) + '\n')
+        out, err = self.run_import(path, '--batch-size', '2', '--create-missing')
+        self.assertIn('Line 4: invalid JSON', err)
+        # 6 rows read in batches of 2: three progress lines
+        self.assertEqual(out.count('tasks imported'), 3)
+        self.assertEqual(Task.objects.filter(category__name='Data').count(), 5)
+        self.assertEqual(OpenTaskSkill.objects.filter(skill=self.python).count(), 5)
+
+    def test_malformed_jsonl_rows_are_rejected(self):
+        path = self.write('bad.jsonl', '\n'.join([
+            '[1, 2]',
+            '{"title": 123}',
+            '{"title": "NaN budget", "budget": "NaN"}',
+            '{"title": "Huge budget", "budget": "123456789012"}',
+            '{"title": "Bool budget", "budget": true}',
+            '{"title": "Bad skills", "skills": [1]}',
+            '{"title": "Bad date", "due_date": "2030-02-30"}',
+            '{"title": "Rounded", "budget": 19.999}',
+        ]) + '\n')
+        out, err = self.run_import(path)
+        self.assertEqual(err.splitlines(), [
+            "Line 1: expected an object, got list",
+            "Line 2: 'title' must be text, got int",
+            "Line 3: invalid budget 'NaN'",
+            "Line 4: budget '123456789012' has more than 10 digits",
+            "Line 5: invalid budget 'True'",
+            "Line 6: 'skills' must be text or a list of text",
+            "Line 7: invalid due_date '2030-02-30'",
+        ])
+        self.assertEqual(Task.objects.get().budget, Decimal('20.00'))
+
+
+class ChunkedUploadTests(TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        settings_override = override_settings(DELIVERABLES_ROOT=self.root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.profile = make_freelancer('maker')
+        self.task = Task.objects.create(title='Video', description='x', client=make_client(),
+                                        freelancer=self.profile.user, status='IN_PROGRESS')
+        self.client.force_login(self.profile.user)
+        self.data = bytes(range(256)) * 40  # 10240 bytes
+
+    def start(self):
+        response = self.client.post(f'/tasks/{self.task.pk}/uploads/', {'filename': 'cut.mp4', 'size': len(self.data)})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def put(self, url, start, end, body=None, **headers):
+        body = self.data[start:end] if body is None else body
+        return self.client.put(url, body, content_type='application/octet-stream', headers={
+            'Content-Range': f'bytes {start}-{end - 1}/{len(self.data)}', **headers,
+        })
+
+    def test_interrupted_upload_resumes_and_attaches_to_submission(self):
+        state = self.start()
+        url = state['chunk_url']
+        self.assertEqual(self.put(url, 0, 4096).json()['offset'], 4096)
+
+        # The client restarts: the same upload is handed back at the acknowledged offset
+        state = self.start()
+        self.assertEqual((state['chunk_url'], state['offset']), (url, 4096))
+
+        # A chunk that skips ahead is refused with the offset to resume from
+        response = self.put(url, 8192, 10240)
+        self.assertEqual((response.status_code, response.json()['offset']), (409, 4096))
+
+        self.put(url, 4096, 8192)
+        state = self.put(url, 8192, 10240).json()
+        self.assertTrue(state['complete'])
+
+        submission = TaskSubmission.objects.get(task=self.task)
+        with submission.delivery_file.open('rb') as fh:
+            self.assertEqual(fh.read(), self.data)
+        chunk_digests = b''.join(hashlib.sha256(self.data[a:b]).digest() for a, b in ((0, 4096), (4096, 8192), (8192, 10240)))
+        self.assertEqual(submission.delivery_checksum, hashlib.sha256(chunk_digests).hexdigest())
+        self.assertEqual(state['checksum'], submission.delivery_checksum)
+
+    def test_corrupt_chunk_is_not_acknowledged(self):
+        url = self.start()['chunk_url']
+        response = self.put(url, 0, 4096, **{'X-Chunk-SHA256': '0' * 64})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(ChunkedUpload.objects.get().offset, 0)
+
+    def test_racing_chunk_at_the_same_offset_does_not_overwrite_the_winner(self):
+        url = self.start()['chunk_url']
+        self.put(url, 0, 4096)
+        stale = ChunkedUpload.objects.get()
+        stale.offset = 0  # a request that read the upload before the first chunk was acknowledged
+        with self.assertRaises(uploads.OffsetMismatch):
+            uploads.write_chunk(stale, 0, 4096, io.BytesIO(b'x' * 4096))
+        with open(uploads.partial_path(stale), 'rb') as fh:
+            self.assertEqual(fh.read(), self.data[:4096])
+        self.assertEqual(ChunkedUpload.objects.get().chunk_digests, hashlib.sha256(self.data[:4096]).hexdigest())
+
+    def test_deliverable_downloads_only_for_the_task_parties(self):
+        url = self.start()['chunk_url']
+        self.put(url, 0, len(self.data))
+        download = f'/tasks/{self.task.pk}/deliverable/'
+        for user in (self.profile.user, self.task.client):
+            self.client.force_login(user)
+            response = self.client.get(download)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(b''.join(response.streaming_content), self.data)
+            self.assertIn('attachment', response['Content-Disposition'])
+
+        self.client.force_login(make_freelancer('other').user)
+        self.assertEqual(self.client.get(download).status_code, 404)
+        self.client.logout()
+        self.assertEqual(self.client.get(download).status_code, 302)
+
+    def test_only_the_assigned_freelancer_can_upload(self):
+        self.client.force_login(make_freelancer('other').user)
+        response = self.client.post(f'/tasks/{self.task.pk}/uploads/', {'filename': 'x', 'size': 10})
+        self.assertEqual(response.status_code, 404)
+
+
+class SimilarTasksTests(TestCase):
+
+    def setUp(self):
+        from freelancers.models import Skill
+
+        self.client_user = make_client()
+        self.python = Skill.objects.create(name='Python')
+        self.design = Skill.objects.create(name='Design')
+
+    def make_task(self, title, description, skills=(), **extra):
+        task = Task.objects.create(title=title, description=description, client=self.client_user, **extra)
+        task.skills_required.set(skills)
+        return task
+
+    def test_ranks_open_tasks_by_similarity(self):
+        task = self.make_task('Django REST API for bookings', 'Build a Django REST API with Postgres and Celery workers.', [self.python])
+        close = self.make_task('Django REST API for invoices', 'Build a Django REST API with Postgres and Celery.', [self.python])
+        related = self.make_task('Flask API for bookings', 'Build a Flask API with Postgres.', [self.python])
+        self.make_task('Wedding logo', 'Elegant hand lettered logo and stationery.', [self.design])
+        self.make_task('Django REST API for payments', 'Build a Django REST API with Postgres and Celery.', [self.python], status='COMPLETED')
+
+        similar = similarity.similar_open_tasks(task)
+
+        self.assertEqual([t.pk for t in similar], [close.pk, related.pk])
+        self.assertGreater(similar[0].similarity, similar[1].similarity)
+
+    def test_signals_keep_buckets_in_step(self):
+        task = self.make_task('Mobile app onboarding screens', 'Design onboarding screens for a fitness app.', [self.design])
+        other = self.make_task('Mobile app onboarding flow', 'Design onboarding screens for a fitness app.', [self.design])
+        self.assertEqual(similarity.similar_open_tasks(task), [other])
+
+        transition(other, 'CANCELLED')
+        self.assertEqual(similarity.similar_open_tasks(task), [])
+        self.assertFalse(other.lsh_buckets.exists())
+
+        # Reopened behind the workflow's back (instance saves refuse status changes); a save re-signs it
+        Task.objects.filter(pk=other.pk).update(status='OPEN')
+        other = Task.objects.get(pk=other.pk)
+        other.save()
+        self.assertEqual(similarity.similar_open_tasks(task), [other])
+
+        # Edits re-sign the task
+        other.title, other.description = 'Tax return', 'Prepare an annual tax return.'
+        other.save()
+        other.skills_required.clear()
+        self.assertEqual(similarity.similar_open_tasks(task), [])
+
+    def test_detail_page_lists_similar_tasks(self):
+        task = self.make_task('Landing page copy', 'Write landing page copy for a coffee brand.')
+        other = self.make_task('Landing page copywriting', 'Write landing page copy for a tea brand.')
+        self.client.force_login(self.client_user)
+        response = self.client.get(f'/tasks/{task.pk}/')
+        self.assertContains(response, 'Similar Open Tasks')
+        self.assertContains(response, f'/tasks/{other.pk}/')
+
+
+class BidPlacementApiTests(QueryBudgetMixin, TestCase):
+
+    def setUp(self):
+        self.client_user = make_client()
+        self.task = Task.objects.create(title='Logo', description='A logo', client=self.client_user)
+        self.profile = make_freelancer('free')
+        self.client.force_login(self.profile.user)
+
+    def post_bid(self, key='', task=None, **data):
+        payload = {'amount': '120.00', 'delivery_days': 4, 'message': 'Hi', **data}
+        headers = {'Idempotency-Key': key} if key else {}
+        return self.client.post(f'/tasks/{(task or self.task).pk}/bids/', payload,
+                                content_type='application/json', headers=headers)
+
+    def test_places_bid_and_updates_stats(self):
+        # session, user, profile; then INSERT and the stats UPDATE inside one savepoint (+2)
+        with self.assertMaxQueries(7):
+            response = self.post_bid('k1')
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertFalse(body['replayed'])
+        self.assertEqual(body['bid']['amount'], '120.00')
+        self.task.refresh_from_db()
+        self.assertEqual((self.task.bid_count, self.task.lowest_bid), (1, 120))
+
+    def test_retry_with_same_key_returns_original_bid(self):
+        first = self.post_bid('k1').json()['bid']
+        response = self.post_bid('k1', amount='999.00')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['replayed'])
+        self.assertEqual(response.json()['bid'], first)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.bid_count, 1)
+
+    def test_second_bid_is_a_conflict(self):
+        first = self.post_bid('k1').json()['bid']
+        for key in ('k2', ''):
+            response = self.post_bid(key)
+            self.assertEqual(response.status_code, 409)
+            self.assertEqual(response.json()['bid']['id'], first['id'])
+        self.assertEqual(Bid.objects.count(), 1)
+
+    def test_closed_task_and_invalid_bodies_are_refused(self):
+        closed = Task.objects.create(title='Done', description='x', client=self.client_user, status='COMPLETED')
+        response = self.post_bid('k1', task=closed)
+        self.assertEqual(response.status_code, 409)
+        self.assertNotIn('bid', response.json())
+        self.assertFalse(Bid.objects.exists())
+        closed.refresh_from_db()
+        self.assertEqual(closed.bid_count, 0)
+
+        response = self.post_bid(amount='lots')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('amount', response.json()['fields'])
+        response = self.client.post(f'/tasks/{self.task.pk}/bids/', 'not json', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_auth_failures_are_json(self):
+        self.client.logout()
+        response = self.post_bid()
+        self.assertEqual((response.status_code, response['Content-Type']), (401, 'application/json'))
+        self.assertEqual(response.json(), {'error': "Authentication required."})
+
+        self.client.force_login(self.client_user)
+        response = self.post_bid()
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json(), {'error': "Access restricted to Freelancers."})
+        self.assertFalse(Bid.objects.exists())
+
+    def test_csrf_token_is_required(self):
+        csrf_client = Client(enforce_csrf_checks=True)
+        csrf_client.force_login(self.profile.user)
+        url = f'/tasks/{self.task.pk}/bids/'
+        payload = {'amount': '120.00', 'delivery_days': 4}
+        response = csrf_client.post(url, payload, content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(response.json()['error'].startswith('CSRF check failed'))
+        self.assertFalse(Bid.objects.exists())
+
+        token = 'a' * 32  # any 32-character secret; the header may carry it unmasked
+        csrf_client.cookies[settings.CSRF_COOKIE_NAME] = token
+        response = csrf_client.post(url, payload, content_type='application/json', headers={'X-CSRFToken': token})
+        self.assertEqual(response.status_code, 201)
+
+
+def make_freelancers(count, prefix='bulk'):
+    users = User.objects.bulk_create([
+        User(username=f'{prefix}{i}', email=f'{prefix}{i}@example.com', user_type=2) for i in range(count)
+    ])
+    return FreelancerProfile.objects.bulk_create([FreelancerProfile(user=u) for u in users])
+
+
+class ViewQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    Query budgets for the task views. Each view is checked with one row and
+    with 500, and must fit the same budget at both sizes.
+    """
+    SIZES = (1, 500)
+
+    def setUp(self):
+        from freelancers.models import Skill
+
+        self.client_user = make_client()
+        self.freelancer = make_freelancer('viewer')
+        self.category = TaskCategory.objects.create(name='Design')
+        self.skills = [Skill.objects.create(name=f'Skill {i}') for i in range(3)]
+        self.freelancer.skills.set(self.skills)
+
+    def make_tasks(self, count):
+        tasks = Task.objects.bulk_create([
+            Task(title=f'Logo {i}', description='Vector logo', client=self.client_user, category=self.category)
+            for i in range(count)
+        ])
+        Through = Task.skills_required.through
+        Through.objects.bulk_create([Through(task_id=t.pk, skill_id=s.pk) for t in tasks for s in self.skills])
+        for skill in self.skills:
+            OpenTaskSkill.objects.bulk_create([
+                OpenTaskSkill(skill=skill, task=t, task_created_at=t.created_at) for t in tasks
+            ])
+        return tasks
+
+    def test_task_detail_with_bids(self):
+        self.client.force_login(self.client_user)
+        for size in self.SIZES:
+            with self.subTest(bids=size):
+                task = self.make_tasks(1)[0]
+                Bid.objects.bulk_create([
+                    Bid(task=task, freelancer=p, amount=100 + i, delivery_days=3)
+                    for i, p in enumerate(make_freelancers(size, prefix=f'bid{size}-'))
+                ])
+                # Signed, so the similar-tasks panel lists the tasks created by earlier sizes
+                similarity.sync_tasks(Task.objects.values_list('pk', flat=True))
+                # session, user, task (+client, category, signature, submission), skills, involvement check,
+                # bid page (+freelancer, user), similar-task candidates, similar tasks (+category)
+                self.assertViewWithinBudget(f'/tasks/{task.pk}/', 8)
+
+    def test_task_lists(self):
+        for size in self.SIZES:
+            with self.subTest(tasks=size):
+                Task.objects.all().delete()
+                self.make_tasks(size)
+                self.client.force_login(self.client_user)
+                # session, user, task page (+category)
+                self.assertViewWithinBudget('/tasks/my-tasks/', 3)
+                self.client.force_login(self.freelancer.user)
+                # session, user, profile, its skills, task page (+category), skills of the page
+                self.assertViewWithinBudget('/tasks/available/', 6)
+                self.assertViewWithinBudget('/tasks/available/?sort=relevance', 6)
+                # session, user, form's category and skill choices, results (+category)
+                self.assertViewWithinBudget('/tasks/search/?q=logo&status=OPEN', 5)
+
+
+class AcceptBidContentionTests(ConcurrencyMixin, TransactionTestCase):
+    """
+    Many threads race to accept different bids on the same tasks. Exactly one
+    acceptance per task may win.
+    """
+    TASKS = 20
+    BIDS_PER_TASK = 8
+
+    def setUp(self):
+        self.client_user = make_client()
+        profiles = [make_freelancer(f'free{i}') for i in range(self.BIDS_PER_TASK)]
+        self.tasks = [
+            Task.objects.create(title=f'Task {i}', description='x', client=self.client_user)
+            for i in range(self.TASKS)
+        ]
+        self.bids_by_task = {
+            task.pk: [Bid.objects.create(task=task, freelancer=p, amount=50, delivery_days=2).pk for p in profiles]
+            for task in self.tasks
+        }
+
+    def test_exactly_one_bid_accepted_per_task(self):
+        wins, losses = [], []
+
+        def worker(slot):
+            for task_id, bid_ids in self.bids_by_task.items():
+                try:
+                    accept_bid(task_id, bid_ids[slot], self.client_user)
+                    wins.append(task_id)
+                except BidAcceptanceError:
+                    losses.append(task_id)
+
+        self.run_in_threads(worker, self.BIDS_PER_TASK)
+        self.assertEqual(sorted(wins), sorted(self.bids_by_task))
+        self.assertEqual(len(losses), self.TASKS * (self.BIDS_PER_TASK - 1))
+
+        for task in Task.objects.filter(pk__in=self.bids_by_task):
+            accepted = task.bids.filter(is_accepted=True)
+            self.assertEqual(accepted.count(), 1)
+            self.assertEqual(task.status, 'BID_ACCEPTED')
+            self.assertEqual(task.freelancer_id, accepted.get().freelancer_id)
+            self.assertEqual(task.bids.filter(is_rejected=True).count(), self.BIDS_PER_TASK - 1)
+
+
+class PlaceBidContentionTests(ConcurrencyMixin, TransactionTestCase):
+    """
+    Retries of the same bid race each other (the same Idempotency-Key sent
+    from many threads at once). Exactly one bid is created, and every other
+    attempt gets it back as a replay.
+    """
+    THREADS = 8
+
+    def test_concurrent_retries_create_one_bid(self):
+        task = Task.objects.create(title='Logo', description='x', client=make_client())
+        profile = make_freelancer('free')
+        created = self.run_in_threads(
+            lambda slot: place_bid(task.pk, profile.pk, 75, 3, idempotency_key='retry-1'), self.THREADS,
+        )
+        self.assertEqual(sum(was_created for _, was_created in created), 1)
+        self.assertEqual(len({bid.pk for bid, _ in created}), 1)
+        task.refresh_from_db()
+        self.assertEqual(task.bid_count, 1)
@@ -0,0 +1,200 @@
+# tasks/uploads.py
+"""
+Resumable, chunked uploads of TaskSubmission deliverables.
+
+A client starts an upload by declaring the file name and size, then PUTs the
+file in order, one chunk per request. Each chunk is streamed from the request
+into an anonymous temporary file, hashed on the way through. The request then
+claims the chunk's place by advancing the upload's `offset` with a conditional
+UPDATE, and only the winner copies its chunk into the single partial file
+under DELIVERABLES_ROOT/incomplete (fsync'ed before the claim commits). Two
+requests racing with the same chunk therefore never both write the partial
+file. The offset is the acknowledged resume point: after an interruption the
+client asks for it and continues from there.
+
+When the last byte is acknowledged the partial file is renamed into
+deliverable storage (same filesystem, so nothing is copied or re-read) and
+attached to the task's TaskSubmission. The file's checksum is the SHA-256 of
+the concatenated per-chunk SHA-256 digests, which needs no second pass over
+the data.
+
+Chunks must be sent one at a time; a chunk that does not start at the
+acknowledged offset is refused with the current offset.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from .models import ChunkedUpload, TaskSubmission, deliverable_storage
+
+# Suggested chunk size handed to clients, and the largest chunk accepted
+CHUNK_SIZE = 8 * 1024 * 1024
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+# Bytes read from the request per write
+BLOCK_SIZE = 1024 * 1024
+
+
+class UploadError(Exception):
+    """ Raised when a chunk or upload is rejected; the acknowledged offset is unchanged. """
+
+
+class OffsetMismatch(UploadError):
+    """ Raised when a chunk does not start at the acknowledged offset. """
+
+    def __init__(self, offset):
+        self.offset = offset
+        super().__init__(f"Expected the chunk starting at byte {offset}.")
+
+
+def partial_path(upload):
+    return os.path.join(settings.DELIVERABLES_ROOT, 'incomplete', f'{upload.pk}.part')
+
+
+def start_upload(task, freelancer, filename, size):
+    """
+    Returns the in-progress upload of `filename`/`size` for this task and
+    freelancer (so a restarted client resumes it), or starts a new one.
+    """
+    if size <= 0:
+        raise UploadError("The file is empty.")
+    if size > settings.DELIVERABLE_MAX_SIZE:
+        raise UploadError(f"Deliverables may be at most {settings.DELIVERABLE_MAX_SIZE} bytes.")
+    filename = get_valid_filename(os.path.basename(filename))[:200]
+
+    upload = ChunkedUpload.objects.filter(
+        task=task, freelancer=freelancer, filename=filename, size=size, status=ChunkedUpload.STATUS_UPLOADING,
+    ).order_by('-created_at').first()
+    if upload is not None and os.path.exists(partial_path(upload)):
+        return upload
+
+    upload = ChunkedUpload.objects.create(task=task, freelancer=freelancer, filename=filename, size=size)
+    os.makedirs(os.path.dirname(partial_path(upload)), exist_ok=True)
+    open(partial_path(upload), 'wb').close()
+    return upload
+
+
+def write_chunk(upload, start, length, stream, expected_sha256=None):
+    """
+    Writes `length` bytes read from `stream` at byte `start` and acknowledges
+    them. Returns the refreshed upload; it is complete (and attached to the
+    TaskSubmission) once the final chunk has been written.
+    """
+    if upload.is_complete:
+        raise UploadError("This upload is already complete.")
+    if start != upload.offset:
+        raise OffsetMismatch(upload.offset)
+    if length <= 0 or length > MAX_CHUNK_SIZE or start + length > upload.size:
+        raise UploadError(f"Chunks must be 1 to {MAX_CHUNK_SIZE} bytes and end within the declared size.")
+
+    digest = hashlib.sha256()
+    remaining = length
+    # Unlinked on close (or crash), so an abandoned chunk leaves nothing behind
+    with tempfile.TemporaryFile(dir=os.path.dirname(partial_path(upload))) as chunk:
+        while remaining:
+            block = stream.read(min(BLOCK_SIZE, remaining))
+            if not block:
+                raise UploadError("The chunk ended early; resend it.")
+            digest.update(block)
+            chunk.write(block)
+            remaining -= len(block)
+
+        chunk_sha256 = digest.hexdigest()
+        if expected_sha256 and expected_sha256.lower() != chunk_sha256:
+            raise UploadError("The chunk checksum does not match; resend it.")
+
+        with transaction.atomic():
+            # The claim holds the row until commit, so a racing request with the same chunk
+            # waits here and then misses; only the winner writes the partial file
+            acknowledged = ChunkedUpload.objects.filter(
+                pk=upload.pk, offset=start, status=ChunkedUpload.STATUS_UPLOADING,
+            ).update(
+                offset=start + length,
+                chunk_digests=Concat(F('chunk_digests'), Value(chunk_sha256)),
+                updated_at=timezone.now(),
+            )
+            if acknowledged:
+                chunk.seek(0)
+                with open(partial_path(upload), 'r+b') as fh:
+                    fh.seek(start)
+                    shutil.copyfileobj(chunk, fh, BLOCK_SIZE)
+                    fh.flush()
+                    # Acknowledged bytes must survive a crash, or a resume would skip them
+                    os.fsync(fh.fileno())
+    upload.refresh_from_db()
+    if not acknowledged:
+        raise OffsetMismatch(upload.offset)
+
+    if upload.offset == upload.size:
+        _finish(upload)
+        upload.refresh_from_db()
+    return upload
+
+
+def upload_checksum(upload):
+    return hashlib.sha256(bytes.fromhex(upload.chunk_digests)).hexdigest()
+
+
+def _finish(upload):
+    storage = deliverable_storage()
+    upload_to = TaskSubmission._meta.get_field('delivery_file').upload_to
+    name = storage.get_available_name(
+        os.path.join(timezone.now().strftime(upload_to), f'{upload.task_id}-{upload.filename}'),
+        max_length=255,
+    )
+    source, target = partial_path(upload), storage.path(name)
+
+    with transaction.atomic():
+        # Only one request may finish an upload
+        claimed = ChunkedUpload.objects.filter(
+            pk=upload.pk, offset=upload.size, status=ChunkedUpload.STATUS_UPLOADING,
+        ).update(status=ChunkedUpload.STATUS_COMPLETE, updated_at=timezone.now())
+        if not claimed:
+            return
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(source, target)
+        try:
+            previous = TaskSubmission.objects.filter(task_id=upload.task_id).values_list('delivery_file', flat=True).first()
+            TaskSubmission.objects.update_or_create(
+                task_id=upload.task_id,
+                defaults={
+                    'freelancer_id': upload.freelancer_id,
+                    'delivery_file': name,
+                    'delivery_checksum': upload_checksum(upload),
+                },
+            )
+        except Exception:
+            os.replace(target, source)
+            raise
+
+    if previous and previous != name:
+        # A resubmission replaces the earlier deliverable
+        storage.delete(previous)
+
+
+def purge_stale_uploads(older_than):
+    """
+    Deletes unfinished uploads (and their partial files) not written to for
+    `older_than` (a timedelta). Returns how many were removed.
+    """
+    stale = ChunkedUpload.objects.filter(
+        status=ChunkedUpload.STATUS_UPLOADING, updated_at__lt=timezone.now() - older_than,
+    )
+    removed = 0
+    for upload in stale.iterator():
+        try:
+            os.remove(partial_path(upload))
+        except FileNotFoundError:
+            pass
+        upload.delete()
+        removed += 1
+    return removed
@@ -21,7 +21,22 @@ urlpatterns = [
     # URL to submit a bid on a task
     path('<int:pk>/bid/', views.bid_create_view, name='bid_create'),
     
+    # JSON bid placement for API clients (idempotent with an Idempotency-Key header)
+    path('<int:pk>/bids/', views.bid_place_view, name='bid_place'),
+    
+    # Resumable chunked upload of the deliverable
+    path('<int:pk>/submit/', views.submission_upload_view, name='submission_upload'),
+    path('<int:pk>/uploads/', views.upload_start_view, name='upload_start'),
+    path('uploads/<uuid:upload_id>/', views.upload_chunk_view, name='upload_chunk'),
+    path('<int:pk>/deliverable/', views.submission_download_view, name='submission_download'),
+    
     # --- SHARED VIEWS ---
+    # Full-text search over tasks
+    path('search/', views.task_search_view, name='task_search'),
+    
+    # Public category browser with task counts
+    path('categories/', views.category_list_view, name='category_list'),
+    
     # Detail view for a specific task (viewable by client or involved freelancer)
     path('<int:pk>/', views.task_detail_view, name='task_detail'),
 ]
\ No newline at end of file
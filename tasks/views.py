@@ -1,13 +1,45 @@
+import json
+import os
+import re
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q
+from django.http import FileResponse, Http404, JsonResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.middleware.csrf import CsrfViewMiddleware
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST, require_http_methods
 
 # Create your views here.
 # Import models/forms from local and external apps
-from .models import Task, Bid, TaskSubmission
-from .forms import TaskCreateForm, BidCreateForm
+from .models import Task, Bid, TaskSubmission, ChunkedUpload
+from .forms import TaskCreateForm, BidCreateForm, TaskSearchForm
+from .skill_index import open_tasks_for_skills
+from .similarity import similar_open_tasks
+from .ranking import rank_for_freelancer
+from .search import search_tasks
+from .workflow import accept_bid, place_bid, BidAcceptanceError, BidPlacementError
+from .category_stats import category_counts
+from . import uploads
 from freelancers.models import FreelancerProfile # Needed for skill matching
+from FREELANCE.pagination import cursor_context, paginate_keyset
+
+# Keyset orderings (must end in a unique column, see FREELANCE.pagination)
+TASK_ORDERING = ('-created_at', '-id')
+BID_ORDERING = ('amount', 'id')
+BIDS_PER_PAGE = 25
+
+# A relevance cursor ranked longer ago than this is re-ranked from now
+RANKED_AT_MAX_AGE = timedelta(days=30)
+
+# A deliverable can be uploaded once the freelancer is assigned and until review starts
+SUBMISSION_STATUSES = ('BID_ACCEPTED', 'IN_PROGRESS')
 
 # Placeholder decorator functions (assume they are defined or imported)
 def client_required(view_func):
@@ -28,13 +60,43 @@ def freelancer_required(view_func):
         return view_func(request, *args, **kwargs)
     return wrapper
 
+
+class _CsrfCheck(CsrfViewMiddleware):
+    """ Runs the CSRF middleware's check, returning the failure reason instead of the HTML 403 page. """
+
+    def _reject(self, request, reason):
+        return reason
+
+
+def freelancer_api_required(view_func):
+    """
+    freelancer_required for JSON views: an anonymous request gets 401, a
+    failed CSRF check or a non-freelancer 403, each as JSON with `error`
+    rather than a redirect or an HTML page. The session cookie is the
+    credential, so the CSRF token must be sent as with any form POST
+    (the csrftoken cookie's value in an X-CSRFToken header).
+    """
+    @csrf_exempt  # checked below, after authentication
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': "Authentication required."}, status=401)
+        reason = _CsrfCheck(lambda request: None).process_view(request, None, args, kwargs)
+        if reason:
+            return JsonResponse({'error': f"CSRF check failed: {reason}"}, status=403)
+        if not request.user.is_freelancer:
+            return JsonResponse({'error': "Access restricted to Freelancers."}, status=403)
+        return view_func(request, *args, **kwargs)
+    return wrapper
+
 # --- CLIENT-SIDE VIEWS ---
 
 @client_required
 def client_task_list_view(request):
     """ Client dashboard view of all tasks they have posted. """
-    tasks = Task.objects.filter(client=request.user).order_by('-created_at')
-    return render(request, 'tasks/client_task_list.html', {'tasks': tasks, 'title': 'My Posted Tasks'})
+    tasks = Task.objects.filter(client=request.user).select_related('category')
+    page = paginate_keyset(tasks, TASK_ORDERING, request.GET.get('cursor'))
+    return render(request, 'tasks/client_task_list.html', {'tasks': page, 'page': page, 'title': 'My Posted Tasks'})
 
 @client_required
 def task_create_view(request):
@@ -53,10 +115,16 @@ def task_create_view(request):
         
     return render(request, 'tasks/task_create.html', {'form': form, 'title': 'Post New Task'})
 
-# ... (accept_bid_view will be complex, let's keep it placeholder for now) ...
 @client_required
+@require_POST
 def accept_bid_view(request, pk, bid_pk):
-    messages.info(request, "Placeholder: Logic to accept bid and change task status.")
+    """ Accepts one bid on the client's OPEN task and declines the competing ones. """
+    try:
+        bid = accept_bid(pk, bid_pk, request.user)
+    except BidAcceptanceError as e:
+        messages.error(request, str(e))
+    else:
+        messages.success(request, f"You accepted {bid.freelancer.user.username}'s bid. The task is now assigned.")
     return redirect('tasks:task_detail', pk=pk) 
 
 
@@ -69,35 +137,55 @@ def available_tasks_list_view(request):
     This is the core skill-matching view.
     """
     profile = get_object_or_404(FreelancerProfile, user=request.user)
-    freelancer_skills = profile.skills.all()
-    
-    # 1. Start with tasks that are OPEN
-    open_tasks = Task.objects.filter(status='OPEN')
+    skill_ids = list(profile.skills.values_list('pk', flat=True))
     
-    # 2. Filter tasks based on the freelancer's skills.
-    # The Q object (OR condition) finds tasks that require AT LEAST ONE of the freelancer's skills.
-    # We use a distinct query to ensure we don't return duplicates if a task matches multiple skills.
-    
-    # Create an initial empty Q object
-    skill_filter = Q()
-    for skill in freelancer_skills:
-        skill_filter |= Q(skills_required__in=[skill])
-        
-    # Apply the skill filter and ensure the task is currently open
-    matching_tasks = open_tasks.filter(skill_filter).distinct().order_by('-created_at')
-    
-    # Optionally, get tasks that the freelancer has already bid on to exclude them from the list
-    bids_made = Bid.objects.filter(freelancer=profile).values_list('task__pk', flat=True)
-    final_tasks = matching_tasks.exclude(pk__in=bids_made)
+    # OPEN tasks requiring AT LEAST ONE of the freelancer's skills, minus the ones
+    # already bid on. Served from the Skill -> OPEN Task index (see tasks.skill_index),
+    # so there is no per-skill OR chain and no DISTINCT over the M2M join.
+    final_tasks = open_tasks_for_skills(skill_ids, exclude_bids_by=profile)
+
+    # ?sort=relevance ranks by skill overlap, budget fit and recency (one annotated query)
+    sort = request.GET.get('sort')
+    cursor = request.GET.get('cursor')
+    ordering, ranked_at = TASK_ORDERING, None
+    if sort == 'relevance':
+        # Every page is ranked as of the first page's time, carried in the cursor
+        ranked_at = _ranked_at(cursor)
+        final_tasks = rank_for_freelancer(final_tasks, profile, skill_ids, now=ranked_at)
+        ordering = ('-match_score',) + TASK_ORDERING
+
+    # Category and skill badges for the whole page in two queries, not two per card
+    final_tasks = final_tasks.select_related('category').prefetch_related('skills_required')
+    page = paginate_keyset(final_tasks, ordering, cursor, context=ranked_at and ranked_at.isoformat())
 
     context = {
         'title': 'Available Jobs Matching Your Skills',
-        'tasks': final_tasks,
-        'has_skills': freelancer_skills.exists(),
+        'tasks': page,
+        'page': page,
+        'has_skills': bool(skill_ids),
+        'sort': sort,
     }
     return render(request, 'tasks/available_tasks_list.html', context)
 
 
+def _ranked_at(cursor):
+    """
+    The ranking time stored in a relevance cursor, or now for a first page or
+    a bad cursor: not a timestamp, naive, in the future or older than
+    RANKED_AT_MAX_AGE (the recency tiers subtract from it, which overflows
+    near datetime.min).
+    """
+    value = cursor_context(cursor)
+    try:
+        ranked_at = parse_datetime(value) if isinstance(value, str) else None
+    except ValueError:
+        ranked_at = None
+    now = timezone.now()
+    if ranked_at is None or timezone.is_naive(ranked_at) or not now - RANKED_AT_MAX_AGE <= ranked_at <= now:
+        return now
+    return ranked_at
+
+
 @freelancer_required
 def bid_create_view(request, pk):
     """ Allows Freelancer to submit a Bid on an open Task. """
@@ -107,16 +195,11 @@ def bid_create_view(request, pk):
     if request.method == 'POST':
         form = BidCreateForm(request.POST)
         if form.is_valid():
-            bid = form.save(commit=False)
-            bid.task = task
-            bid.freelancer = freelancer_profile
-            
-            # Check for existing bid (prevent unique_together error)
-            if Bid.objects.filter(task=task, freelancer=freelancer_profile).exists():
-                messages.error(request, "You have already placed a bid on this task.")
-            else:
-                bid.save()
+            try:
+                place_bid(task.pk, freelancer_profile.pk, **form.cleaned_data)
                 messages.success(request, "Your bid has been successfully placed!")
+            except BidPlacementError as e:
+                messages.error(request, str(e))
             
             return redirect('tasks:task_detail', pk=pk)
     else:
@@ -130,12 +213,185 @@ def bid_create_view(request, pk):
     return render(request, 'tasks/bid_create.html', context)
 
 
+def _bid_state(bid):
+    return {
+        'id': bid.pk,
+        'task': bid.task_id,
+        'amount': str(bid.amount),
+        'delivery_days': bid.delivery_days,
+        'message': bid.message,
+        'is_accepted': bid.is_accepted,
+        'created_at': bid.created_at.isoformat(),
+    }
+
+
+@freelancer_api_required
+@require_POST
+def bid_place_view(request, pk):
+    """
+    JSON bid placement for API clients. Expects a JSON body with `amount`,
+    `delivery_days` and optionally `message`, from a logged-in freelancer's
+    session with its CSRF token (see freelancer_api_required). An
+    `Idempotency-Key` header makes retries safe: repeating it returns the
+    original bid (200) instead of creating one (201). Other failures return
+    400, 401, 403 or 409 with `error`.
+    """
+    profile_id = get_object_or_404(FreelancerProfile.objects.values_list('pk', flat=True), user=request.user)
+    idempotency_key = request.headers.get('Idempotency-Key', '')
+    if len(idempotency_key) > Bid._meta.get_field('idempotency_key').max_length:
+        return JsonResponse({'error': "The Idempotency-Key header is too long."}, status=400)
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': "The request body must be JSON."}, status=400)
+    form = BidCreateForm(data if isinstance(data, dict) else {})
+    if not form.is_valid():
+        return JsonResponse({'error': "The bid is invalid.", 'fields': form.errors.get_json_data()}, status=400)
+
+    try:
+        bid, created = place_bid(pk, profile_id, idempotency_key=idempotency_key, **form.cleaned_data)
+    except BidPlacementError as e:
+        body = {'error': str(e)}
+        if e.bid is not None:
+            body['bid'] = _bid_state(e.bid)
+        return JsonResponse(body, status=409)
+    return JsonResponse({'bid': _bid_state(bid), 'replayed': not created}, status=201 if created else 200)
+
+
+def _upload_state(upload):
+    return {
+        'upload_id': str(upload.pk),
+        'offset': upload.offset,
+        'size': upload.size,
+        'chunk_size': uploads.CHUNK_SIZE,
+        'complete': upload.is_complete,
+        'checksum': uploads.upload_checksum(upload) if upload.is_complete else None,
+    }
+
+
+@freelancer_required
+def submission_upload_view(request, pk):
+    """ Page from which the assigned freelancer uploads the deliverable in resumable chunks. """
+    task = get_object_or_404(Task, pk=pk, freelancer=request.user, status__in=SUBMISSION_STATUSES)
+    context = {
+        'title': f'Submit work: {task.title}',
+        'task': task,
+        'submission': TaskSubmission.objects.filter(task=task).first(),
+        'max_size': settings.DELIVERABLE_MAX_SIZE,
+    }
+    return render(request, 'tasks/submission_upload.html', context)
+
+
+@freelancer_required
+@require_POST
+def upload_start_view(request, pk):
+    """ Starts (or resumes) a chunked upload. Expects `filename` and `size`; returns the upload state as JSON. """
+    task = get_object_or_404(Task, pk=pk, freelancer=request.user, status__in=SUBMISSION_STATUSES)
+    profile = get_object_or_404(FreelancerProfile, user=request.user)
+    try:
+        size = int(request.POST.get('size', ''))
+        upload = uploads.start_upload(task, profile, request.POST.get('filename') or 'deliverable', size)
+    except ValueError:
+        return JsonResponse({'error': "A numeric file size is required."}, status=400)
+    except uploads.UploadError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    state = _upload_state(upload)
+    state['chunk_url'] = reverse('tasks:upload_chunk', args=[upload.pk])
+    return JsonResponse(state)
+
+
+@freelancer_required
+@require_http_methods(['GET', 'PUT'])
+def upload_chunk_view(request, upload_id):
+    """
+    GET returns the acknowledged offset to resume from. PUT writes one chunk:
+    the raw bytes in the body, their position in `Content-Range: bytes start-end/size`
+    and, optionally, their hex SHA-256 in `X-Chunk-SHA256`.
+    """
+    upload = get_object_or_404(ChunkedUpload, pk=upload_id, freelancer__user=request.user)
+    if request.method == 'GET':
+        return JsonResponse(_upload_state(upload))
+
+    match = re.fullmatch(r'bytes (\d+)-(\d+)/(\d+)', request.headers.get('Content-Range', ''))
+    if not match or int(match[3]) != upload.size or int(match[2]) < int(match[1]):
+        return JsonResponse({'error': "A Content-Range of the form 'bytes start-end/size' is required."}, status=400)
+    start, length = int(match[1]), int(match[2]) - int(match[1]) + 1
+    if request.headers.get('Content-Length') != str(length):
+        return JsonResponse({'error': "Content-Length does not match Content-Range."}, status=400)
+
+    try:
+        upload = uploads.write_chunk(upload, start, length, request, request.headers.get('X-Chunk-SHA256'))
+    except uploads.OffsetMismatch as e:
+        return JsonResponse({'error': str(e), 'offset': e.offset}, status=409)
+    except uploads.UploadError as e:
+        return JsonResponse({'error': str(e), 'offset': upload.offset}, status=400)
+    return JsonResponse(_upload_state(upload))
+
+
+@login_required
+def submission_download_view(request, pk):
+    """
+    Sends the task's uploaded deliverable to its client or freelancer.
+    Deliverable storage is not under MEDIA_URL, so this is the only way to fetch it.
+    """
+    submission = get_object_or_404(TaskSubmission.objects.select_related('task'), task_id=pk)
+    task = submission.task
+    allowed = request.user.pk in (task.client_id, task.freelancer_id) or request.user.is_staff
+    if not allowed or not submission.delivery_file:
+        raise Http404("No deliverable found.")
+    try:
+        fh = submission.delivery_file.open('rb')
+    except FileNotFoundError:
+        raise Http404("No deliverable found.")
+    return FileResponse(fh, as_attachment=True, filename=os.path.basename(submission.delivery_file.name))
+
+
 # --- SHARED VIEWS ---
 
+SEARCH_RESULT_LIMIT = 50
+
+@login_required
+def task_search_view(request):
+    """ Full-text search over task titles and descriptions (BM25-ranked on SQLite). """
+    # Default to OPEN tasks on a fresh page; an explicit empty status means "any"
+    data = request.GET if 'q' in request.GET else {'status': 'OPEN'}
+    form = TaskSearchForm(data)
+
+    results = []
+    searched = form.is_valid() and any(form.cleaned_data[f] for f in ('q', 'category', 'skills'))
+    if searched:
+        results = search_tasks(
+            form.cleaned_data['q'],
+            status=form.cleaned_data['status'],
+            category=form.cleaned_data['category'],
+            skills=form.cleaned_data['skills'],
+        ).select_related('category')[:SEARCH_RESULT_LIMIT]
+
+    context = {
+        'title': 'Search Tasks',
+        'form': form,
+        'tasks': results,
+        'searched': searched,
+        'query': form.cleaned_data.get('q') if form.is_valid() else '',
+    }
+    return render(request, 'tasks/task_search.html', context)
+
+
+def category_list_view(request):
+    """ Public category browser with OPEN/total task counts (cached, see tasks.category_stats). """
+    context = {
+        'title': 'Browse Categories',
+        'categories': category_counts(),
+    }
+    return render(request, 'tasks/category_list.html', context)
+
+
 @login_required
 def task_detail_view(request, pk):
     """ Shows the detail of a task to the client or involved freelancer. """
-    task = get_object_or_404(Task, pk=pk)
+    task = get_object_or_404(
+        Task.objects.select_related('client', 'category', 'signature', 'submission').prefetch_related('skills_required'), pk=pk,
+    )
     
     is_client = request.user == task.client
     is_involved_freelancer = Bid.objects.filter(task=task, is_accepted=True, freelancer__user=request.user).exists()
@@ -146,12 +402,15 @@ def task_detail_view(request, pk):
             messages.error(request, "You do not have permission to view this task.")
             return redirect('homepage')
             
-    bids = task.bids.all().order_by('amount') # Show bids for client
+    # Show bids for client, cheapest first
+    bids = paginate_keyset(task.bids.select_related('freelancer__user'), BID_ORDERING, request.GET.get('cursor'), per_page=BIDS_PER_PAGE)
 
     context = {
         'title': task.title,
         'task': task,
         'is_client': is_client,
         'bids': bids,
+        'can_submit': task.freelancer_id == request.user.pk and task.status in SUBMISSION_STATUSES,
+        'similar_tasks': similar_open_tasks(task),
     }
     return render(request, 'tasks/task_detail.html', context)
\ No newline at end of file
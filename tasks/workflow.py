@@ -0,0 +1,153 @@
+# tasks/workflow.py
+"""
+Task workflow operations that must stay consistent under concurrent requests.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef, Subquery
+from django.utils import timezone
+
+from .models import Task, Bid, TaskTransition, ALLOWED_TRANSITIONS
+from . import skill_index, category_stats, similarity, bid_stats
+
+
+class InvalidTransition(Exception):
+    """ Raised when a Task.status change is not allowed or lost a race with another change. """
+
+
+class BidAcceptanceError(Exception):
+    """ Raised when a bid cannot be accepted (task no longer open, or bid/task mismatch). """
+
+
+class BidPlacementError(Exception):
+    """ Raised when a bid cannot be placed. `bid` is the freelancer's existing bid on the task, if any. """
+
+    def __init__(self, message, bid=None):
+        self.bid = bid
+        super().__init__(message)
+
+
+def transition(task, to_status, actor=None, **updates):
+    """
+    Moves `task` to `to_status`, validating it against ALLOWED_TRANSITIONS and
+    appending a TaskTransition row. Extra field values in `updates` are written
+    in the same UPDATE. Returns the task with the new status set.
+
+    The UPDATE is conditional on the status the caller saw, so two concurrent
+    transitions of the same task cannot both succeed; the loser gets
+    InvalidTransition and should reload the task.
+    """
+    from_status = task.status
+    if to_status not in ALLOWED_TRANSITIONS.get(from_status, ()):
+        raise InvalidTransition(f"A task cannot move from {from_status} to {to_status}.")
+
+    now = timezone.now()
+    with transaction.atomic():
+        changed = Task.objects.filter(pk=task.pk, status=from_status).update(
+            status=to_status, updated_at=now, **updates
+        )
+        if not changed:
+            raise InvalidTransition("The task was changed by someone else. Reload it and try again.")
+
+        TaskTransition.objects.create(
+            task_id=task.pk, from_status=from_status, status=to_status, actor=actor, timestamp=now,
+        )
+        # QuerySet.update() bypasses the signals that maintain the denormalized data
+        if 'OPEN' in (from_status, to_status):
+            skill_index.sync_tasks([task.pk])
+            similarity.sync_tasks([task.pk])
+        category_stats.invalidate()
+
+    task.status = to_status
+    # The new status is what the row holds now, so a later task.save() is not a status change
+    task._loaded_category_status = (task.category_id, to_status)
+    task.updated_at = now
+    for name, value in updates.items():
+        setattr(task, name, value)
+    return task
+
+
+def tasks_in_status_longer_than(status, age):
+    """
+    Tasks currently in `status` that entered it more than `age` (a timedelta) ago,
+    e.g. tasks_in_status_longer_than('UNDER_REVIEW', timedelta(days=3)).
+    Served by a range scan on TaskTransition's (status, timestamp) index.
+    """
+    entered = TaskTransition.objects.filter(status=status, timestamp__lt=timezone.now() - age)
+    return Task.objects.filter(status=status, pk__in=entered.values('task_id'))
+
+
+def accept_bid(task_id, bid_id, client, actor=None):
+    """
+    Accepts `bid_id` on `task_id` on behalf of `client`. Returns the accepted Bid.
+    The transition is logged as made by `actor` (default the client, e.g. staff in the admin).
+
+    The whole operation is one transaction whose FIRST statement is a
+    conditional UPDATE that moves the task from OPEN to BID_ACCEPTED. The
+    database serializes concurrent writers on that row, and only one of them
+    can still see status = 'OPEN', so a task can never end up with two
+    accepted bids. Starting with the write (rather than a SELECT) also avoids
+    SQLite's reader-to-writer upgrade deadlock. The OPEN -> BID_ACCEPTED step
+    is recorded in the transition log like any other transition.
+    """
+    bid_for_task = Bid.objects.filter(pk=bid_id, task=OuterRef('pk'))
+    now = timezone.now()
+
+    with transaction.atomic():
+        claimed = Task.objects.filter(
+            Exists(bid_for_task), pk=task_id, client=client, status='OPEN',
+        ).update(
+            status='BID_ACCEPTED',
+            freelancer_id=Subquery(bid_for_task.values('freelancer_id')),
+            updated_at=now,
+        )
+        if not claimed:
+            raise BidAcceptanceError("This task is no longer open for bids, or the bid does not belong to it.")
+
+        Bid.objects.filter(pk=bid_id).update(is_accepted=True)
+        # Flag every competing bid in one statement
+        Bid.objects.filter(task_id=task_id).exclude(pk=bid_id).update(is_rejected=True)
+
+        TaskTransition.objects.create(
+            task_id=task_id, from_status='OPEN', status='BID_ACCEPTED', actor=actor or client, timestamp=now,
+        )
+
+        # QuerySet.update() bypasses the signals that maintain the denormalized data
+        skill_index.sync_tasks([task_id])
+        similarity.sync_tasks([task_id])
+        category_stats.invalidate()
+
+    return Bid.objects.get(pk=bid_id)
+
+
+def place_bid(task_id, freelancer_id, amount, delivery_days, message='', idempotency_key=''):
+    """
+    Places a bid. Returns (bid, created).
+
+    There is no "already bid?" pre-check: the INSERT is the first statement
+    and Bid's unique (task, freelancer) constraint rejects a second bid. The
+    task's bid statistics are updated in the same transaction, and only while
+    the task is OPEN, so a bid cannot land on a task accepted meanwhile.
+
+    If the freelancer's existing bid was placed with the same non-empty
+    `idempotency_key`, the request is a retry: that bid is returned with
+    created=False. Otherwise BidPlacementError is raised.
+    """
+    bid = Bid(
+        task_id=task_id, freelancer_id=freelancer_id, amount=amount, delivery_days=delivery_days,
+        message=message, idempotency_key=idempotency_key,
+    )
+    try:
+        with transaction.atomic():
+            # bulk_create skips post_save, so the stats delta below is the only one applied
+            Bid.objects.bulk_create([bid])
+            if not bid_stats.record_bid_added(bid, only_open=True):
+                raise BidPlacementError("This task is no longer open for bids.")
+    except IntegrityError:
+        existing = Bid.objects.filter(task_id=task_id, freelancer_id=freelancer_id).first()
+        if existing is None:
+            raise BidPlacementError("This task is no longer open for bids.")
+        if idempotency_key and existing.idempotency_key == idempotency_key:
+            return existing, False
+        raise BidPlacementError("You have already placed a bid on this task.", bid=existing)
+    return bid, True